@@ -1,184 +1,241 @@
 import csv
-from django.contrib import admin
-from django.http import HttpResponse
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.urls import path
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Department, Faculty, Course, Student, Enrollment, Attendance, Assessment, Result
-from .forms import CsvImportForm
+from django.core.exceptions import PermissionDenied
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import (
+    User, Department, Faculty, Course, Student, Enrollment, Attendance, AttendanceRollup,
+    Assessment, Result, AttendanceRiskScan, AttendanceRiskFlag, SyncReceipt, GradeWeight, CourseGrade,
+    rollup_percentage,
+)
+from . import search
+from .grading import grade_courses
+from .replicas import read_alias
+from .reports import run_attendance_risk_scan
+from .forms import CsvImportForm, UserCsvImportForm
+from .importers import CourseImporter, StudentImporter, FacultyImporter, UserImporter, EnrollmentImporter
+
+class Echo:
+    """File-like object that hands each written CSV line straight back to the caller."""
+    def write(self, value):
+        return value
+
+def _take(iterator, count):
+    return list(islice(iterator, count))
 
 class ExportCsvMixin:
-    def export_as_csv(self, request, queryset):
-        meta = self.model._meta
-        field_names = [field.name for field in meta.fields]
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename={meta.verbose_name_plural}.csv'
-        writer = csv.writer(response)
-        writer.writerow(field_names)
-        for obj in queryset:
-            writer.writerow([getattr(obj, field) for field in field_names])
+    # Columns passed to values_list(); defaults to every concrete column with
+    # foreign keys as raw ids. Admins may add joined lookups such as
+    # 'student__roll_no', which are resolved in the same query.
+    export_fields = None
+    export_chunk_size = 2000
+
+    def get_export_fields(self):
+        if self.export_fields:
+            return list(self.export_fields)
+        return [field.attname for field in self.model._meta.concrete_fields]
+
+    def stream_csv(self, request, queryset):
+        fields = self.get_export_fields()
+        writer = csv.writer(Echo())
+        # The rows are read while the response streams, after the view has
+        # returned, so the replica is picked here rather than by the router.
+        rows = queryset.using(read_alias()).values_list(*fields)
+
+        if isinstance(request, ASGIRequest):
+            # Under ASGI a sync iterator is read into a list before anything
+            # is sent; an async one is fetched a chunk at a time. (aiterator()
+            # can't do this: it runs values_list() queries in the event loop.)
+            async def generate():
+                yield writer.writerow(fields)
+                chunks = rows.iterator(chunk_size=self.export_chunk_size)
+                while chunk := await sync_to_async(_take)(chunks, self.export_chunk_size):
+                    for row in chunk:
+                        yield writer.writerow(row)
+        else:
+            def generate():
+                yield writer.writerow(fields)
+                for row in rows.iterator(chunk_size=self.export_chunk_size):
+                    yield writer.writerow(row)
+
+        response = StreamingHttpResponse(generate(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename={self.model._meta.verbose_name_plural}.csv'
         return response
+
+    # "Select all N" on the changelist hands this every row matching the
+    # current search and filters.
+    def export_as_csv(self, request, queryset):
+        return self.stream_csv(request, queryset)
     export_as_csv.short_description = "Export Selected as CSV"
 
+class CsvImportMixin:
+    csv_importer = None
+    csv_import_form = CsvImportForm
+
+    def import_csv(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        if request.method == "POST":
+            form = self.csv_import_form(request.POST, request.FILES)
+            if form.is_valid():
+                importer = self.csv_importer(defer_passwords=form.cleaned_data.get('defer_passwords', False))
+                report = importer.run(form.cleaned_data['csv_file'])
+                level = messages.WARNING if report.rejects else messages.SUCCESS
+                self.message_user(request, f"CSV file has been processed: {report.summary()}", level)
+                if report.setup_links:
+                    return self.setup_links_csv(request, report.setup_links)
+                return redirect("..")
+        form = self.csv_import_form()
+        payload = {"form": form}
+        return render(request, "admin/csv_import.html", payload)
+
+    def setup_links_csv(self, request, links):
+        writer = csv.writer(Echo())
+        rows = [writer.writerow(['username', 'set_password_link'])]
+        rows += [writer.writerow([username, request.build_absolute_uri(link)]) for username, link in links]
+        response = StreamingHttpResponse(rows, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename=set-password-links.csv'
+        return response
+
+class IndexedSearchMixin:
+    """Admin search (and autocomplete) through search.py instead of an icontains scan of every column.
+
+    Must come before ModelAdmin in the bases so it overrides get_search_results.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_queryset(self.search_kind, queryset, search_term), False
+
 class EnrollmentInline(admin.TabularInline):
     model = Enrollment
     extra = 0
-    readonly_fields = ('student_name', 'student_roll_no', 'attendance_percentage')
+    # student is read-only: an editable select would load every student once per row.
+    readonly_fields = ('student', 'student_name', 'student_roll_no', 'attendance_percentage')
     can_delete = False
+    def get_queryset(self, request):
+        rollups = AttendanceRollup.objects.filter(student=OuterRef('student'), course=OuterRef('course'))
+        return super().get_queryset(request).select_related('student', 'course').annotate(
+            attendance=Coalesce(Subquery(rollups.annotate(pct=rollup_percentage()).values('pct')[:1]), Value(0.0))
+        )
     def student_name(self, instance):
         return instance.student.name
     def student_roll_no(self, instance):
         return instance.student.roll_no
     def attendance_percentage(self, instance):
-        percentage = instance.student.get_attendance_percentage(instance.course)
-        return f"{percentage:.2f}%"
+        return f"{instance.attendance:.2f}%"
     def has_add_permission(self, request, obj=None):
         return False
 
+class GradeWeightInline(admin.TabularInline):
+    model = GradeWeight
+    extra = 0
+
+class AttendanceBandFilter(admin.SimpleListFilter):
+    title = 'overall attendance'
+    parameter_name = 'attendance'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('below', f'Below {settings.ATTENDANCE_THRESHOLD:g}%'),
+            ('at_or_above', f'{settings.ATTENDANCE_THRESHOLD:g}% and above'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'below':
+            return queryset.filter(overall_attendance__lt=settings.ATTENDANCE_THRESHOLD)
+        if self.value() == 'at_or_above':
+            return queryset.filter(overall_attendance__gte=settings.ATTENDANCE_THRESHOLD)
+        return queryset
+
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin, ExportCsvMixin):
+class CourseAdmin(IndexedSearchMixin, admin.ModelAdmin, ExportCsvMixin, CsvImportMixin):
     list_display = ('course_name', 'course_code', 'dept', 'faculty')
-    actions = ["import_from_csv", "export_as_csv"] 
-    inlines = [EnrollmentInline]
+    search_fields = ('course_name', 'course_code')
+    search_kind = 'courses'
+    list_select_related = ('dept', 'faculty')
+    csv_importer = CourseImporter
+    actions = ["import_from_csv", "export_as_csv", "regrade"] 
+    inlines = [GradeWeightInline, EnrollmentInline]
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path('import-csv/', self.import_csv)]
+        my_urls = [path('import-csv/', self.admin_site.admin_view(self.import_csv))]
         return my_urls + urls
 
-    def import_csv(self, request):
-        if request.method == "POST":
-            form = CsvImportForm(request.POST, request.FILES)
-            if form.is_valid():
-                csv_file = form.cleaned_data['csv_file']
-                decoded_file = csv_file.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                
-                for row in reader:
-                    try:
-                        department = Department.objects.get(dept_name=row['dept_name'])
-                    except Department.DoesNotExist:
-                        continue
-
-                    faculty = None
-                    if row.get('faculty_username'):
-                        try:
-                            faculty_user = User.objects.get(username=row['faculty_username'])
-                            faculty = Faculty.objects.get(user=faculty_user)
-                        except (User.DoesNotExist, Faculty.DoesNotExist):
-                            faculty = None
-
-                    Course.objects.get_or_create(
-                        course_code=row['course_code'],
-                        defaults={
-                            'course_name': row['course_name'],
-                            'dept': department,
-                            'faculty': faculty
-                        }
-                    )
-                
-                self.message_user(request, "Your csv file has been imported")
-                return redirect("..")
-        
-        form = CsvImportForm()
-        payload = {"form": form}
-        return render(request, "admin/csv_import.html", payload)
-        
     def import_from_csv(self, request, queryset):
         return redirect("import-csv/")
     
     import_from_csv.short_description = "Import Courses from CSV"
 
+    def regrade(self, request, queryset):
+        graded = grade_courses(queryset.values_list('course_id', flat=True))
+        self.message_user(request, f"Stored {graded} final grades.")
+    regrade.short_description = "Recompute Final Grades"
+
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin, ExportCsvMixin):
+class StudentAdmin(IndexedSearchMixin, admin.ModelAdmin, ExportCsvMixin, CsvImportMixin):
     list_display = ('name', 'roll_no', 'dept', 'semester', 'attendance_percentage')
+    search_fields = ('name', 'roll_no')
+    search_kind = 'students'
+    csv_importer = StudentImporter
+    csv_import_form = UserCsvImportForm
     ordering = ('name', 'roll_no')
+    list_select_related = ('dept',)
+    list_filter = (AttendanceBandFilter,)
     actions = ["import_from_csv", "export_as_csv"]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overall_attendance()
+
     def attendance_percentage(self, obj):
-        return f"{obj.get_overall_attendance_percentage():.2f}%"
+        return f"{obj.overall_attendance:.2f}%"
+    attendance_percentage.admin_order_field = 'overall_attendance'
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path('import-csv/', self.import_csv)]
+        my_urls = [path('import-csv/', self.admin_site.admin_view(self.import_csv))]
         return my_urls + urls
 
-    def import_csv(self, request):
-        if request.method == "POST":
-            form = CsvImportForm(request.POST, request.FILES)
-            if form.is_valid():
-                csv_file = form.cleaned_data['csv_file']
-                decoded_file = csv_file.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                for row in reader:
-                    username = row.get('username') or row['roll_no']
-                    user, created = User.objects.get_or_create(
-                        username=username,
-                        defaults={
-                            'password': row.get('password') or row['roll_no'],
-                            'user_type': 'student'
-                        }
-                    )
-                    if not Student.objects.filter(user=user).exists():
-                        dept, _ = Department.objects.get_or_create(dept_name=row['dept_name'])
-                        Student.objects.create(
-                            user=user, roll_no=row['roll_no'], name=row['name'],
-                            dept=dept, semester=row['semester']
-                        )
-                self.message_user(request, "CSV file has been processed.")
-                return redirect("..")
-        form = CsvImportForm()
-        payload = {"form": form}
-        return render(request, "admin/csv_import.html", payload)
-
     def import_from_csv(self, request, queryset):
         return redirect("import-csv/")
     import_from_csv.short_description = "Import Students from CSV"
 
 @admin.register(Faculty)
-class FacultyAdmin(admin.ModelAdmin, ExportCsvMixin):
+class FacultyAdmin(IndexedSearchMixin, admin.ModelAdmin, ExportCsvMixin, CsvImportMixin):
     list_display = ('faculty_name', 'dept', 'title')
+    search_fields = ('faculty_name',)
+    search_kind = 'faculty'
+    csv_importer = FacultyImporter
+    csv_import_form = UserCsvImportForm
     actions = ["import_from_csv", "export_as_csv"]
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path('import-csv/', self.import_csv)]
+        my_urls = [path('import-csv/', self.admin_site.admin_view(self.import_csv))]
         return my_urls + urls
 
-    def import_csv(self, request):
-        if request.method == "POST":
-            form = CsvImportForm(request.POST, request.FILES)
-            if form.is_valid():
-                csv_file = form.cleaned_data['csv_file']
-                decoded_file = csv_file.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                for row in reader:
-                    user, created = User.objects.get_or_create(
-                        username=row['username'],
-                        defaults={
-                            'password': row.get('password') or row['username'],
-                            'user_type': 'faculty'
-                        }
-                    )
-                    if not Faculty.objects.filter(user=user).exists():
-                        dept, _ = Department.objects.get_or_create(dept_name=row['dept_name'])
-                        Faculty.objects.create(
-                            user=user, faculty_name=row['faculty_name'],
-                            dept=dept, title=row['title']
-                        )
-                self.message_user(request, "CSV file has been processed.")
-                return redirect("..")
-        form = CsvImportForm()
-        payload = {"form": form}
-        return render(request, "admin/csv_import.html", payload)
-    
     def import_from_csv(self, request, queryset):
         return redirect("import-csv/")
     import_from_csv.short_description = "Import Faculties from CSV"
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin, ExportCsvMixin):
+class CustomUserAdmin(UserAdmin, ExportCsvMixin, CsvImportMixin):
+    csv_importer = UserImporter
+    csv_import_form = UserCsvImportForm
     actions = ["export_as_csv", "import_from_csv"]
     
     fieldsets = (
@@ -191,34 +248,9 @@ class CustomUserAdmin(UserAdmin, ExportCsvMixin):
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path('import-csv/', self.import_csv)]
+        my_urls = [path('import-csv/', self.admin_site.admin_view(self.import_csv))]
         return my_urls + urls
 
-    def import_csv(self, request):
-        if request.method == "POST":
-            form = CsvImportForm(request.POST, request.FILES)
-            if form.is_valid():
-                csv_file = form.cleaned_data['csv_file']
-                decoded_file = csv_file.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                for row in reader:
-                    is_staff_value = row.get('is_staff', 'FALSE').lower() == 'true'
-                    
-                    User.objects.create_user(
-                        username=row['username'],
-                        password=row['password'],
-                        email=row['email'],
-                        first_name=row['first_name'],
-                        last_name=row['last_name'],
-                        user_type=row['user_type'],
-                        is_staff=is_staff_value 
-                    )
-                self.message_user(request, "Users have been imported from the CSV file.")
-                return redirect("..")
-        form = CsvImportForm()
-        payload = {"form": form}
-        return render(request, "admin/csv_import.html", payload)
-
     def import_from_csv(self, request, queryset):
         return redirect("import-csv/")
     import_from_csv.short_description = "Import Users from CSV"
@@ -228,42 +260,18 @@ class DepartmentAdmin(admin.ModelAdmin, ExportCsvMixin):
     actions = ["export_as_csv"]
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin, ExportCsvMixin):
+class EnrollmentAdmin(admin.ModelAdmin, ExportCsvMixin, CsvImportMixin):
     list_display = ('student', 'course', 'enrollment_date')
+    # Select boxes would list every student and course.
+    autocomplete_fields = ('student', 'course')
+    csv_importer = EnrollmentImporter
     actions = ["import_from_csv", "export_as_csv"] 
 
     def get_urls(self):
         urls = super().get_urls()
-        my_urls = [path('import-csv/', self.import_csv)]
+        my_urls = [path('import-csv/', self.admin_site.admin_view(self.import_csv))]
         return my_urls + urls
 
-    def import_csv(self, request):
-        if request.method == "POST":
-            form = CsvImportForm(request.POST, request.FILES)
-            if form.is_valid():
-                csv_file = form.cleaned_data['csv_file']
-                decoded_file = csv_file.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                
-                for row in reader:
-                    try:
-                        student = Student.objects.get(roll_no=row['student_roll_no'])
-                        course = Course.objects.get(course_code=row['course_code'])
-                        
-                        Enrollment.objects.get_or_create(
-                            student=student,
-                            course=course
-                        )
-                    except (Student.DoesNotExist, Course.DoesNotExist):
-                        continue
-                
-                self.message_user(request, "Your csv file has been imported")
-                return redirect("..")
-        
-        form = CsvImportForm()
-        payload = {"form": form}
-        return render(request, "admin/csv_import.html", payload)
-        
     def import_from_csv(self, request, queryset):
         return redirect("import-csv/")
     
@@ -271,15 +279,99 @@ class EnrollmentAdmin(admin.ModelAdmin, ExportCsvMixin):
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin, ExportCsvMixin):
     list_display = ('student', 'student_roll_no', 'course', 'date', 'status')
+    list_select_related = ('student', 'course')
     actions = ["export_as_csv"]
+    export_fields = ('attendance_id', 'student_id', 'student__roll_no', 'course_id', 'course__course_code', 'date', 'status')
     def student_roll_no(self, obj):
         return obj.student.roll_no
     student_roll_no.short_description = 'Roll No'
+    student_roll_no.admin_order_field = 'student__roll_no'
 
 @admin.register(Assessment)
 class AssessmentAdmin(admin.ModelAdmin, ExportCsvMixin):
+    list_select_related = ('course',)
     actions = ["export_as_csv"]
 
 @admin.register(Result)
 class ResultAdmin(admin.ModelAdmin, ExportCsvMixin):
-    actions = ["export_as_csv"]
\ No newline at end of file
+    list_select_related = ('student', 'assessment__course')
+    actions = ["export_as_csv"]
+    export_fields = ('result_id', 'assessment_id', 'assessment__assessment_name', 'student_id', 'student__roll_no', 'marks')
+
+@admin.register(AttendanceRiskScan)
+class AttendanceRiskScanAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'dept', 'threshold', 'pairs_scanned', 'flagged_count', 'view_flags')
+    list_select_related = ('dept',)
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path('run-scan/', self.admin_site.admin_view(require_POST(self.run_scan_view)),
+                 name='college_attendanceriskscan_run'),
+        ]
+        return my_urls + urls
+
+    def run_scan_view(self, request):
+        if not self.has_run_scan_permission(request):
+            raise PermissionDenied
+        scan = run_attendance_risk_scan()
+        self.message_user(request, f"{scan}: {scan.flagged_count} of {scan.pairs_scanned} pairs flagged.")
+        return redirect('admin:college_attendanceriskscan_changelist')
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'can_run_scan': self.has_run_scan_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    def view_flags(self, obj):
+        url = reverse('admin:college_attendanceriskflag_changelist')
+        return format_html('<a href="{}?scan__scan_id__exact={}">View flags</a>', url, obj.scan_id)
+    view_flags.short_description = 'Flags'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_run_scan_permission(self, request):
+        # Running a scan is the only way to add one, so it takes the add permission.
+        return super().has_add_permission(request)
+
+@admin.register(AttendanceRiskFlag)
+class AttendanceRiskFlagAdmin(admin.ModelAdmin, ExportCsvMixin):
+    list_display = ('student', 'student_roll_no', 'course', 'present_count', 'total_count', 'percentage')
+    list_filter = ('scan', 'course__dept')
+    list_select_related = ('student', 'course')
+    ordering = ('percentage',)
+    actions = ["export_as_csv"]
+    export_fields = ('scan_id', 'student_id', 'student__roll_no', 'student__name', 'course_id', 'course__course_code', 'present_count', 'total_count', 'percentage')
+    def student_roll_no(self, obj):
+        return obj.student.roll_no
+    student_roll_no.short_description = 'Roll No'
+    student_roll_no.admin_order_field = 'student__roll_no'
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(SyncReceipt)
+class SyncReceiptAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'user', 'kind', 'received_at')
+    list_filter = ('kind',)
+    list_select_related = ('user',)
+    search_fields = ('idempotency_key', 'user__username')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(CourseGrade)
+class CourseGradeAdmin(admin.ModelAdmin, ExportCsvMixin):
+    list_display = ('student', 'student_roll_no', 'course', 'percentage', 'letter', 'updated_at')
+    list_filter = ('letter', 'course__dept')
+    list_select_related = ('student', 'course')
+    search_fields = ('student__roll_no', 'student__name', 'course__course_code')
+    actions = ["export_as_csv"]
+    export_fields = ('student_id', 'student__roll_no', 'student__name', 'course_id', 'course__course_code', 'percentage', 'letter')
+    def student_roll_no(self, obj):
+        return obj.student.roll_no
+    student_roll_no.short_description = 'Roll No'
+    student_roll_no.admin_order_field = 'student__roll_no'
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,76 @@
+"""Gradebook statistics over Result marks.
+
+Marks are pulled as flat float arrays straight from ``values_list`` (no model
+instances), normalized to percentages of ``assessment_full_marks`` in SQL,
+and summarized in one vectorized NumPy pass. Results are cached under the
+assessment's (or course's) version, which marks entry bumps.
+"""
+import numpy as np
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from .caching import course_key, get_or_compute, get_version
+from .models import Result
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+STATS_TIMEOUT = 3600
+
+
+def _normalized_marks(results):
+    """(student_ids, percentages) arrays for a Result queryset.
+
+    Results of assessments with zero full marks have no percentage and are left out.
+    """
+    rows = results.filter(assessment__assessment_full_marks__gt=0).annotate(
+        percentage=Cast('marks', FloatField()) * 100.0
+        / Cast(F('assessment__assessment_full_marks'), FloatField())
+    ).values_list('student_id', 'percentage').order_by()
+    data = np.array(list(rows), dtype=float).reshape(-1, 2)
+    return data[:, 0].astype(np.int64), data[:, 1]
+
+
+def describe(student_ids, percentages, bins=HISTOGRAM_BINS):
+    """Summary statistics for percentage scores in the range 0-100."""
+    count = int(percentages.size)
+    if count == 0:
+        return {'count': 0}
+
+    mean = float(percentages.mean())
+    std = float(percentages.std())
+    z_scores = (percentages - mean) / std if std else np.zeros_like(percentages)
+    counts, edges = np.histogram(percentages, bins=bins, range=(0, 100))
+    return {
+        'count': count,
+        'mean': mean,
+        'median': float(np.median(percentages)),
+        'std': std,
+        'min': float(percentages.min()),
+        'max': float(percentages.max()),
+        'percentiles': dict(zip(
+            (f'p{p}' for p in PERCENTILES),
+            np.percentile(percentages, PERCENTILES).tolist(),
+        )),
+        'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()},
+        'z_scores': dict(zip(student_ids.tolist(), np.round(z_scores, 4).tolist())),
+    }
+
+
+def assessment_stats(assessment):
+    """Statistics for one assessment, as percentages of its full marks."""
+    def compute():
+        return describe(*_normalized_marks(Result.objects.filter(assessment=assessment)))
+
+    version = get_version('assessment', assessment.pk)
+    return get_or_compute(f'assessment_{assessment.pk}_stats_v{version}', compute, STATS_TIMEOUT)
+
+
+def course_stats(course):
+    """Statistics for each student's average percentage across a course's assessments."""
+    def compute():
+        student_ids, percentages = _normalized_marks(Result.objects.filter(assessment__course=course))
+        students, index = np.unique(student_ids, return_inverse=True)
+        averages = np.bincount(index, weights=percentages) / np.bincount(index) if students.size else percentages
+        return describe(students, averages)
+
+    return get_or_compute(course_key(course.pk, 'stats'), compute, STATS_TIMEOUT)
@@ -0,0 +1,195 @@
+"""Read-only JSON API over courses, students, enrollments, attendance, results and grades.
+
+Meant for integrations (LMS sync, the registrar's warehouse) that page
+through whole tables. Every endpoint pages by keyset on the primary key:
+a page is ``WHERE pk > after ORDER BY pk LIMIT n``, so the millionth row
+costs the same as the first, and the response's ``next`` link carries the
+last primary key as the ``after`` cursor. Rows come straight from
+``values()``; no model instances are built.
+
+Query parameters, all optional::
+
+    fields=a,b          columns to return (the primary key is always included)
+    after=<pk>          cursor from the previous page's ``next``
+    limit=<n>           page size, at most MAX_LIMIT
+    course=1,2          filters by id (which ones depends on the resource)
+    date_from, date_to  inclusive dates (attendance date, enrollment date)
+    updated_since       ISO date or datetime; rows written at or after it
+"""
+import datetime
+
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Attendance, Course, CourseGrade, Enrollment, Result, Student
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class ApiError(ValueError):
+    pass
+
+
+class Resource:
+    """One endpoint: its queryset, the columns it exposes and the filters it accepts.
+
+    ``fields`` maps output names to a model field name or an expression;
+    ``key`` is the output name of the primary key. ``filters`` maps query
+    parameters to the lookup that takes a list of ids, or to a function
+    that turns the ids into a filter condition.
+    """
+
+    def __init__(self, model, key, fields, filters, date_field=None):
+        self.model = model
+        self.key = key
+        self.fields = fields
+        self.filters = filters
+        self.date_field = date_field
+
+    def parameters(self):
+        names = {'fields', 'after', 'limit', 'updated_since', *self.filters}
+        if self.date_field:
+            names |= {'date_from', 'date_to'}
+        return names
+
+    def columns(self, requested):
+        if not requested:
+            names = list(self.fields)
+        else:
+            names = [name.strip() for name in requested.split(',') if name.strip()]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise ApiError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(self.fields)}.")
+            if self.key not in names:
+                names.insert(0, self.key)
+        plain = [self.fields[name] for name in names if self.fields[name] == name]
+        expressions = {name: self.fields[name] for name in names if self.fields[name] != name}
+        return plain, expressions
+
+    def queryset(self, params):
+        unknown = set(params) - self.parameters()
+        if unknown:
+            raise ApiError(f"Unknown parameter(s): {', '.join(sorted(unknown))}.")
+        queryset = self.model.objects.all()
+        for name, lookup in self.filters.items():
+            if params.get(name):
+                ids = _ids(name, params[name])
+                queryset = queryset.filter(lookup(ids) if callable(lookup) else Q(**{lookup: ids}))
+        if params.get('date_from'):
+            queryset = queryset.filter(**{f'{self.date_field}__gte': _date('date_from', params['date_from'])})
+        if params.get('date_to'):
+            queryset = queryset.filter(**{f'{self.date_field}__lte': _date('date_to', params['date_to'])})
+        if params.get('updated_since'):
+            queryset = queryset.filter(updated_at__gte=_moment(params['updated_since']))
+        return queryset
+
+
+RESOURCES = {
+    'courses': Resource(
+        Course, 'course_id',
+        fields={name: name for name in (
+            'course_id', 'course_code', 'course_name', 'dept_id', 'faculty_id', 'updated_at',
+        )},
+        filters={'course': 'pk__in', 'dept': 'dept_id__in', 'faculty': 'faculty_id__in'},
+    ),
+    'students': Resource(
+        Student, 'student_id',
+        fields={
+            'student_id': F('user_id'),
+            **{name: name for name in ('roll_no', 'name', 'dept_id', 'semester', 'updated_at')},
+        },
+        filters={
+            'course': lambda ids: Exists(Enrollment.objects.filter(student=OuterRef('pk'), course_id__in=ids)),
+            'dept': 'dept_id__in',
+        },
+    ),
+    'enrollments': Resource(
+        Enrollment, 'enrollment_id',
+        fields={name: name for name in (
+            'enrollment_id', 'student_id', 'course_id', 'enrollment_date', 'updated_at',
+        )},
+        filters={'course': 'course_id__in', 'student': 'student_id__in'},
+        date_field='enrollment_date',
+    ),
+    'attendance': Resource(
+        Attendance, 'attendance_id',
+        fields={name: name for name in (
+            'attendance_id', 'student_id', 'course_id', 'date', 'status', 'updated_at',
+        )},
+        filters={'course': 'course_id__in', 'student': 'student_id__in'},
+        date_field='date',
+    ),
+    'results': Resource(
+        Result, 'result_id',
+        fields={
+            **{name: name for name in ('result_id', 'assessment_id', 'student_id')},
+            'course_id': F('assessment__course_id'),
+            **{name: name for name in ('marks', 'updated_at')},
+        },
+        filters={
+            'course': 'assessment__course_id__in', 'assessment': 'assessment_id__in', 'student': 'student_id__in',
+        },
+    ),
+    'grades': Resource(
+        CourseGrade, 'course_grade_id',
+        fields={name: name for name in (
+            'course_grade_id', 'student_id', 'course_id', 'percentage', 'letter', 'updated_at',
+        )},
+        filters={'course': 'course_id__in', 'student': 'student_id__in'},
+    ),
+}
+
+
+def _ids(name, value):
+    try:
+        return [int(part) for part in value.split(',')]
+    except ValueError:
+        raise ApiError(f"{name} must be a comma-separated list of ids.")
+
+
+def _date(name, value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(f"{name} must be a date (YYYY-MM-DD).")
+
+
+def _moment(value):
+    try:
+        moment = parse_datetime(value) or datetime.datetime.combine(
+            datetime.date.fromisoformat(value), datetime.time.min,
+        )
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ApiError("updated_since must be an ISO date or datetime.")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _int(name, value, default):
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ApiError(f"{name} must be a non-negative integer.")
+    return int(value)
+
+
+def page(resource, params):
+    """(rows, cursor for the next page or None) for one keyset page of ``resource``."""
+    plain, expressions = resource.columns(params.get('fields'))
+    after = _int('after', params.get('after'), None)
+    limit = max(1, min(_int('limit', params.get('limit'), DEFAULT_LIMIT), MAX_LIMIT))
+
+    queryset = resource.queryset(params)
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    # One extra row tells whether there is a next page without a COUNT.
+    rows = list(queryset.order_by('pk').values(*plain, **expressions)[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1][resource.key]
+    return rows, None
@@ -0,0 +1,83 @@
+from django.db import transaction
+
+from .models import Attendance, Enrollment
+
+
+def submit_roll(course, attendance_date, present_student_ids, student_ids=None):
+    """Writes a whole day's roll for a course as one batched upsert.
+
+    Every enrolled student gets a row for ``attendance_date``; students in
+    ``present_student_ids`` are marked present and everyone else absent.
+    ``student_ids`` limits the roll to those students (one page of the
+    roster), leaving everyone else's row for the day as it is.
+    Returns a dict with the number of rows created, updated and unchanged.
+    """
+    return submit_rolls([(course.pk, attendance_date, present_student_ids, student_ids)])[0]
+
+
+def submit_rolls(rolls):
+    """Like :func:`submit_roll` for many ``(course_id, date, present_student_ids, student_ids)`` rolls.
+
+    All rolls are read with two queries and written with one upsert and
+    one bulk update. Each (course, date) should appear once. Returns the
+    counts for each roll, in order.
+    """
+    rolls = [
+        (course_id, attendance_date, set(present), None if student_ids is None else set(student_ids))
+        for course_id, attendance_date, present, student_ids in rolls
+    ]
+    if not rolls:
+        return []
+    course_ids = {course_id for course_id, _, _, _ in rolls}
+
+    with transaction.atomic():
+        rosters = {}
+        for course_id, student_id in Enrollment.objects.filter(course_id__in=course_ids).values_list('course_id', 'student_id'):
+            rosters.setdefault(course_id, []).append(student_id)
+        wanted = {(course_id, attendance_date) for course_id, attendance_date, _, _ in rolls}
+        existing = {
+            (course_id, attendance_date, student_id): (pk, status)
+            for pk, course_id, attendance_date, student_id, status in Attendance.objects.filter(
+                course_id__in=course_ids, date__in={attendance_date for _, attendance_date in wanted},
+            ).values_list('pk', 'course_id', 'date', 'student_id', 'status')
+            if (course_id, attendance_date) in wanted
+        }
+
+        to_create = []
+        to_update = []
+        counts = []
+        for course_id, attendance_date, present_student_ids, student_ids in rolls:
+            roster = rosters.get(course_id, [])
+            if student_ids is not None:
+                roster = [student_id for student_id in roster if student_id in student_ids]
+            created = updated = 0
+            for student_id in roster:
+                is_present = student_id in present_student_ids
+                row = existing.get((course_id, attendance_date, student_id))
+                if row is None:
+                    to_create.append(Attendance(
+                        student_id=student_id, course_id=course_id,
+                        date=attendance_date, status=is_present,
+                    ))
+                    created += 1
+                elif row[1] != is_present:
+                    to_update.append(Attendance(
+                        pk=row[0], student_id=student_id,
+                        course_id=course_id, date=attendance_date, status=is_present,
+                    ))
+                    updated += 1
+            counts.append({'created': created, 'updated': updated, 'unchanged': len(roster) - created - updated})
+
+        if to_create:
+            # A concurrent submission may have inserted the same rows since
+            # the read above; let the unique constraint turn those into updates.
+            Attendance.objects.bulk_create(
+                to_create,
+                update_conflicts=True,
+                unique_fields=['student', 'course', 'date'],
+                update_fields=['status', 'updated_at'],
+            )
+        if to_update:
+            Attendance.objects.bulk_update(to_update, ['status'])
+
+    return counts
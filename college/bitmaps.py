@@ -0,0 +1,263 @@
+"""Compact attendance store: one bitset per (student, course, term).
+
+A term is half a calendar year (``2025-1`` is January to June, ``2025-2``
+July to December) and bit ``n`` of a bitset is day ``n`` of the term, so a
+student's term fits in at most 23 bytes instead of one Attendance row per
+class day. ``AttendanceBitmap.present`` has the days the student was marked
+present and ``recorded`` the days they had any row; ``SessionBitmap.held``
+is the union of ``recorded`` over the course, i.e. the days class was held.
+
+Percentages and streaks come from popcounts; whole-course figures unpack
+every student's bitset into one NumPy matrix and sum it along either axis.
+The Attendance table stays the source of truth: ``build`` regenerates the
+bitmaps of the given courses from it (``manage.py build_attendance_bitmaps``
+does all of them), and with ``ATTENDANCE_BITMAPS`` on, every attendance
+write ``refresh``es the students it touched (see ``signals.py``).
+``manage.py check_attendance_bitmaps`` compares the two representations.
+"""
+import datetime
+
+import numpy as np
+from django.db import transaction
+
+from .models import Attendance, AttendanceBitmap, SessionBitmap
+
+
+def term_of(day):
+    return f'{day.year}-{1 if day.month <= 6 else 2}'
+
+
+def term_start(term):
+    year, half = term.split('-')
+    return datetime.date(int(year), 1 if half == '1' else 7, 1)
+
+
+def encode(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def decode(data):
+    return int.from_bytes(bytes(data), 'little')
+
+
+def _percentage(present, total):
+    return (present / total) * 100 if total else 0
+
+
+def _flush(course_id, present, recorded):
+    held = {}
+    for (_, term), bits in recorded.items():
+        held[term] = held.get(term, 0) | bits
+    with transaction.atomic():
+        AttendanceBitmap.objects.filter(course_id=course_id).delete()
+        SessionBitmap.objects.filter(course_id=course_id).delete()
+        AttendanceBitmap.objects.bulk_create([
+            AttendanceBitmap(
+                student_id=student_id, course_id=course_id, term=term,
+                present=encode(present.get((student_id, term), 0)), recorded=encode(bits),
+            )
+            for (student_id, term), bits in recorded.items()
+        ], batch_size=1000)
+        SessionBitmap.objects.bulk_create([
+            SessionBitmap(course_id=course_id, term=term, held=encode(bits)) for term, bits in held.items()
+        ])
+
+
+def build(course_ids=None, chunk_size=5000):
+    """Regenerates the bitmaps of ``course_ids`` (every course when None) from Attendance.
+
+    Rows are streamed one course at a time, so memory holds one course's
+    bitsets. Returns the number of courses built.
+    """
+    rows = Attendance.objects.values_list('course_id', 'student_id', 'date', 'status').order_by('course_id')
+    if course_ids is not None:
+        course_ids = set(course_ids)
+        rows = rows.filter(course_id__in=course_ids)
+    else:
+        with transaction.atomic():
+            AttendanceBitmap.objects.all().delete()
+            SessionBitmap.objects.all().delete()
+
+    built = set()
+    current, present, recorded = None, {}, {}
+    starts = {}
+    for course_id, student_id, day, status in rows.iterator(chunk_size=chunk_size):
+        if course_id != current:
+            if current is not None:
+                _flush(current, present, recorded)
+                built.add(current)
+            current, present, recorded = course_id, {}, {}
+        term = term_of(day)
+        if term not in starts:
+            starts[term] = term_start(term)
+        bit = 1 << (day - starts[term]).days
+        key = (student_id, term)
+        recorded[key] = recorded.get(key, 0) | bit
+        if status:
+            present[key] = present.get(key, 0) | bit
+    if current is not None:
+        _flush(current, present, recorded)
+        built.add(current)
+
+    # Courses whose attendance is all gone keep no stale bitmaps.
+    for course_id in (course_ids or set()) - built:
+        _flush(course_id, {}, {})
+    return len(built)
+
+
+def refresh(pairs):
+    """Regenerates the bitmaps of the given (student_id, course_id) pairs from Attendance.
+
+    Only those students' rows are read. Each course's ``held`` is then
+    re-derived from its students' ``recorded`` bitsets, for the terms the
+    pairs had bitmaps in before or have now, or every term of the course
+    for a pair whose bitmaps a cascade already deleted.
+    """
+    pairs = {tuple(pair) for pair in pairs if None not in pair}
+    if not pairs:
+        return
+    student_ids = {student_id for student_id, _ in pairs}
+    course_ids = {course_id for _, course_id in pairs}
+
+    present, recorded = {}, {}
+    rows = Attendance.objects.filter(student_id__in=student_ids, course_id__in=course_ids)
+    for student_id, course_id, day, status in rows.values_list('student_id', 'course_id', 'date', 'status'):
+        if (student_id, course_id) not in pairs:
+            continue
+        term = term_of(day)
+        bit = 1 << (day - term_start(term)).days
+        key = (student_id, course_id, term)
+        recorded[key] = recorded.get(key, 0) | bit
+        if status:
+            present[key] = present.get(key, 0) | bit
+
+    with transaction.atomic():
+        stale = [
+            (bitmap_id, student_id, course_id, term)
+            for bitmap_id, student_id, course_id, term in AttendanceBitmap.objects
+            .filter(student_id__in=student_ids, course_id__in=course_ids)
+            .values_list('bitmap_id', 'student_id', 'course_id', 'term')
+            if (student_id, course_id) in pairs
+        ]
+        AttendanceBitmap.objects.filter(bitmap_id__in=[bitmap_id for bitmap_id, _, _, _ in stale]).delete()
+        AttendanceBitmap.objects.bulk_create([
+            AttendanceBitmap(
+                student_id=student_id, course_id=course_id, term=term,
+                present=encode(present.get((student_id, course_id, term), 0)), recorded=encode(bits),
+            )
+            for (student_id, course_id, term), bits in recorded.items()
+        ], batch_size=1000)
+
+        sessions = {(course_id, term) for _, _, course_id, term in stale}
+        sessions |= {(course_id, term) for _, course_id, term in recorded}
+        seen = {(student_id, course_id) for _, student_id, course_id, _ in stale}
+        seen |= {(student_id, course_id) for student_id, course_id, _ in recorded}
+        orphaned = {course_id for _, course_id in pairs - seen}
+        if orphaned:
+            sessions |= set(SessionBitmap.objects.filter(course_id__in=orphaned).values_list('course_id', 'term'))
+        held = dict.fromkeys(sessions, 0)
+        for course_id, term, bits in AttendanceBitmap.objects.filter(
+            course_id__in={course_id for course_id, _ in sessions}, term__in={term for _, term in sessions},
+        ).values_list('course_id', 'term', 'recorded'):
+            if (course_id, term) in held:
+                held[course_id, term] |= decode(bits)
+        for (course_id, term), bits in held.items():
+            SessionBitmap.objects.filter(course_id=course_id, term=term).delete()
+            if bits:
+                SessionBitmap.objects.create(course_id=course_id, term=term, held=encode(bits))
+
+
+def _streaks(present, recorded):
+    """(current, longest) runs of consecutive present sessions, over the recorded days in order."""
+    if not recorded:
+        return 0, 0
+    present_days, recorded_days = _unpack([encode(present), encode(recorded)])
+    flags = present_days[recorded_days]
+    absent = np.flatnonzero(~flags)
+    current = int(flags.size - 1 - absent[-1]) if absent.size else int(flags.size)
+    # Run lengths are the gaps between absences (with sentinels at both ends).
+    bounds = np.concatenate([[-1], absent, [flags.size]])
+    return current, int(np.diff(bounds).max() - 1)
+
+
+def _unpack(bitsets, width=None):
+    """Boolean matrix with one row per bitset and one column per day."""
+    width = width or max((len(bits) for bits in bitsets), default=0)
+    buffer = b''.join(bytes(bits).ljust(width, b'\0') for bits in bitsets)
+    matrix = np.frombuffer(buffer, dtype=np.uint8).reshape(len(bitsets), width)
+    return np.unpackbits(matrix, axis=1, bitorder='little').astype(bool)
+
+
+def sessions_held(course_id, term):
+    """Dates the course held class in ``term``, oldest first."""
+    held = SessionBitmap.objects.filter(course_id=course_id, term=term).values_list('held', flat=True).first()
+    if held is None:
+        return []
+    start = term_start(term)
+    return [start + datetime.timedelta(days=int(day)) for day in np.flatnonzero(_unpack([held])[0])]
+
+
+def student_summary(student_id, course_id):
+    """Present/total counts, percentage and streaks for one student in one course, over all terms."""
+    bitmaps = sorted(
+        AttendanceBitmap.objects.filter(student_id=student_id, course_id=course_id)
+        .values_list('term', 'present', 'recorded'),
+        key=lambda row: term_start(row[0]),
+    )
+    # Concatenating the terms in order lets streaks run across a term boundary.
+    present = recorded = 0
+    offset = 0
+    for term, term_present, term_recorded in bitmaps:
+        present |= decode(term_present) << offset
+        recorded |= decode(term_recorded) << offset
+        offset += 8 * len(bytes(term_recorded))
+    present_count, total_count = present.bit_count(), recorded.bit_count()
+    current, longest = _streaks(present, recorded)
+    return {
+        'present_count': present_count,
+        'total_count': total_count,
+        'percentage': _percentage(present_count, total_count),
+        'current_streak': current,
+        'longest_streak': longest,
+    }
+
+
+def course_summary(course_id, term):
+    """Per-student percentages and per-session counts for a course in one term, from its bitmaps.
+
+    Returns ``{'students': {student_id: {...}}, 'sessions': [...]}`` where
+    each session has ``date``, ``present_count`` and ``total_count``, newest
+    first as in ``course_page.attendance_history``.
+    """
+    rows = list(
+        AttendanceBitmap.objects.filter(course_id=course_id, term=term)
+        .values_list('student_id', 'present', 'recorded').order_by('student_id')
+    )
+    if not rows:
+        return {'students': {}, 'sessions': []}
+    student_ids = [student_id for student_id, _, _ in rows]
+    width = max(len(bytes(bits)) for _, _, bits in rows)
+    present = _unpack([bits for _, bits, _ in rows], width)
+    recorded = _unpack([bits for _, _, bits in rows], width)
+
+    present_counts = present.sum(axis=1)
+    total_counts = recorded.sum(axis=1)
+    session_present = present.sum(axis=0)
+    session_total = recorded.sum(axis=0)
+    start = term_start(term)
+    return {
+        'students': {
+            student_id: {
+                'present_count': int(p), 'total_count': int(t), 'percentage': _percentage(int(p), int(t)),
+            }
+            for student_id, p, t in zip(student_ids, present_counts, total_counts)
+        },
+        'sessions': [
+            {
+                'date': start + datetime.timedelta(days=int(day)),
+                'present_count': int(session_present[day]),
+                'total_count': int(session_total[day]),
+            }
+            for day in np.flatnonzero(session_total)[::-1]
+        ],
+    }
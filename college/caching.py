@@ -0,0 +1,136 @@
+"""Versioned, single-flight caching for per-course and per-student data.
+
+Every course and student has a version number stored in the cache. Keys
+for cached data embed (or are checked against) those versions, so
+invalidating an entity is a single ``incr`` (see ``bump_version``) and
+stale entries simply age out. Versions are millisecond timestamps no
+earlier than the entity's last change.
+Only materialized values (lists, dicts) should be cached, never querysets.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import record_cache
+from .replicas import reading_from_replica
+
+_MISSING = object()
+
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 0.05
+LOCK_ATTEMPTS = 20
+
+
+def version_key(kind, pk):
+    return f'{kind}_{pk}_version'
+
+
+def _initial_version():
+    # Time based, so a version key that was evicted never restarts at a
+    # number whose data might still be cached.
+    return int(time.time() * 1000)
+
+
+def _add_version(key):
+    version = _initial_version()
+    if not cache.add(key, version, None):
+        version = cache.get(key, version)
+    return version
+
+
+def get_version(kind, pk):
+    key = version_key(kind, pk)
+    version = cache.get(key)
+    record_cache(key, version is not None)
+    if version is None:
+        version = _add_version(key)
+    return version
+
+
+def get_stamps(entities):
+    """Current versions for (kind, pk) pairs, of any mix of kinds, with a single cache read."""
+    keys = {version_key(kind, pk): (kind, pk) for kind, pk in entities}
+    found = cache.get_many(list(keys))
+    stamps = {}
+    for key, entity in keys.items():
+        record_cache(key, key in found)
+        stamps[entity] = found[key] if key in found else _add_version(key)
+    return stamps
+
+
+def get_versions(kind, pks):
+    """Current versions for many entities of one kind with a single cache read."""
+    return {pk: version for (_, pk), version in get_stamps((kind, pk) for pk in pks).items()}
+
+
+def bump_version(kind, *pks):
+    """Invalidates everything cached for the given entities once the current transaction commits."""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        transaction.on_commit(lambda: _bump(kind, pks))
+
+
+def _bump(kind, pks):
+    for pk in pks:
+        key = version_key(kind, pk)
+        now = _initial_version()
+        try:
+            version = cache.incr(key)
+        except ValueError:
+            version = None
+        # Keep versions at or after the time of the last change, so they
+        # double as Last-Modified timestamps (see conditional.py).
+        if version is None or version < now:
+            cache.set(key, now, None)
+
+
+def course_version(course_id):
+    return get_version('course', course_id)
+
+
+def course_key(course_id, name, version=None):
+    if version is None:
+        version = course_version(course_id)
+    return f'course_{course_id}_{name}_v{version}'
+
+
+def bump_course_version(*course_ids):
+    bump_version('course', *course_ids)
+
+
+def bump_student_version(*student_ids):
+    bump_version('student', *student_ids)
+
+
+def get_or_compute(key, compute, timeout):
+    """Returns the cached value for ``key``, computing it at most once at a time.
+
+    When the key is missing, one caller takes a short-lived lock and runs
+    ``compute``; concurrent callers poll for its result instead of hitting
+    the database too. If the lock holder takes too long they fall back to
+    computing the value themselves. A value computed from a replica is
+    returned but not stored, as the replica may be behind ``key``'s version.
+    """
+    value = cache.get(key, _MISSING)
+    record_cache(key, value is not _MISSING)
+    if value is not _MISSING:
+        return value
+    if reading_from_replica():
+        return compute()
+
+    lock_key = f'{key}_lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            try:
+                value = compute()
+                cache.set(key, value, timeout)
+                return value
+            finally:
+                cache.delete(lock_key)
+        time.sleep(LOCK_WAIT)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return compute()
+
@@ -0,0 +1,144 @@
+"""Conditional GET (ETag / Last-Modified) from the cache version stamps.
+
+``versioned_etag`` answers a GET with 304 Not Modified before the view
+runs when none of the entities the page depends on has changed. The
+version lookup is a single ``get_many`` (see ``caching.get_stamps``).
+
+A weak ETag lists every ``kind:pk:version`` it covers, for example
+``W/"course:4:1735689600123;user:7:1735689500000;2025-01-06"``. Pages
+whose dependencies are only known once the view has run (the courses on
+a student's dashboard, the course of an assessment) name those kinds in
+``discovered``. Their entities are read back from the ETag the browser
+sends, which is safe because adding or removing one also bumps an entity
+that is always checked (enrolling bumps the student, whether through a
+save or the enrollment importer; moving an assessment bumps the
+assessment). Pages read from a replica get no ETag or Last-Modified.
+"""
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
+
+from .caching import get_stamps
+from .replicas import reading_from_replica
+
+# Most entities accepted from one If-None-Match header.
+MAX_ETAG_ENTITIES = 64
+
+
+def make_etag(stamps, tokens=()):
+    parts = [f'{kind}:{pk}:{version}' for (kind, pk), version in sorted(stamps.items())]
+    return 'W/"%s"' % ';'.join(parts + list(tokens))
+
+
+def _last_modified(stamps):
+    """Last-Modified (in seconds) for the stamps, or None while that second is still running.
+
+    HTTP dates have one-second resolution; a date handed out mid-second
+    would also match a change made later in the same second.
+    """
+    if not stamps:
+        return None
+    newest = max(stamps.values()) // 1000
+    return newest if newest < int(time.time()) else None
+
+
+def _etag_entities(etag, kinds):
+    entities = set()
+    for part in etag.removeprefix('W/').strip('"').split(';'):
+        kind, _, rest = part.partition(':')
+        pk, _, _ = rest.partition(':')
+        if kind in kinds and pk.isdigit():
+            entities.add((kind, int(pk)))
+    return entities
+
+
+class _Conditional:
+    def __init__(self, entities, extra, discovered):
+        self.entities = entities
+        self.extra = extra
+        self.discovered = set(discovered)
+
+    def before(self, request, user, kwargs):
+        """(304 response or None, stamps, tokens) for a GET, checked against the request's validators."""
+        required = set(self.entities(user, **kwargs))
+        tokens = tuple(self.extra(request)) if self.extra else ()
+        kinds = self.discovered | {kind for kind, _ in required}
+
+        candidates = {}
+        if self.discovered:
+            for etag in parse_etags(request.headers.get('If-None-Match', ''))[:MAX_ETAG_ENTITIES]:
+                listed = _etag_entities(etag, kinds)
+                if required <= listed and len(listed) <= MAX_ETAG_ENTITIES:
+                    candidates[etag] = listed
+        stamps = get_stamps(required.union(*candidates.values()))
+
+        if not self.discovered:
+            return self._conditional(request, stamps, tokens, last_modified=True), stamps, tokens
+        for listed in candidates.values():
+            response = self._conditional(request, {e: stamps[e] for e in listed}, tokens)
+            if response is not None:
+                return response, stamps, tokens
+        return None, stamps, tokens
+
+    def _conditional(self, request, stamps, tokens, last_modified=False):
+        return get_conditional_response(
+            request,
+            etag=make_etag(stamps, tokens),
+            last_modified=_last_modified(stamps) if last_modified else None,
+        )
+
+    def after(self, request, response, stamps, tokens):
+        if response.status_code != 200:
+            return response
+        # Browsers may keep the page but must revalidate it on every use.
+        patch_cache_control(response, private=True, no_cache=True)
+        if reading_from_replica():
+            # The replica may be behind the stamps; an ETag would let the
+            # browser keep its rows as current until the next write.
+            return response
+        discovered = set(getattr(response, 'version_entities', ())) - set(stamps)
+        if discovered:
+            stamps = {**stamps, **get_stamps(discovered)}
+        response.headers['ETag'] = make_etag(stamps, tokens)
+        last_modified = _last_modified(stamps)
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+def versioned_etag(entities, extra=None, discovered=()):
+    """Decorator for GET views whose page depends only on versioned entities.
+
+    ``entities(user, **view_kwargs)`` returns the ``(kind, pk)`` pairs to
+    check. ``extra(request)`` returns strings that also vary the page (a
+    date from the query string, say). A view with ``discovered`` kinds
+    sets ``response.version_entities`` to the pairs of those kinds it used.
+    """
+    conditional = _Conditional(entities, extra, discovered)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                user = await request.auser()
+                not_modified, stamps, tokens = await sync_to_async(conditional.before)(request, user, kwargs)
+                if not_modified is not None:
+                    return not_modified
+                response = await view(request, *args, **kwargs)
+                return await sync_to_async(conditional.after)(request, response, stamps, tokens)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return view(request, *args, **kwargs)
+                not_modified, stamps, tokens = conditional.before(request, request.user, kwargs)
+                if not_modified is not None:
+                    return not_modified
+                return conditional.after(request, view(request, *args, **kwargs), stamps, tokens)
+        return wrapper
+    return decorator
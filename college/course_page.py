@@ -0,0 +1,89 @@
+"""Bounded reads for the course page: an attendance history window and a roster page.
+
+Both are keyset paginated (history on the date, the roster on the roll
+number), so a page costs the same at the end of a long semester as on the
+first day. The history counts, for each date, the students marked present
+against the rows recorded that day, i.e. the roster as it was then.
+"""
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Attendance, AttendanceRollup, Student, rollup_percentage
+
+HISTORY_SESSIONS = 14
+MAX_HISTORY_SESSIONS = 60
+ROSTER_PAGE_SIZE = 50
+
+
+def _keyset(queryset, field, size, after=None, before=None, descending=False):
+    """(rows, cursor for the previous page, cursor for the next page) ordered on ``field``.
+
+    ``after`` continues past a row, ``before`` goes back from one; a cursor
+    is None when there is no such page.
+    """
+    forward, backward = ('lt', 'gt') if descending else ('gt', 'lt')
+    order = f'-{field}' if descending else field
+    if before is not None:
+        rows = list(
+            queryset.filter(**{f'{field}__{backward}': before})
+            .order_by(field if descending else f'-{field}')[:size + 1]
+        )
+        has_previous, has_next = len(rows) > size, True
+        rows = rows[:size][::-1]
+    else:
+        if after is not None:
+            queryset = queryset.filter(**{f'{field}__{forward}': after})
+        rows = list(queryset.order_by(order)[:size + 1])
+        has_previous, has_next = after is not None, len(rows) > size
+        rows = rows[:size]
+
+    def cursor(row):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    return (
+        rows,
+        cursor(rows[0]) if rows and has_previous else None,
+        cursor(rows[-1]) if rows and has_next else None,
+    )
+
+
+def attendance_history(course_id, sessions=HISTORY_SESSIONS, older_than=None, newer_than=None):
+    """One window of per-date attendance counts, newest first.
+
+    Returns ``{'records': [...], 'older': date, 'newer': date}`` where
+    ``older``/``newer`` are the cursors for the neighbouring windows (None
+    at either end). Each record has ``date``, ``present_count`` and
+    ``total_count``.
+    """
+    summary = (
+        Attendance.objects.filter(course_id=course_id)
+        .values('date')
+        .annotate(present_count=Count('pk', filter=Q(status=True)), total_count=Count('pk'))
+    )
+    records, newer, older = _keyset(
+        summary, 'date', sessions, after=older_than, before=newer_than, descending=True,
+    )
+    return {'records': records, 'older': older, 'newer': newer}
+
+
+def roster_page(course_id, view_date, query='', after=None, before=None, size=ROSTER_PAGE_SIZE):
+    """One page of the course's students ordered by roll number, optionally searched.
+
+    Each student is annotated with ``attendance_percentage`` (from the
+    rollup) and ``is_present_today`` (for ``view_date``). Returns
+    ``{'students': [...], 'previous': roll_no, 'next': roll_no}`` with the
+    cursors for the neighbouring pages (None at either end).
+    """
+    rollup = AttendanceRollup.objects.filter(course_id=course_id, student=OuterRef('pk'))
+    students = Student.objects.filter(enrollment__course_id=course_id).annotate(
+        attendance_percentage=Coalesce(
+            Subquery(rollup.annotate(percentage=rollup_percentage()).values('percentage')[:1]), Value(0.0),
+        ),
+        is_present_today=Exists(Attendance.objects.filter(
+            course_id=course_id, date=view_date, status=True, student=OuterRef('pk'),
+        )),
+    )
+    if query:
+        students = students.filter(Q(name__icontains=query) | Q(roll_no__icontains=query))
+    rows, previous, following = _keyset(students, 'roll_no', size, after=after, before=before)
+    return {'students': rows, 'previous': previous, 'next': following}
@@ -0,0 +1,171 @@
+"""Precomputed read model for the student dashboard.
+
+A snapshot holds everything ``student_dashboard.html`` renders for one
+student. It is built from three independent queries (the student, the
+enrolled courses with their attendance rollups, and the assessments with
+the student's own marks), then cached unless they were read from a
+replica (see replicas.py). A snapshot records the student's
+version and the versions of each enrolled course, read before those
+queries; any write that bumps one of them (see ``signals.py``) makes the
+next read rebuild it.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+
+from .caching import get_version, get_versions, version_key
+from .metrics import record_cache
+from .models import Assessment, AttendanceRollup, Course, Enrollment, Result, Student
+from .replicas import reading_from_replica
+
+SNAPSHOT_TIMEOUT = 3600
+
+
+def _snapshot_key(student_id):
+    return f'student_{student_id}_dashboard'
+
+
+def _snapshot_queries(student_id):
+    """The three independent queries a snapshot is built from."""
+    student = Student.objects.filter(pk=student_id).values('name', 'roll_no')
+
+    rollups = AttendanceRollup.objects.filter(student_id=student_id, course=OuterRef('pk'))
+    courses = (
+        Course.objects.filter(enrollment__student_id=student_id)
+        .annotate(
+            present=Subquery(rollups.values('present_count')[:1]),
+            total=Subquery(rollups.values('total_count')[:1]),
+        )
+        .values('course_id', 'course_name', 'course_code', 'present', 'total')
+        .order_by('course_id')
+    )
+
+    marks = Result.objects.filter(student_id=student_id, assessment=OuterRef('pk')).values('marks')[:1]
+    assessments = (
+        Assessment.objects.filter(course__enrollment__student_id=student_id)
+        .annotate(marks=Subquery(marks), course_name=F('course__course_name'))
+        .values('assessment_id', 'assessment_name', 'assessment_full_marks', 'course_name', 'marks')
+        .order_by('course_id', 'assessment_id')
+    )
+    return student, courses, assessments
+
+
+def _assemble(student, courses, assessments, student_version, course_versions):
+    return {
+        'student_version': student_version,
+        'course_versions': course_versions,
+        'student': student,
+        'attendance_data': [
+            {
+                'course': {'course_id': course['course_id'], 'course_name': course['course_name'], 'course_code': course['course_code']},
+                'percentage': (course['present'] / course['total'] * 100) if course['total'] else 0,
+            }
+            for course in courses
+        ],
+        'assessments_with_results': [
+            {
+                'assessment': {
+                    'assessment_id': assessment['assessment_id'],
+                    'assessment_name': assessment['assessment_name'],
+                    'assessment_full_marks': assessment['assessment_full_marks'],
+                    'course': {'course_name': assessment['course_name']},
+                },
+                'result': {'marks': assessment['marks']} if assessment['marks'] is not None else None,
+            }
+            for assessment in assessments
+        ],
+    }
+
+
+def _is_current(snapshot, student_version, course_versions):
+    return (
+        snapshot is not None
+        and snapshot['student_version'] == student_version
+        and course_versions == snapshot['course_versions']
+    )
+
+
+def _current_versions(student_id):
+    """The student's version and their enrolled courses' versions.
+
+    Read before any snapshot query: a write that lands while the snapshot
+    is being built then leaves it with an older version than the cache
+    has, so the next read rebuilds it instead of keeping the stale data.
+    """
+    student_version = get_version('student', student_id)
+    course_ids = Enrollment.objects.filter(student_id=student_id).values_list('course_id', flat=True)
+    return student_version, get_versions('course', list(course_ids))
+
+
+def build_student_snapshot(student_id):
+    student_version, course_versions = _current_versions(student_id)
+    student_qs, courses_qs, assessments_qs = _snapshot_queries(student_id)
+    student = student_qs.first()
+    if student is None:
+        return None
+    return _assemble(student, list(courses_qs), list(assessments_qs), student_version, course_versions)
+
+
+def get_student_snapshot(student_id):
+    """Returns the student's dashboard snapshot, rebuilding it only when a version moved.
+
+    A warm read costs two cache round trips and no database queries.
+    Returns None if there is no such student.
+    """
+    key = _snapshot_key(student_id)
+    student_version_key = version_key('student', student_id)
+    found = cache.get_many([key, student_version_key])
+    record_cache(student_version_key, student_version_key in found)
+    snapshot = found.get(key)
+    if snapshot is not None and _is_current(
+        snapshot, found.get(student_version_key), get_versions('course', snapshot['course_versions'])
+    ):
+        record_cache(key, True)
+        return snapshot
+    record_cache(key, False)
+
+    snapshot = build_student_snapshot(student_id)
+    if snapshot is not None and not reading_from_replica():
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_student_snapshot(student_id):
+    """Async get_student_snapshot().
+
+    The async ORM runs every query through ``sync_to_async`` on one shared
+    thread, so on a rebuild the three queries still run one after another;
+    awaiting them only keeps the event loop free meanwhile.
+    """
+    key = _snapshot_key(student_id)
+    student_version_key = version_key('student', student_id)
+    found = await cache.aget_many([key, student_version_key])
+    record_cache(student_version_key, student_version_key in found)
+    snapshot = found.get(key)
+    if snapshot is not None and _is_current(
+        snapshot, found.get(student_version_key),
+        await sync_to_async(get_versions)('course', snapshot['course_versions']),
+    ):
+        record_cache(key, True)
+        return snapshot
+    record_cache(key, False)
+
+    student_version, course_versions = await sync_to_async(_current_versions)(student_id)
+    student_qs, courses_qs, assessments_qs = _snapshot_queries(student_id)
+    student, courses, assessments = await asyncio.gather(
+        student_qs.afirst(),
+        _alist(courses_qs),
+        _alist(assessments_qs),
+    )
+    if student is None:
+        return None
+    snapshot = _assemble(student, courses, assessments, student_version, course_versions)
+    if not reading_from_replica():
+        await cache.aset(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
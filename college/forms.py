@@ -26,5 +26,12 @@ class AssignmentForm(forms.ModelForm):
 class CsvImportForm(forms.Form):
     csv_file = forms.FileField()
 
+class UserCsvImportForm(CsvImportForm):
+    defer_passwords = forms.BooleanField(
+        required=False,
+        label="Send set-password links instead",
+        help_text="Skip hashing the CSV passwords; download a CSV of links where each user sets their own.",
+    )
+
 class MarksEntryForm(forms.Form):
     marks = forms.DecimalField(max_digits=5, decimal_places=2, required=True)
\ No newline at end of file
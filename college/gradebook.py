@@ -0,0 +1,132 @@
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_course_version, bump_version
+from .grading import grade_courses
+from .forms import MarksEntryForm
+from .models import Enrollment, Result, Student
+
+
+def _clean_marks(raw, full_marks):
+    marks = MarksEntryForm.base_fields['marks'].clean(raw)
+    if marks < 0:
+        raise ValidationError("Marks cannot be negative.")
+    if marks > full_marks:
+        raise ValidationError(f"Marks cannot exceed full marks ({full_marks}).")
+    return marks
+
+
+def validate_marks(assessment, entries):
+    """Checks raw marks against the roster and ``assessment_full_marks``.
+
+    ``entries`` maps student ids to raw mark values; blank values are skipped.
+    Returns ``(cleaned, errors)``, both keyed by student id.
+    """
+    roster = set(
+        Enrollment.objects.filter(course_id=assessment.course_id).values_list('student_id', flat=True)
+    )
+    cleaned = {}
+    errors = {}
+    for student_id, raw in entries.items():
+        if raw is None or str(raw).strip() == '':
+            continue
+        if student_id not in roster:
+            errors[student_id] = "Student is not enrolled in this course."
+            continue
+        try:
+            cleaned[student_id] = _clean_marks(raw, assessment.assessment_full_marks)
+        except ValidationError as e:
+            errors[student_id] = ' '.join(e.messages)
+    return cleaned, errors
+
+
+def save_marks(assessment, cleaned):
+    """Upserts already validated marks with one read, one bulk_create and one bulk_update."""
+    with transaction.atomic():
+        existing = {
+            student_id: (pk, marks)
+            for pk, student_id, marks in Result.objects.filter(
+                assessment=assessment, student_id__in=cleaned
+            ).values_list('pk', 'student_id', 'marks')
+        }
+        to_create = []
+        to_update = []
+        now = timezone.now()
+        for student_id, marks in cleaned.items():
+            if student_id not in existing:
+                to_create.append(Result(assessment=assessment, student_id=student_id, marks=marks))
+            elif existing[student_id][1] != marks:
+                to_update.append(Result(
+                    pk=existing[student_id][0], assessment=assessment,
+                    student_id=student_id, marks=marks, updated_at=now,
+                ))
+        if to_create:
+            # A concurrent entry may have inserted the same results since the
+            # read above; let the unique constraint turn those into updates.
+            Result.objects.bulk_create(
+                to_create,
+                update_conflicts=True,
+                unique_fields=['assessment', 'student'],
+                update_fields=['marks', 'updated_at'],
+            )
+        if to_update:
+            Result.objects.bulk_update(to_update, ['marks', 'updated_at'])
+        # Bulk writes skip the Result signals; one course bump covers every
+        # student dashboard that shows this assessment.
+        if to_create or to_update:
+            bump_version('assessment', assessment.pk)
+            bump_course_version(assessment.course_id)
+            grade_courses([assessment.course_id], [result.student_id for result in to_create + to_update])
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'unchanged': len(cleaned) - len(to_create) - len(to_update),
+    }
+
+
+def enter_marks(assessment, entries):
+    """Validates and upserts marks for one assessment in a constant number of queries.
+
+    Nothing is written unless every entry is valid. Returns a dict with
+    ``created``/``updated``/``unchanged`` counts and an ``errors`` dict keyed
+    like ``entries``.
+    """
+    cleaned, errors = validate_marks(assessment, entries)
+    if errors or not cleaned:
+        return {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': errors}
+    return {**save_marks(assessment, cleaned), 'errors': {}}
+
+
+def read_marks_upload(upload):
+    """Reads ``roll_no,marks`` rows from an uploaded CSV file."""
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig'))
+    return [(row.get('roll_no', '').strip(), row.get('marks')) for row in reader]
+
+
+def enter_marks_by_roll_no(assessment, rows):
+    """Like :func:`enter_marks` for ``(roll_no, marks)`` rows; errors are keyed by roll number."""
+    rows = list(rows)
+    roll_to_student = dict(
+        Student.objects.filter(roll_no__in={roll_no for roll_no, _ in rows})
+        .values_list('roll_no', 'pk')
+    )
+    student_to_roll = {pk: roll_no for roll_no, pk in roll_to_student.items()}
+
+    entries = {}
+    errors = {}
+    for roll_no, marks in rows:
+        if roll_no in roll_to_student:
+            entries[roll_to_student[roll_no]] = marks
+        else:
+            errors[roll_no] = "Unknown roll number."
+
+    cleaned, invalid = validate_marks(assessment, entries)
+    errors.update((student_to_roll[pk], message) for pk, message in invalid.items())
+    if errors or not cleaned:
+        return {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': errors}
+    return {**save_marks(assessment, cleaned), 'errors': {}}
@@ -0,0 +1,151 @@
+"""Final course grades: a weighted percentage and a letter per enrolled student.
+
+Each assessment type counts for its share of the grade, as set by the
+course's GradeWeight rows (``DEFAULT_WEIGHTS`` when it has none). Within a
+type, a student's score is their total marks over the type's total full
+marks, so a missing Result counts as zero. Types with no assessments yet
+are left out and the remaining weights scaled up to 100%.
+
+``grade_courses`` grades any number of courses (or some students in them)
+from four reads, an upsert and a delete, independent of how many
+assessments and results there are. The signals in ``signals.py``,
+``gradebook.save_marks`` and the enrollment importer call it for just the
+affected students or course on every change; ``manage.py grade_courses``
+regrades everything at term end.
+"""
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+import django
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Assessment, Course, CourseGrade, Enrollment, GradeWeight, Result
+
+DEFAULT_WEIGHTS = {'exam': Decimal(60), 'assignment': Decimal(25), 'project': Decimal(15)}
+
+# Lowest percentage for each letter, best first.
+LETTER_GRADES = (
+    (Decimal(90), 'A+'),
+    (Decimal(80), 'A'),
+    (Decimal(70), 'B'),
+    (Decimal(60), 'C'),
+    (Decimal(50), 'D'),
+    (Decimal(40), 'E'),
+    (Decimal(0), 'F'),
+)
+
+GRADE_CHUNK_SIZE = 50
+
+_CENT = Decimal('0.01')
+
+
+def letter_for(percentage):
+    for lowest, letter in LETTER_GRADES:
+        if percentage >= lowest:
+            return letter
+    return LETTER_GRADES[-1][1]
+
+
+def weighted_percentage(weights, full_marks, marks):
+    """Weighted percentage from per-type ``weights``, ``full_marks`` and obtained ``marks``, or None.
+
+    None means there is nothing to grade yet: no type has both a weight and
+    an assessment.
+    """
+    counted = [kind for kind, full in full_marks.items() if full and weights.get(kind)]
+    total_weight = sum(weights[kind] for kind in counted)
+    if not total_weight:
+        return None
+    score = sum(weights[kind] * marks.get(kind, 0) / full_marks[kind] for kind in counted)
+    return min(100 * score / total_weight, Decimal(100)).quantize(_CENT)
+
+
+def _weights(course_ids):
+    configured = {}
+    for course_id, kind, weight in GradeWeight.objects.filter(course_id__in=course_ids).values_list(
+        'course_id', 'type', 'weight',
+    ):
+        configured.setdefault(course_id, {})[kind] = weight
+    return {course_id: configured.get(course_id, DEFAULT_WEIGHTS) for course_id in course_ids}
+
+
+def grade_courses(course_ids, student_ids=None):
+    """Recomputes and stores the grades of ``course_ids``, only for ``student_ids`` when given.
+
+    Grades of students no longer enrolled, or of courses with nothing to
+    grade, are deleted. Returns the number of grades stored.
+    """
+    course_ids = list(course_ids)
+    if not course_ids:
+        return 0
+    results = Result.objects.filter(assessment__course_id__in=course_ids)
+    enrollments = Enrollment.objects.filter(course_id__in=course_ids)
+    grades = CourseGrade.objects.filter(course_id__in=course_ids)
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        results = results.filter(student_id__in=student_ids)
+        enrollments = enrollments.filter(student_id__in=student_ids)
+        grades = grades.filter(student_id__in=student_ids)
+
+    weights = _weights(course_ids)
+    full_marks = {}
+    for course_id, kind, full in (
+        Assessment.objects.filter(course_id__in=course_ids)
+        .values_list('course_id', 'type').annotate(full=Sum('assessment_full_marks')).order_by()
+    ):
+        full_marks.setdefault(course_id, {})[kind] = full
+    marks = {}
+    for course_id, student_id, kind, obtained in (
+        results.values_list('assessment__course_id', 'student_id', 'assessment__type')
+        .annotate(obtained=Sum('marks')).order_by()
+    ):
+        marks.setdefault((course_id, student_id), {})[kind] = obtained
+
+    now = timezone.now()
+    to_store = []
+    for course_id, student_id in enrollments.values_list('course_id', 'student_id'):
+        percentage = weighted_percentage(
+            weights[course_id], full_marks.get(course_id, {}), marks.get((course_id, student_id), {}),
+        )
+        if percentage is not None:
+            to_store.append(CourseGrade(
+                student_id=student_id, course_id=course_id,
+                percentage=percentage, letter=letter_for(percentage), updated_at=now,
+            ))
+
+    with transaction.atomic(savepoint=False):
+        CourseGrade.objects.bulk_create(
+            to_store, batch_size=1000, update_conflicts=True,
+            unique_fields=['student', 'course'], update_fields=['percentage', 'letter', 'updated_at'],
+        )
+        # Whatever this pass didn't write is stale.
+        grades.filter(updated_at__lt=now).delete()
+    return len(to_store)
+
+
+def _grade_chunk(course_ids):
+    return grade_courses(course_ids)
+
+
+def grade_all(workers=1, chunk_size=GRADE_CHUNK_SIZE, course_ids=None):
+    """Grades every course (or ``course_ids``), ``chunk_size`` courses per task across ``workers`` processes.
+
+    Returns the number of grades stored.
+    """
+    if course_ids is None:
+        course_ids = Course.objects.order_by('course_id').values_list('course_id', flat=True)
+    course_ids = list(course_ids)
+    chunks = [course_ids[start:start + chunk_size] for start in range(0, len(course_ids), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        return sum(grade_courses(chunk) for chunk in chunks)
+    # Spawned rather than forked, like provisioning's hashing pool.
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        return sum(pool.map(_grade_chunk, chunks, chunksize=max(1, math.ceil(len(chunks) / (workers * 4)))))
@@ -0,0 +1,344 @@
+import csv
+import io
+import time
+from itertools import islice
+
+from django.db import transaction
+
+from . import search
+from .caching import bump_course_version, bump_student_version
+from .grading import grade_courses
+from .models import User, Department, Faculty, Course, Student, Enrollment
+from .provisioning import PasswordHasher, set_password_link
+from .roles import invalidate_role
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class ImportReport:
+    """Counts and per-row rejects collected while importing a CSV file."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.rejects = []
+        # (username, path) for users who set their own password on first visit.
+        self.setup_links = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.passwords_hashed = 0
+        self.hash_seconds = 0.0
+
+    def reject(self, line_no, reason):
+        self.rejects.append((line_no, reason))
+
+    def summary(self, max_rejects=20):
+        text = (
+            f"{self.created} created, {self.updated} updated, "
+            f"{self.skipped} skipped, {len(self.rejects)} rejected"
+            f" in {self.seconds:.1f}s ({self.created / (self.seconds or 1):.0f} rows/s)."
+        )
+        if self.passwords_hashed:
+            text += f" Hashed {self.passwords_hashed} passwords in {self.hash_seconds:.1f}s."
+        if self.setup_links:
+            text += f" {len(self.setup_links)} users must set their password from a set-password link."
+        if self.rejects:
+            shown = "; ".join(f"line {line_no}: {reason}" for line_no, reason in self.rejects[:max_rejects])
+            more = len(self.rejects) - max_rejects
+            text += f" Rejected rows: {shown}" + (f" (and {more} more)" if more > 0 else "")
+        return text
+
+
+def iter_csv_chunks(upload, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Streams an uploaded CSV as lists of ``(line_no, row)`` without reading it all into memory."""
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CsvImporter:
+    """Base class for the admin CSV importers.
+
+    Subclasses list their ``required_columns`` and implement
+    ``import_chunk(rows, report)``, which receives one chunk of
+    ``(line_no, row)`` pairs and should resolve lookups for the whole chunk
+    with a single query per model before writing in bulk.
+    """
+
+    required_columns = ()
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, defer_passwords=False):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.defer_passwords = defer_passwords
+
+    def run(self, upload):
+        report = ImportReport()
+        # The hasher's process pool only starts if a chunk has passwords to hash.
+        with PasswordHasher(self.workers, defer=self.defer_passwords) as self.hasher:
+            for chunk in iter_csv_chunks(upload, self.chunk_size):
+                valid = []
+                for line_no, row in chunk:
+                    missing = [column for column in self.required_columns if not (row.get(column) or '').strip()]
+                    if missing:
+                        report.reject(line_no, f"missing {', '.join(missing)}")
+                    else:
+                        valid.append((line_no, {key: (value or '').strip() for key, value in row.items() if key}))
+                with transaction.atomic():
+                    self.import_chunk(valid, report)
+        report.seconds = time.perf_counter() - report.started
+        report.passwords_hashed = self.hasher.hashed
+        report.hash_seconds = self.hasher.seconds
+        return report
+
+    def import_chunk(self, rows, report):
+        raise NotImplementedError
+
+
+def _departments(names, create_missing=False):
+    departments = {dept.dept_name: dept for dept in Department.objects.filter(dept_name__in=names)}
+    missing = set(names) - set(departments)
+    if create_missing and missing:
+        Department.objects.bulk_create(
+            [Department(dept_name=name) for name in missing], ignore_conflicts=True
+        )
+        departments.update(
+            (dept.dept_name, dept) for dept in Department.objects.filter(dept_name__in=missing)
+        )
+    return departments
+
+
+class CourseImporter(CsvImporter):
+    required_columns = ('course_code', 'course_name', 'dept_name')
+
+    def import_chunk(self, rows, report):
+        departments = _departments({row['dept_name'] for _, row in rows})
+        faculty_ids = dict(
+            Faculty.objects.filter(
+                user__username__in={row['faculty_username'] for _, row in rows if row.get('faculty_username')}
+            ).values_list('user__username', 'pk')
+        )
+        existing = set(
+            Course.objects.filter(course_code__in={row['course_code'] for _, row in rows})
+            .values_list('course_code', flat=True)
+        )
+
+        to_create = {}
+        for line_no, row in rows:
+            if row['dept_name'] not in departments:
+                report.reject(line_no, f"unknown department {row['dept_name']!r}")
+            elif row['course_code'] in existing or row['course_code'] in to_create:
+                report.skipped += 1
+            else:
+                to_create[row['course_code']] = Course(
+                    course_code=row['course_code'],
+                    course_name=row['course_name'],
+                    dept=departments[row['dept_name']],
+                    faculty_id=faculty_ids.get(row.get('faculty_username')),
+                )
+        report.created += len(Course.objects.bulk_create(to_create.values()))
+        if to_create:
+            search.invalidate('courses')
+
+
+class _ProfileImporter(CsvImporter):
+    """Shared logic for importers that create a User plus a Student/Faculty profile."""
+
+    user_type = None
+    profile_model = None
+    search_kind = None
+
+    def username(self, row):
+        return row['username']
+
+    def default_password(self, row):
+        raise NotImplementedError
+
+    def build_profile(self, user, dept, row):
+        raise NotImplementedError
+
+    def reject_reason(self, row):
+        return None
+
+    def import_chunk(self, rows, report):
+        users = {
+            user.username: user
+            for user in User.objects.filter(username__in={self.username(row) for _, row in rows})
+        }
+        with_profile = set(
+            self.profile_model.objects.filter(user__in=users.values()).values_list('pk', flat=True)
+        )
+
+        accepted = {}
+        for line_no, row in rows:
+            username = self.username(row)
+            user = users.get(username)
+            if (user is not None and user.pk in with_profile) or username in accepted:
+                report.skipped += 1
+                continue
+            reason = self.reject_reason(row)
+            if reason:
+                report.reject(line_no, reason)
+                continue
+            accepted[username] = row
+
+        new_rows = {username: row for username, row in accepted.items() if username not in users}
+        hashes = self.hasher.hash_many(row.get('password') or self.default_password(row) for row in new_rows.values())
+        new_users = [
+            User(username=username, password=password, user_type=self.user_type)
+            for username, password in zip(new_rows, hashes)
+        ]
+        if new_users:
+            User.objects.bulk_create(new_users)
+            created = User.objects.filter(username__in=list(new_rows))
+            users.update((user.username, user) for user in created)
+            if self.defer_passwords:
+                report.setup_links.extend((user.username, set_password_link(user)) for user in created)
+
+        departments = _departments({row['dept_name'] for row in accepted.values()}, create_missing=True)
+        profiles = [
+            self.build_profile(users[username], departments[row['dept_name']], row)
+            for username, row in accepted.items()
+        ]
+        report.created += len(self.profile_model.objects.bulk_create(profiles))
+        if profiles:
+            search.invalidate(self.search_kind)
+            # bulk_create skips the signals that drop cached roles, and an
+            # existing user may have been cached without this profile.
+            invalidate_role(*(profile.user_id for profile in profiles))
+
+
+class StudentImporter(_ProfileImporter):
+    required_columns = ('roll_no', 'name', 'dept_name', 'semester')
+    user_type = 'student'
+    profile_model = Student
+    search_kind = 'students'
+
+    def username(self, row):
+        return row.get('username') or row['roll_no']
+
+    def default_password(self, row):
+        return row['roll_no']
+
+    def import_chunk(self, rows, report):
+        self.taken_roll_nos = set(
+            Student.objects.filter(roll_no__in={row['roll_no'] for _, row in rows})
+            .values_list('roll_no', flat=True)
+        )
+        super().import_chunk(rows, report)
+
+    def reject_reason(self, row):
+        if not row['semester'].isdigit():
+            return f"invalid semester {row['semester']!r}"
+        if row['roll_no'] in self.taken_roll_nos:
+            return f"roll number {row['roll_no']!r} already exists"
+        self.taken_roll_nos.add(row['roll_no'])
+        return None
+
+    def build_profile(self, user, dept, row):
+        return Student(
+            user=user, roll_no=row['roll_no'], name=row['name'],
+            dept=dept, semester=int(row['semester']),
+        )
+
+
+class FacultyImporter(_ProfileImporter):
+    required_columns = ('username', 'faculty_name', 'dept_name', 'title')
+    user_type = 'faculty'
+    profile_model = Faculty
+    search_kind = 'faculty'
+
+    def default_password(self, row):
+        return row['username']
+
+    def reject_reason(self, row):
+        if row['title'] not in dict(Faculty.TITLE_CHOICES):
+            return f"invalid title {row['title']!r}"
+        return None
+
+    def build_profile(self, user, dept, row):
+        return Faculty(user=user, faculty_name=row['faculty_name'], dept=dept, title=row['title'])
+
+
+class UserImporter(CsvImporter):
+    required_columns = ('username', 'password', 'user_type')
+
+    def import_chunk(self, rows, report):
+        existing = set(
+            User.objects.filter(username__in={row['username'] for _, row in rows})
+            .values_list('username', flat=True)
+        )
+        user_types = dict(User.USER_TYPE_CHOICES)
+        accepted = {}
+        for line_no, row in rows:
+            if row['username'] in existing or row['username'] in accepted:
+                report.reject(line_no, f"username {row['username']!r} already exists")
+            elif row['user_type'] not in user_types:
+                report.reject(line_no, f"invalid user_type {row['user_type']!r}")
+            else:
+                accepted[row['username']] = row
+
+        hashes = self.hasher.hash_many(row['password'] for row in accepted.values())
+        to_create = [
+            User(
+                username=row['username'],
+                password=password,
+                email=User.objects.normalize_email(row.get('email', '')),
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                user_type=row['user_type'],
+                is_staff=row.get('is_staff', 'FALSE').lower() == 'true',
+            )
+            for row, password in zip(accepted.values(), hashes)
+        ]
+        report.created += len(User.objects.bulk_create(to_create))
+        invalidate_role(*(user.pk for user in to_create))
+        if self.defer_passwords and to_create:
+            report.setup_links.extend(
+                (user.username, set_password_link(user)) for user in User.objects.filter(username__in=list(accepted))
+            )
+
+
+class EnrollmentImporter(CsvImporter):
+    required_columns = ('student_roll_no', 'course_code')
+
+    def import_chunk(self, rows, report):
+        students = dict(
+            Student.objects.filter(roll_no__in={row['student_roll_no'] for _, row in rows})
+            .values_list('roll_no', 'pk')
+        )
+        courses = dict(
+            Course.objects.filter(course_code__in={row['course_code'] for _, row in rows})
+            .values_list('course_code', 'pk')
+        )
+        existing = set(
+            Enrollment.objects.filter(student_id__in=students.values(), course_id__in=courses.values())
+            .values_list('student_id', 'course_id')
+        )
+
+        to_create = {}
+        for line_no, row in rows:
+            student_id = students.get(row['student_roll_no'])
+            course_id = courses.get(row['course_code'])
+            if student_id is None:
+                report.reject(line_no, f"unknown roll number {row['student_roll_no']!r}")
+            elif course_id is None:
+                report.reject(line_no, f"unknown course code {row['course_code']!r}")
+            elif (student_id, course_id) in existing or (student_id, course_id) in to_create:
+                report.skipped += 1
+            else:
+                to_create[(student_id, course_id)] = Enrollment(student_id=student_id, course_id=course_id)
+        report.created += len(Enrollment.objects.bulk_create(to_create.values(), ignore_conflicts=True))
+        # bulk_create skips post_save, so invalidate the cached rosters and
+        # the new students' dashboards here.
+        bump_course_version(*{course_id for _, course_id in to_create})
+        bump_student_version(*{student_id for student_id, _ in to_create})
+        if to_create:
+            grade_courses(
+                {course_id for _, course_id in to_create}, {student_id for student_id, _ in to_create},
+            )
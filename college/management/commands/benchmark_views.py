@@ -0,0 +1,236 @@
+import json
+import statistics
+import time
+import uuid
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from college.models import Assessment, Attendance, Course, Student, User
+from college.provisioning import set_password_link
+from college.urls import urlpatterns
+
+# Queries each view ran on its cold (first, most expensive) request against a
+# seed_college database, i.e. the "cold q" column, as last measured. Update
+# a count when a change to the view adds or removes queries on purpose.
+MEASURED_QUERIES = {
+    'login': 0,
+    'logout': 3,
+    'select_role': 2,
+    'student_dashboard': 6,
+    'teacher_dashboard': 4,
+    'course_detail': 6,
+    'course_detail_post': 12,
+    'course_attendance_api': 7,
+    'course_stats_api': 3,
+    'add_assignment': 2,
+    'assessment_detail': 5,
+    'assessment_detail_post': 15,
+    'assessment_marks_upload': 15,
+    'assessment_stats_api': 3,
+    'metrics': 1,
+    'sync_batch': 23,
+    'api_list': 2,
+    'set_password': 5,
+    'search': 4,
+}
+# The most any admin changelist ran (the ones with joined columns).
+MEASURED_CHANGELIST_QUERIES = 6
+
+# A view fails once it runs more than QUERY_HEADROOM queries over its
+# measured count. That leaves room for a harmless extra lookup or two (a
+# session save, a permission or cache miss) without touching the numbers,
+# while an N+1 still fails: it adds a query per row, and every seeded page
+# shows dozens of rows.
+QUERY_HEADROOM = 3
+QUERY_BUDGETS = {name: count + QUERY_HEADROOM for name, count in MEASURED_QUERIES.items()}
+ADMIN_CHANGELIST_BUDGET = MEASURED_CHANGELIST_QUERIES + QUERY_HEADROOM
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests every college view and admin changelist against the current database "
+        "(e.g. one filled by seed_college), reports latency and query counts, and fails "
+        "if a view goes over its query budget. Every write is rolled back; the cache is cleared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Requests per view; the first one is cold.")
+        parser.add_argument('--only', action='append', default=[], help="Only run views whose name contains this.")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file as JSON.")
+
+    def handle(self, *args, **options):
+        course = (
+            Course.objects.filter(faculty__isnull=False, enrollment__isnull=False, assessment__isnull=False)
+            .select_related('faculty__user').order_by('course_id').first()
+        )
+        if course is None:
+            raise CommandError("No course with a teacher, students and assessments; run seed_college first.")
+        self.faculty_user = course.faculty.user
+        self.course = course
+        self.assessment = Assessment.objects.filter(course=course).order_by('assessment_id').first()
+        self.student = Student.objects.filter(enrollment__course=course).select_related('user').order_by('pk').first()
+        self.students = list(course.enrolled_students.values_list('pk', 'roll_no'))
+        # A cursor from the middle of the course's attendance, to show deep pages cost the same.
+        bounds = Attendance.objects.filter(course=course).aggregate(low=Min('pk'), high=Max('pk'))
+        self.attendance_after = ((bounds['low'] or 0) + (bounds['high'] or 0)) // 2
+
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                self.admin_user = User.objects.create_superuser('benchmark-admin', password=None)
+                self.new_user = User.objects.create_user('benchmark-new-user', password=None)
+                cases = list(self.cases())
+                if not options['only']:
+                    self.check_coverage(name for name, _, _ in cases)
+                results = [
+                    self.measure(name, user, request, options['repeat'])
+                    for name, user, request in cases
+                    if not options['only'] or any(part in name for part in options['only'])
+                ]
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        self.report(results)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+        over = [result for result in results if result['over_budget']]
+        if over:
+            raise CommandError('Over query budget: ' + ', '.join(
+                f"{result['name']} ({result['max_queries']} > {result['budget']})" for result in over
+            ))
+
+    def cases(self):
+        """(name, user, request callable) for every view and admin changelist.
+
+        Names are URL names, with ``_post`` for the POST side of a view.
+        """
+        course_id = self.course.course_id
+        assessment_id = self.assessment.assessment_id
+        today = timezone.now().date().isoformat()
+        full_marks = self.assessment.assessment_full_marks
+        present = [pk for pk, _ in self.students[::2]]
+
+        def get(name, *args, **kwargs):
+            return lambda client: client.get(reverse(name, args=args), kwargs)
+
+        def post(name, *args, **data):
+            return lambda client: client.post(reverse(name, args=args), data)
+
+        def post_json(name, *args, payload):
+            return lambda client: client.post(
+                reverse(name, args=args), json.dumps(payload), content_type='application/json',
+            )
+
+        def upload_marks(client):
+            rows = '\n'.join(f'{roll_no},{full_marks / 2}' for _, roll_no in self.students)
+            csv_file = SimpleUploadedFile('marks.csv', f'roll_no,marks\n{rows}\n'.encode(), 'text/csv')
+            return client.post(reverse('assessment_marks_upload', args=[assessment_id]), {'csv_file': csv_file})
+
+        faculty = self.faculty_user
+        yield 'login', None, get('login')
+        yield 'logout', faculty, get('logout')
+        yield 'select_role', faculty, get('select_role')
+        yield 'student_dashboard', self.student.user, get('student_dashboard')
+        yield 'teacher_dashboard', faculty, get('teacher_dashboard')
+        yield 'course_detail', faculty, get('course_detail', course_id)
+        yield 'course_detail_post', faculty, post(
+            'course_detail', course_id, attendance_date=today, **{f'student_{pk}': 'on' for pk in present},
+        )
+        yield 'course_attendance_api', faculty, post_json(
+            'course_attendance_api', course_id, payload={'date': today, 'present': present},
+        )
+        yield 'course_stats_api', faculty, get('course_stats_api', course_id)
+        yield 'add_assignment', faculty, get('add_assignment', course_id)
+        yield 'assessment_detail', faculty, get('assessment_detail', assessment_id)
+        yield 'assessment_detail_post', faculty, post(
+            'assessment_detail', assessment_id, **{f'marks_{pk}': str(full_marks) for pk, _ in self.students},
+        )
+        yield 'assessment_marks_upload', faculty, upload_marks
+        yield 'assessment_stats_api', faculty, get('assessment_stats_api', assessment_id)
+        yield 'metrics', self.admin_user, get('metrics')
+        yield 'sync_batch', faculty, lambda client: client.post(
+            reverse('sync_batch'),
+            json.dumps({'submissions': [
+                {'key': str(uuid.uuid4()), 'type': 'attendance', 'course': course_id, 'date': today, 'present': present},
+                {'key': str(uuid.uuid4()), 'type': 'marks', 'assessment': assessment_id,
+                 'marks': {str(pk): str(full_marks) for pk, _ in self.students}},
+            ]}),
+            content_type='application/json',
+        )
+
+        yield 'api_list', self.admin_user, get(
+            'api_list', 'attendance', course=str(course_id), limit='500', after=str(self.attendance_after),
+        )
+
+        yield 'search', faculty, get(
+            'search', kind='students', q=self.student.name[:3], course=str(course_id),
+        )
+
+        # The link a deferred import hands out; it redirects to the form.
+        set_password = set_password_link(self.new_user)
+        yield 'set_password', None, lambda client: client.get(set_password)
+
+        for model in admin.site._registry:
+            if model._meta.app_label == 'college':
+                name = f'admin:college_{model._meta.model_name}_changelist'
+                yield name, self.admin_user, get(name)
+
+    def check_coverage(self, names):
+        missing = {pattern.name for pattern in urlpatterns} - {name.removesuffix('_post') for name in names}
+        if missing:
+            raise CommandError(f"No benchmark for: {', '.join(sorted(missing))}.")
+
+    def measure(self, name, user, request, repeat):
+        cache.clear()
+        client = Client()
+        timings = []
+        queries = []
+        for _ in range(repeat):
+            if user is not None:
+                client.force_login(user)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(client)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"{name} returned HTTP {response.status_code}.")
+            queries.append(len(captured))
+
+        budget = ADMIN_CHANGELIST_BUDGET if name.startswith('admin:') else QUERY_BUDGETS[name]
+        return {
+            'name': name,
+            'status': response.status_code,
+            'cold_ms': round(timings[0], 2),
+            'median_ms': round(statistics.median(timings[1:] or timings), 2),
+            'cold_queries': queries[0],
+            'warm_queries': max(queries[1:] or queries),
+            'max_queries': max(queries),
+            'budget': budget,
+            'over_budget': max(queries) > budget,
+        }
+
+    def report(self, results):
+        width = max(len(result['name']) for result in results)
+        self.stdout.write(
+            f"{'view':<{width}}  {'status':>6}  {'cold ms':>9}  {'median ms':>9}  "
+            f"{'cold q':>6}  {'warm q':>6}  {'budget':>6}"
+        )
+        for result in results:
+            line = (
+                f"{result['name']:<{width}}  {result['status']:>6}  {result['cold_ms']:>9.2f}  "
+                f"{result['median_ms']:>9.2f}  {result['cold_queries']:>6}  {result['warm_queries']:>6}  "
+                f"{result['budget']:>6}"
+            )
+            self.stdout.write(self.style.ERROR(line) if result['over_budget'] else line)
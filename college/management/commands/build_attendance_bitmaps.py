@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from college import bitmaps
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the compact attendance bitmaps from the Attendance table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', help="Only rebuild this course (course_id).")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        built = bitmaps.build(options['course'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Built attendance bitmaps for {built} courses in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,110 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from college import bitmaps
+from college.models import Attendance, AttendanceBitmap
+
+
+def row_streaks(statuses):
+    """(current, longest) present streaks from statuses in date order, the row-based way."""
+    current = longest = 0
+    for status in statuses:
+        current = current + 1 if status else 0
+        longest = max(longest, current)
+    return current, longest
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the attendance bitmaps against the Attendance rows: per student/course counts, "
+        "per course/date counts and the days held, plus streaks for a sample of students. "
+        "Fails if any figure differs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', help="Only check this course (course_id).")
+        parser.add_argument('--build', action='store_true', help="Rebuild the bitmaps first.")
+        parser.add_argument('--streak-sample', type=int, default=200, help="Student/course pairs to check streaks for.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['build']:
+            bitmaps.build(options['course'])
+        course_ids = options['course'] or list(
+            Attendance.objects.values_list('course_id', flat=True).distinct().order_by('course_id')
+        )
+
+        started = time.perf_counter()
+        mismatches = []
+        pairs = []
+        for course_id in course_ids:
+            pairs.extend(self.check_course(course_id, mismatches))
+
+        sample = random.Random(options['seed']).sample(pairs, min(options['streak_sample'], len(pairs)))
+        for student_id, course_id in sample:
+            statuses = Attendance.objects.filter(student_id=student_id, course_id=course_id).order_by('date')
+            expected = row_streaks(statuses.values_list('status', flat=True))
+            summary = bitmaps.student_summary(student_id, course_id)
+            actual = (summary['current_streak'], summary['longest_streak'])
+            if actual != expected:
+                mismatches.append(f"streaks of student {student_id} in course {course_id}: {actual} != {expected}")
+
+        self.stdout.write(
+            f"Checked {len(course_ids)} courses, {len(pairs)} student/course pairs and "
+            f"{len(sample)} streaks in {time.perf_counter() - started:.1f}s."
+        )
+        if mismatches:
+            for line in mismatches[:20]:
+                self.stderr.write(line)
+            raise CommandError(f"{len(mismatches)} mismatches between the bitmaps and the Attendance rows.")
+        self.stdout.write(self.style.SUCCESS("Bitmaps match the Attendance rows."))
+
+    def check_course(self, course_id, mismatches):
+        """Compares one course's counts; returns its (student_id, course_id) pairs."""
+        rows = Attendance.objects.filter(course_id=course_id).order_by()
+        expected_pairs = {
+            student_id: (present, total)
+            for student_id, present, total in rows.values_list('student_id').annotate(
+                present=Count('pk', filter=Q(status=True)), total=Count('pk'),
+            )
+        }
+        expected_sessions = defaultdict(dict)
+        for day, present, total in rows.values_list('date').annotate(
+            present=Count('pk', filter=Q(status=True)), total=Count('pk'),
+        ):
+            expected_sessions[bitmaps.term_of(day)][day] = (present, total)
+
+        actual_pairs = defaultdict(lambda: (0, 0))
+        for student_id, present, recorded in AttendanceBitmap.objects.filter(course_id=course_id).values_list(
+            'student_id', 'present', 'recorded',
+        ):
+            counted = actual_pairs[student_id]
+            actual_pairs[student_id] = (
+                counted[0] + bitmaps.decode(present).bit_count(), counted[1] + bitmaps.decode(recorded).bit_count(),
+            )
+        if dict(actual_pairs) != expected_pairs:
+            for student_id in set(actual_pairs) | set(expected_pairs):
+                if actual_pairs.get(student_id) != expected_pairs.get(student_id):
+                    mismatches.append(
+                        f"course {course_id}, student {student_id}: bitmaps {actual_pairs.get(student_id)}"
+                        f" != rows {expected_pairs.get(student_id)} (present, total)"
+                    )
+
+        terms = set(expected_sessions) | set(
+            AttendanceBitmap.objects.filter(course_id=course_id).values_list('term', flat=True).distinct()
+        )
+        for term in sorted(terms):
+            expected = expected_sessions.get(term, {})
+            actual = {
+                session['date']: (session['present_count'], session['total_count'])
+                for session in bitmaps.course_summary(course_id, term)['sessions']
+            }
+            if actual != expected:
+                mismatches.append(f"course {course_id}, term {term}: per-date counts differ")
+            if bitmaps.sessions_held(course_id, term) != sorted(expected):
+                mismatches.append(f"course {course_id}, term {term}: days held differ")
+        return [(student_id, course_id) for student_id in expected_pairs]
@@ -0,0 +1,117 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from college.models import Course, Student, User
+from college.replicas import PIN_COOKIE
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests the replica-routed views and some that stay on the primary, and fails unless each "
+        "one's queries went to the expected databases. Needs DATABASE_REPLICA_URLS; "
+        "locally, a copy of the SQLite database file works as a replica."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured; set DATABASE_REPLICA_URLS.")
+        course = (
+            Course.objects.filter(faculty__isnull=False, enrollment__isnull=False)
+            .select_related('faculty__user').order_by('course_id').first()
+        )
+        student = Student.objects.filter(enrollment__isnull=False).select_related('user').order_by('pk').first()
+        admin_user = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if course is None or student is None:
+            raise CommandError("No course with a teacher and students; run seed_college first.")
+
+        setup_test_environment()
+        try:
+            failures = self.check_routing(course, student, admin_user)
+        finally:
+            teardown_test_environment()
+        if failures:
+            raise CommandError('Misrouted: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS("Reads and writes went where expected."))
+
+    def request(self, user, send, pinned=False):
+        """(response, {alias: queries}) for one request, run with a cold cache."""
+        cache.clear()
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        if pinned:
+            client.cookies[PIN_COOKIE] = '1'
+        with ExitStack() as stack:
+            captured = {alias: stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections}
+            response = send(client)
+            # Streamed exports run their query while the body is read.
+            response.getvalue()
+        return response, {alias: len(queries) for alias, queries in captured.items()}
+
+    def expect(self, failures, name, counts, on_replica):
+        replica_queries = sum(count for alias, count in counts.items() if alias != DEFAULT_DB_ALIAS)
+        primary_queries = counts[DEFAULT_DB_ALIAS]
+        ok = (replica_queries and not primary_queries) if on_replica else not replica_queries
+        where = 'replica' if on_replica else 'primary'
+        self.stdout.write(f"{name:<28} primary {primary_queries:>3}  replicas {replica_queries:>3}  "
+                          f"(expected {where}) {'ok' if ok else 'FAIL'}")
+        if not ok:
+            failures.append(f"{name} should read from the {where}")
+
+    def check_routing(self, course, student, admin_user):
+        failures = []
+        faculty = course.faculty.user
+
+        def get(name, *args, **params):
+            return lambda client: client.get(reverse(name, args=args), params)
+
+        on_replica = [
+            ('student_dashboard', student.user, get('student_dashboard')),
+            ('teacher_dashboard', faculty, get('teacher_dashboard')),
+            ('course_stats_api', faculty, get('course_stats_api', course.course_id)),
+        ]
+        for name, user, send in on_replica:
+            response, counts = self.request(user, send)
+            self.expect(failures, name, counts, on_replica=True)
+            if response.has_header('ETag'):
+                failures.append(f"{name} sent an ETag for a page read from a replica")
+
+        _, counts = self.request(faculty, get('course_detail', course.course_id))
+        self.expect(failures, 'course_detail', counts, on_replica=False)
+
+        if admin_user is None:
+            self.stdout.write("No active superuser; skipping api_list and the CSV export.")
+        else:
+            api_list = get('api_list', 'students', limit='50')
+            _, counts = self.request(admin_user, api_list)
+            self.expect(failures, 'api_list', counts, on_replica=True)
+
+            # The changelist itself is read on the primary; only the exported rows come from a replica.
+            _, counts = self.request(admin_user, lambda client: client.post(
+                reverse('admin:college_student_changelist'),
+                {'action': 'export_as_csv', 'select_across': '1', '_selected_action': [student.pk]},
+            ))
+            replica_queries = sum(count for alias, count in counts.items() if alias != DEFAULT_DB_ALIAS)
+            self.stdout.write(f"{'student CSV export':<28} replicas {replica_queries:>3}  (expected >= 1) "
+                              f"{'ok' if replica_queries else 'FAIL'}")
+            if not replica_queries:
+                failures.append("the CSV export should read its rows from a replica")
+
+            # A pinned user's reads stay on the primary.
+            _, counts = self.request(admin_user, api_list, pinned=True)
+            self.expect(failures, 'api_list (pinned)', counts, on_replica=False)
+
+        # Logging out deletes the session row, a write, so the response pins the user.
+        response, _ = self.request(faculty, get('logout'))
+        pinned = PIN_COOKIE in response.cookies
+        self.stdout.write(f"{'logout sets the pin cookie':<28} {'ok' if pinned else 'FAIL'}")
+        if not pinned:
+            failures.append("a request that wrote did not set the pin cookie")
+        return failures
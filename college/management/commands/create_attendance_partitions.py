@@ -0,0 +1,48 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from college.models import Attendance
+
+
+class Command(BaseCommand):
+    help = "Creates yearly partitions of the attendance table ahead of time (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years-ahead', type=int, default=2)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write("Attendance partitioning is only used on PostgreSQL; nothing to do.")
+            return
+
+        table = Attendance._meta.db_table
+        this_year = datetime.date.today().year
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [table])
+            if cursor.fetchone()[0] != 'p':
+                self.stderr.write(f"{table} is not partitioned; run migrations first.")
+                return
+
+            for year in range(this_year, this_year + options['years_ahead'] + 1):
+                partition = f'{table}_y{year}'
+                cursor.execute("SELECT to_regclass(%s)", [partition])
+                if cursor.fetchone()[0]:
+                    continue
+                start, end = f'{year}-01-01', f'{year + 1}-01-01'
+                # Rows for this year may already sit in the DEFAULT partition;
+                # detach it so they can be moved into the new partition.
+                with transaction.atomic():
+                    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {table}_default')
+                    cursor.execute(
+                        f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                        [start, end],
+                    )
+                    cursor.execute(
+                        f'INSERT INTO {table} SELECT * FROM {table}_default WHERE date >= %s AND date < %s',
+                        [start, end],
+                    )
+                    cursor.execute(f'DELETE FROM {table}_default WHERE date >= %s AND date < %s', [start, end])
+                    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT')
+                self.stdout.write(self.style.SUCCESS(f"Created partition {partition}."))
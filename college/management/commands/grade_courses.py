@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from college.grading import GRADE_CHUNK_SIZE, grade_all
+from college.provisioning import available_cores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every student's weighted final grade in every course (or the given courses), "
+        "grading chunks of courses in parallel processes. Run at term end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help="Only grade these courses.")
+        parser.add_argument('--workers', type=int, default=available_cores())
+        parser.add_argument('--chunk-size', type=int, default=GRADE_CHUNK_SIZE, help="Courses per task.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graded = grade_all(options['workers'], options['chunk_size'], options['course_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {graded} grades in {time.perf_counter() - started:.2f}s with {options['workers']} workers."
+        ))
@@ -0,0 +1,48 @@
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, identify_hasher
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from college.models import User
+from college.provisioning import PasswordHasher, available_cores
+
+
+def is_plaintext(encoded):
+    if not encoded or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False
+    try:
+        identify_hasher(encoded)
+    except ValueError:
+        return True
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Hashes passwords that were stored as plain text (older Student/Faculty CSV imports put "
+        "the raw roll number or username there), so those users can log in with it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=available_cores())
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        users = [
+            user for user in User.objects.only('pk', 'password').iterator(chunk_size=options['batch_size'])
+            if is_plaintext(user.password)
+        ]
+        if options['dry_run']:
+            self.stdout.write(f"{len(users)} users have a plain-text password.")
+            return
+
+        with PasswordHasher(options['workers']) as hasher:
+            for start in range(0, len(users), options['batch_size']):
+                batch = users[start:start + options['batch_size']]
+                for user, encoded in zip(batch, hasher.hash_many(user.password for user in batch)):
+                    user.password = encoded
+                with transaction.atomic():
+                    User.objects.bulk_update(batch, ['password'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Hashed {len(users)} plain-text passwords in {hasher.seconds:.1f}s."
+        ))
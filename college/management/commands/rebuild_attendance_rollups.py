@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from college.models import AttendanceRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-student, per-course attendance rollup table from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created = AttendanceRollup.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} attendance rollups."))
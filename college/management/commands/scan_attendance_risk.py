@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from college.models import AttendanceRollup, Department
+from college.reports import SCAN_CHUNK_SIZE, run_attendance_risk_scan
+
+
+class Command(BaseCommand):
+    help = "Flags every student/course pair whose attendance is below a threshold and stores the snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=settings.ATTENDANCE_THRESHOLD)
+        parser.add_argument('--department', help="Only scan students of this department (dept_name).")
+        parser.add_argument(
+            '--per-department', action='store_true',
+            help="Store one scan per department instead of a single college-wide scan.",
+        )
+        parser.add_argument('--chunk-size', type=int, default=SCAN_CHUNK_SIZE)
+        parser.add_argument(
+            '--rebuild-rollups', action='store_true',
+            help="Recompute the attendance rollups from raw attendance before scanning.",
+        )
+
+    def handle(self, *args, **options):
+        if options['department'] and options['per_department']:
+            raise CommandError("Use either --department or --per-department, not both.")
+        if options['department']:
+            try:
+                departments = [Department.objects.get(dept_name=options['department'])]
+            except Department.DoesNotExist:
+                raise CommandError(f"Unknown department {options['department']!r}.")
+        elif options['per_department']:
+            departments = list(Department.objects.order_by('dept_name'))
+        else:
+            departments = [None]
+
+        if options['rebuild_rollups']:
+            AttendanceRollup.objects.rebuild()
+
+        for dept in departments:
+            started = time.perf_counter()
+            scan = run_attendance_risk_scan(options['threshold'], dept, options['chunk_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"{scan}: {scan.flagged_count} of {scan.pairs_scanned} pairs flagged in {elapsed:.2f}s."
+            ))
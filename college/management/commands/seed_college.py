@@ -0,0 +1,219 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from college.models import (
+    Assessment, Attendance, AttendanceRollup, Course, Department, Enrollment, Faculty, Result, Student, User,
+)
+
+ASSESSMENT_PLAN = (
+    ('Assignment', 'assignment', Decimal('20')),
+    ('Midterm', 'exam', Decimal('50')),
+    ('Project', 'project', Decimal('50')),
+    ('Final', 'exam', Decimal('100')),
+)
+
+
+def class_days(count, end=None):
+    """The last ``count`` weekdays up to ``end`` (today by default), oldest first."""
+    day = end or datetime.date.today()
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= datetime.timedelta(days=1)
+    return days[::-1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic college (departments, faculty, courses, students, enrollments, "
+        "attendance and results) with bulk inserts, for benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=4)
+        parser.add_argument('--faculty', type=int, default=10, help="Faculty per department.")
+        parser.add_argument('--courses', type=int, default=2, help="Courses per faculty member.")
+        parser.add_argument('--students', type=int, default=250, help="Students per department.")
+        parser.add_argument('--courses-per-student', type=int, default=5)
+        parser.add_argument('--days', type=int, default=60, help="Class days (weekdays) of attendance.")
+        parser.add_argument('--assessments', type=int, default=4, help="Assessments per course.")
+        parser.add_argument('--present-rate', type=float, default=0.85)
+        parser.add_argument('--password', default='password', help="Password for every generated user.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable data.")
+        parser.add_argument(
+            '--flush', action='store_true',
+            help="Empty the whole database (manage.py flush) before seeding.",
+        )
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            call_command('flush', interactive=False, verbosity=0)
+        elif Department.objects.exists() or User.objects.exists():
+            raise CommandError("The database already has data; use --flush to seed from scratch.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = self.seed(options)
+        elapsed = time.perf_counter() - started
+
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s."))
+
+    def bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def seed(self, options):
+        password = make_password(options['password'])
+
+        departments = self.bulk(Department, [
+            Department(dept_name=f'Department {d + 1}') for d in range(options['departments'])
+        ])
+
+        faculty_users = self.bulk(User, [
+            User(
+                username=f'faculty{d + 1}_{f + 1}', password=password,
+                user_type='faculty', is_staff=True,
+            )
+            for d in range(len(departments)) for f in range(options['faculty'])
+        ])
+        faculty = self.bulk(Faculty, [
+            Faculty(
+                user=user, faculty_name=f'Faculty {user.username[len("faculty"):]}',
+                dept=departments[i // options['faculty']],
+                title=self.rng.choice(Faculty.TITLE_CHOICES)[0],
+            )
+            for i, user in enumerate(faculty_users)
+        ])
+
+        courses = self.bulk(Course, [
+            Course(
+                course_name=f'Course {i + 1}', course_code=f'C{i + 1:05d}',
+                dept=member.dept, faculty=member,
+            )
+            for i, member in enumerate(
+                member for member in faculty for _ in range(options['courses'])
+            )
+        ])
+        courses_by_dept = {}
+        for course in courses:
+            courses_by_dept.setdefault(course.dept_id, []).append(course)
+
+        student_users = self.bulk(User, [
+            User(username=f'student{i + 1}', password=password, user_type='student')
+            for i in range(len(departments) * options['students'])
+        ])
+        students = self.bulk(Student, [
+            Student(
+                user=user, roll_no=f'R{i + 1:07d}', name=f'Student {i + 1}',
+                dept=departments[i // options['students']],
+                semester=self.rng.randint(1, 8),
+            )
+            for i, user in enumerate(student_users)
+        ])
+
+        enrollments = []
+        for student in students:
+            dept_courses = courses_by_dept.get(student.dept_id, [])
+            picked = self.rng.sample(dept_courses, min(options['courses_per_student'], len(dept_courses)))
+            enrollments.extend(Enrollment(student=student, course=course) for course in picked)
+        self.bulk(Enrollment, enrollments)
+        roster = {}
+        for enrollment in enrollments:
+            roster.setdefault(enrollment.course_id, []).append(enrollment.student_id)
+
+        attendance_count = self.seed_attendance(roster, class_days(options['days']), options['present_rate'])
+
+        plan = [ASSESSMENT_PLAN[i % len(ASSESSMENT_PLAN)] for i in range(options['assessments'])]
+        assessments = self.bulk(Assessment, [
+            Assessment(
+                assessment_name=f'{name} {i + 1}', type=kind,
+                assessment_full_marks=full_marks, course=course,
+            )
+            for course in courses for i, (name, kind, full_marks) in enumerate(plan)
+        ])
+        result_count = self.seed_results(roster, assessments)
+
+        return {
+            'departments': len(departments),
+            'faculty': len(faculty),
+            'courses': len(courses),
+            'students': len(students),
+            'enrollments': len(enrollments),
+            'attendance rows': attendance_count,
+            'assessments': len(assessments),
+            'results': result_count,
+        }
+
+    def insert_rows(self, model, field_names, rows):
+        """Inserts plain value tuples with executemany, skipping model instances entirely.
+
+        Much faster than bulk_create for millions of rows, but it bypasses
+        every queryset/model hook, so callers must maintain derived data.
+        """
+        connection = connections[router.db_for_write(model)]
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in field_names)
+        sql = (
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+            f'VALUES ({", ".join(["%s"] * len(field_names))})'
+        )
+        count = 0
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, self.batch_size)):
+                cursor.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+    def seed_attendance(self, roster, days, present_rate):
+        """Inserts the attendance rows and their AttendanceRollup counters."""
+        ops = connections[router.db_for_write(Attendance)].ops
+        db_days = [ops.adapt_datefield_value(day) for day in days]
+        now = ops.adapt_datetimefield_value(timezone.now())
+        rollups = []
+
+        def rows():
+            for course_id, student_ids in roster.items():
+                for student_id in student_ids:
+                    # Vary attendance between students so some fall under the threshold.
+                    rate = min(1.0, max(0.0, self.rng.gauss(present_rate, 0.1)))
+                    statuses = [self.rng.random() < rate for _ in db_days]
+                    rollups.append(AttendanceRollup(
+                        student_id=student_id, course_id=course_id,
+                        present_count=sum(statuses), total_count=len(statuses),
+                    ))
+                    for day, status in zip(db_days, statuses):
+                        yield student_id, course_id, day, status, now
+
+        count = self.insert_rows(Attendance, ['student', 'course', 'date', 'status', 'updated_at'], rows())
+        self.bulk(AttendanceRollup, rollups)
+        return count
+
+    def seed_results(self, roster, assessments):
+        ops = connections[router.db_for_write(Result)].ops
+        marks_field = Result._meta.get_field('marks')
+        now = ops.adapt_datetimefield_value(timezone.now())
+
+        def rows():
+            for assessment in assessments:
+                full_marks = float(assessment.assessment_full_marks)
+                for student_id in roster.get(assessment.course_id, []):
+                    score = min(1.0, max(0.0, self.rng.gauss(0.7, 0.15)))
+                    marks = ops.adapt_decimalfield_value(
+                        Decimal(f'{score * full_marks:.2f}'), marks_field.max_digits, marks_field.decimal_places,
+                    )
+                    yield assessment.pk, student_id, marks, now
+
+        return self.insert_rows(Result, ['assessment', 'student', 'marks', 'updated_at'], rows())
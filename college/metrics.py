@@ -0,0 +1,111 @@
+"""Prometheus metrics for requests, the college caches and the database.
+
+``MetricsMiddleware`` records a latency histogram and a query counter per
+URL name; ``record_cache`` is called by every cache read in the app
+(``caching.py``, ``dashboard.py``) with the key, which is reduced to its
+family (``course_{id}_student_list_v{version}`` becomes
+``course_student_list``) so the label set stays small.
+
+Under gunicorn each worker keeps its own values. Setting
+``PROMETHEUS_MULTIPROC_DIR`` to an empty, shared directory switches
+prometheus_client to its multiprocess mode: workers write their values to
+files there and ``render`` aggregates them, so any worker can answer a
+scrape (see ``gunicorn.conf.py``).
+"""
+import os
+import re
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'college_request_duration_seconds', 'Request latency by URL name.', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter('college_requests', 'Responses by URL name and status code.', ['view', 'method', 'status'])
+DB_QUERIES = Counter('college_db_queries', 'Database queries by URL name.', ['view'])
+DB_TIME = Counter('college_db_query_seconds', 'Time spent in database queries by URL name.', ['view'])
+CACHE_REQUESTS = Counter('college_cache_requests', 'Cache reads by key family and result.', ['key', 'result'])
+
+_KEY_IDS = re.compile(r'_v?\d+(?=_|$)')
+
+
+def key_family(key):
+    return _KEY_IDS.sub('', key)
+
+
+def record_cache(key, hit):
+    CACHE_REQUESTS.labels(key_family(key), 'hit' if hit else 'miss').inc()
+
+
+def render():
+    """(body, content type) of the current metrics in the Prometheus text format."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _counting(self, queries):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(queries))
+        return stack
+
+    def _record(self, request, response, queries, started):
+        view = _view_name(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        if queries.count:
+            DB_QUERIES.labels(view).inc(queries.count)
+            DB_TIME.labels(view).inc(queries.seconds)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries, started = _QueryCounter(), time.perf_counter()
+        with self._counting(queries):
+            response = self.get_response(request)
+        return self._record(request, response, queries, started)
+
+    async def __acall__(self, request):
+        queries, started = _QueryCounter(), time.perf_counter()
+        with self._counting(queries):
+            response = await self.get_response(request)
+        return self._record(request, response, queries, started)
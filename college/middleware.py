@@ -0,0 +1,150 @@
+"""Per-request database and template instrumentation.
+
+``QueryInstrumentationMiddleware`` counts the queries a request runs, their
+total time, how often each query shape repeats and how long templates took
+to render. The numbers are sent back as a ``Server-Timing`` header (visible
+in the browser's network panel) and a request that repeats one query shape
+more than ``QUERY_REPEAT_THRESHOLD`` times, usually an N+1, is logged.
+
+It is switched on with the ``QUERY_INSTRUMENTATION`` setting. When that is
+off the middleware removes itself from the stack at startup and settings.py
+keeps the stock template backend, so it costs nothing. When it is on,
+render times come from ``InstrumentedDjangoTemplates``, which adds them to
+the stats of the request being rendered (found through a context
+variable, so concurrent requests don't mix).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger('college.instrumentation')
+
+_current = ContextVar('query_instrumentation', default=None)
+
+# Runs of placeholders ("IN (%s, %s, %s)", multi-row VALUES) vary in length
+# with the data, so they are collapsed to get one shape per query.
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+_ROW_LIST = re.compile(r'(\(%s\))(?:\s*,\s*\(%s\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    sql = _PLACEHOLDER_LIST.sub('%s', sql)
+    sql = _ROW_LIST.sub(r'\1', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        duplicates = sum(count - 1 for count in self.shapes.values() if count > 1)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"',
+            f'dupes;desc="{duplicates} duplicate queries"',
+            f'tpl;dur={self.template_time * 1000:.2f};desc="templates"',
+            f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}',
+        ])
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, adding render time to the instrumented request's stats.
+
+    settings.py selects it when ``QUERY_INSTRUMENTATION`` is on.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        stats = RequestStats()
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        token = _current.set(stats)
+        stack.callback(_current.reset, token)
+        return stats, stack
+
+    def _finish(self, request, response, stats):
+        response['Server-Timing'] = stats.server_timing()
+        for shape, count in stats.repeated(self.threshold):
+            logger.warning(
+                "Query repeated %d times in %s %s: %s", count, request.method, request.path, shape,
+                extra={
+                    'path': request.path,
+                    'method': request.method,
+                    'repeats': count,
+                    'sql_fingerprint': shape,
+                    'query_count': stats.query_count,
+                    'db_ms': round(stats.db_time * 1000, 2),
+                },
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, stack = self._start()
+        with stack:
+            response = self.get_response(request)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats, stack = self._start()
+        with stack:
+            response = await self.get_response(request)
+        return self._finish(request, response, stats)
@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_rollups(apps, schema_editor):
+    Attendance = apps.get_model('college', 'Attendance')
+    AttendanceRollup = apps.get_model('college', 'AttendanceRollup')
+    counts = (
+        Attendance.objects
+        .values_list('student_id', 'course_id')
+        .annotate(present=Count('pk', filter=Q(status=True)), total=Count('pk'))
+        .order_by()
+    )
+    AttendanceRollup.objects.bulk_create(
+        (
+            AttendanceRollup(
+                student_id=student_id, course_id=course_id,
+                present_count=present, total_count=total,
+            )
+            for student_id, course_id, present, total in counts.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0002_alter_course_course_code'),
+        ('college', '0003_auto_20250830_0631'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.student')),
+            ],
+            options={
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Q
+
+
+def dedupe_attendance(apps, schema_editor):
+    """Keeps the most recent row for every duplicated (student, course, date)."""
+    Attendance = apps.get_model('college', 'Attendance')
+    AttendanceRollup = apps.get_model('college', 'AttendanceRollup')
+
+    newer = Attendance.objects.filter(
+        student=OuterRef('student'), course=OuterRef('course'),
+        date=OuterRef('date'), pk__gt=OuterRef('pk'),
+    )
+    stale = Attendance.objects.filter(Exists(newer))
+    pairs = set(stale.values_list('student_id', 'course_id').distinct())
+    if not pairs:
+        return
+    stale.delete()
+
+    counts = (
+        Attendance.objects
+        .filter(student_id__in={s for s, _ in pairs}, course_id__in={c for _, c in pairs})
+        .values_list('student_id', 'course_id')
+        .annotate(present=Count('pk', filter=Q(status=True)), total=Count('pk'))
+        .order_by()
+    )
+    for student_id, course_id, present, total in counts:
+        if (student_id, course_id) in pairs:
+            AttendanceRollup.objects.filter(student_id=student_id, course_id=course_id).update(
+                present_count=present, total_count=total,
+            )
+
+
+def partition_attendance(apps, schema_editor):
+    """On PostgreSQL, turns college_attendance into a table range-partitioned by year.
+
+    One partition is created per calendar year from the oldest row through
+    next year, plus a DEFAULT partition; ``manage.py create_attendance_partitions``
+    adds later years. The primary key becomes (attendance_id, date) because
+    PostgreSQL requires the partition key in every unique index.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    Attendance = apps.get_model('college', 'Attendance')
+    table = Attendance._meta.db_table
+    old_table = f'{table}_unpartitioned'
+    sequence = f'{table}_attendance_id_seq'
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [table])
+        if cursor.fetchone()[0] == 'p':
+            return
+        cursor.execute(
+            f'SELECT EXTRACT(YEAR FROM MIN(date))::int, EXTRACT(YEAR FROM MAX(date))::int, '
+            f'COALESCE(MAX(attendance_id), 0) FROM {table}'
+        )
+        first_year, last_year, max_id = cursor.fetchone()
+    this_year = datetime.date.today().year
+    first_year = min(first_year or this_year, this_year)
+    last_year = max(last_year or this_year, this_year) + 1
+
+    schema_editor.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+    schema_editor.execute(f'CREATE TABLE {table} (LIKE {old_table}) PARTITION BY RANGE (date)')
+    for year in range(first_year, last_year + 1):
+        schema_editor.execute(
+            f"CREATE TABLE {table}_y{year} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    schema_editor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    schema_editor.execute(f'INSERT INTO {table} SELECT * FROM {old_table}')
+    schema_editor.execute(f'DROP TABLE {old_table}')
+
+    schema_editor.execute(f'CREATE SEQUENCE {sequence} OWNED BY {table}.attendance_id')
+    schema_editor.execute('SELECT setval(%s, %s, false)', (sequence, max_id + 1))
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN attendance_id SET DEFAULT nextval('{sequence}')")
+    schema_editor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (attendance_id, date)')
+
+    # Recreate the foreign keys, their indexes and the Meta constraints/indexes
+    # under the same names Django would use for an unpartitioned table.
+    for field_name in ('student', 'course'):
+        field = Attendance._meta.get_field(field_name)
+        schema_editor.execute(schema_editor._create_index_sql(Attendance, fields=[field]))
+        schema_editor.execute(schema_editor._create_fk_sql(Attendance, field, '_fk_%(to_table)s_%(to_column)s'))
+    for constraint in Attendance._meta.constraints:
+        schema_editor.add_constraint(Attendance, constraint)
+    for index in Attendance._meta.indexes:
+        schema_editor.add_index(Attendance, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0004_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'date', 'status'], include=('student',), name='attendance_course_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'date'), name='unique_attendance_per_day'),
+        ),
+        migrations.RunPython(partition_attendance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0005_attendance_unique_and_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRiskScan',
+            fields=[
+                ('scan_id', models.AutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('threshold', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('pairs_scanned', models.PositiveIntegerField(default=0)),
+                ('flagged_count', models.PositiveIntegerField(default=0)),
+                ('dept', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='college.department')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceRiskFlag',
+            fields=[
+                ('flag_id', models.AutoField(primary_key=True, serialize=False)),
+                ('present_count', models.PositiveIntegerField()),
+                ('total_count', models.PositiveIntegerField()),
+                ('percentage', models.FloatField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.student')),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='college.attendanceriskscan')),
+            ],
+        ),
+    ]
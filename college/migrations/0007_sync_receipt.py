@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0006_attendance_risk_scan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncReceipt',
+            fields=[
+                ('receipt_id', models.AutoField(primary_key=True, serialize=False)),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('attendance', 'Attendance'), ('marks', 'Marks')], max_length=10)),
+                ('result', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-received_at',),
+                'constraints': [models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_sync_key_per_user')],
+            },
+        ),
+    ]
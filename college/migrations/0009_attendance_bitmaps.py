@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('bitmap_id', models.AutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=6)),
+                ('present', models.BinaryField()),
+                ('recorded', models.BinaryField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.student')),
+            ],
+            options={
+                'unique_together': {('student', 'course', 'term')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SessionBitmap',
+            fields=[
+                ('session_bitmap_id', models.AutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=6)),
+                ('held', models.BinaryField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.course')),
+            ],
+            options={
+                'unique_together': {('course', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0009_attendance_bitmaps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseGrade',
+            fields=[
+                ('course_grade_id', models.AutoField(primary_key=True, serialize=False)),
+                ('percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('letter', models.CharField(max_length=2)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='college.student')),
+            ],
+            options={
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeWeight',
+            fields=[
+                ('grade_weight_id', models.AutoField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('exam', 'Exam'), ('assignment', 'Assignment'), ('project', 'Project')], max_length=20)),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_weights', to='college.course')),
+            ],
+            options={
+                'unique_together': {('course', 'type')},
+            },
+        ),
+    ]
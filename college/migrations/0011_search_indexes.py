@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# (table, column) pairs searched by college/search.py.
+SEARCHED_COLUMNS = (
+    ('college_student', 'name'),
+    ('college_student', 'roll_no'),
+    ('college_course', 'course_name'),
+    ('college_course', 'course_code'),
+    ('college_faculty', 'faculty_name'),
+)
+
+
+def _index_name(table, column):
+    return f'{table}_{column}_trgm'
+
+
+def add_trigram_indexes(apps, schema_editor):
+    """On PostgreSQL, adds pg_trgm GIN indexes for case-insensitive substring search.
+
+    They index ``UPPER(column)`` because that is what ``icontains`` and
+    ``istartswith`` compare. Other databases use search.py's in-process
+    prefix index instead.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {_index_name(table, column)} '
+            f'ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in SEARCHED_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {_index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0010_course_grades'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_trigram_indexes, drop_trigram_indexes),
+    ]
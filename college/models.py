@@ -1,6 +1,34 @@
-from django.db import models
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Sent with ``course_ids`` and the (student_id, course_id) ``pairs`` written
+# after any write to Attendance, including bulk queryset writes that bypass
+# post_save/post_delete.
+attendance_changed = Signal()
+
+# Set while a bulk queryset operation refreshes rollups itself, so the
+# per-row signal handlers in signals.py can stand down.
+_rollup_signals_suspended = ContextVar('rollup_signals_suspended', default=False)
+
+@contextmanager
+def suspend_rollup_signals():
+    token = _rollup_signals_suspended.set(True)
+    try:
+        yield
+    finally:
+        _rollup_signals_suspended.reset(token)
+
+def rollup_signals_suspended():
+    return _rollup_signals_suspended.get()
 
 # The User model is the foundation for both Students and Faculty
 class User(AbstractUser):
@@ -46,10 +74,48 @@ class Course(models.Model):
     course_code = models.CharField(max_length=15, unique=True)
     dept = models.ForeignKey(Department, on_delete=models.CASCADE)
     faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.course_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Reassigning a course changes the previous teacher's dashboard too.
+        instance._loaded_faculty_id = instance.__dict__.get('faculty_id')
+        return instance
+
+def rollup_percentage(prefix=''):
+    """SQL expression for an AttendanceRollup's percentage (0 when no classes were held)."""
+    return Case(
+        When(**{f'{prefix}total_count': 0}, then=Value(0.0)),
+        default=F(f'{prefix}present_count') * 100.0 / F(f'{prefix}total_count'),
+        output_field=FloatField(),
+    )
+
+class StudentQuerySet(models.QuerySet):
+    def with_overall_attendance(self):
+        """Annotates ``overall_attendance``, matching get_overall_attendance_percentage()."""
+        enrolled = (
+            Enrollment.objects.filter(student=OuterRef('pk'))
+            .values('student').annotate(n=Count('pk')).values('n')
+        )
+        percentage_sum = (
+            AttendanceRollup.objects
+            .filter(student=OuterRef('pk'), course__enrollment__student=OuterRef('pk'))
+            .values('student').annotate(total=Sum(rollup_percentage())).values('total')
+        )
+        return self.annotate(
+            enrolled_count=Coalesce(Subquery(enrolled), 0),
+            overall_attendance=Case(
+                When(enrolled_count=0, then=Value(0.0)),
+                default=Coalesce(Subquery(percentage_sum), Value(0.0))
+                / Cast(F('enrolled_count'), FloatField()),
+                output_field=FloatField(),
+            ),
+        )
+
 # 4. Student Model
 class Student(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True)
@@ -57,38 +123,32 @@ class Student(models.Model):
     name = models.CharField(max_length=100)
     dept = models.ForeignKey(Department, on_delete=models.CASCADE)
     semester = models.IntegerField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     enrolled_courses = models.ManyToManyField(Course, through='Enrollment', related_name='enrolled_students')
 
-    def __str__(self):
-        return self.name
-    
+    objects = StudentQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
     def get_attendance_percentage(self, course):
         """Calculates attendance percentage for a specific course."""
-        total_classes = Attendance.objects.filter(student=self, course=course).count()
-        if total_classes == 0:
-            return 0 
-        
-        present_classes = Attendance.objects.filter(
-            student=self, 
-            course=course, 
-            status=True
-        ).count()
-        
-        return (present_classes / total_classes) * 100
+        rollup = AttendanceRollup.objects.filter(student=self, course=course).first()
+        if rollup is None:
+            return 0
+        return rollup.percentage
 
     def get_overall_attendance_percentage(self):
         """Calculates the average attendance percentage across all enrolled courses."""
-        percentages = []
-        for course in self.enrolled_courses.all():
-            percentages.append(self.get_attendance_percentage(course))
-        
-        if not percentages:
+        enrolled_count = self.enrolled_courses.count()
+        if not enrolled_count:
             return 0
-            
-        return sum(percentages) / len(percentages)
+
+        # Enrolled courses without a rollup row have no classes yet and count as 0%.
+        rollups = AttendanceRollup.objects.filter(
+            student=self, course__in=self.enrolled_courses.all()
+        )
+        return sum(rollup.percentage for rollup in rollups) / enrolled_count
 
 # 5. Enrollment (Junction Table for Student-Course)
 class Enrollment(models.Model):
@@ -96,6 +156,7 @@ class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     enrollment_date = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('student', 'course')
@@ -103,6 +164,69 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.student} enrolled in {self.course}"
 
+def _pair_value(kwargs, field):
+    value = kwargs.get(f'{field}_id', kwargs.get(field))
+    return getattr(value, 'pk', value)
+
+def _send_attendance_changed(pairs):
+    course_ids = {course_id for _, course_id in pairs}
+    if course_ids:
+        attendance_changed.send(sender=Attendance, course_ids=course_ids, pairs=pairs)
+
+class AttendanceQuerySet(models.QuerySet):
+    """Keeps AttendanceRollup in step with writes that bypass model signals.
+
+    ``bulk_update`` and ``update`` also set ``updated_at``, which
+    ``auto_now`` only does on ``save``.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            pairs = set(chain.from_iterable(obj.rollup_pairs() for obj in objs))
+            AttendanceRollup.objects.refresh(pairs)
+        _send_attendance_changed(pairs)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'updated_at' not in fields:
+            now = timezone.now()
+            for obj in objs:
+                obj.updated_at = now
+            fields = [*fields, 'updated_at']
+        with transaction.atomic(using=self.db):
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            pairs = set(chain.from_iterable(obj.rollup_pairs() for obj in objs))
+            AttendanceRollup.objects.refresh(pairs)
+        _send_attendance_changed(pairs)
+        return updated
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            pairs = set(self.values_list('student_id', 'course_id').distinct())
+            updated = super().update(**kwargs)
+            new_student = _pair_value(kwargs, 'student')
+            new_course = _pair_value(kwargs, 'course')
+            if new_student is not None or new_course is not None:
+                pairs |= {
+                    (new_student or student_id, new_course or course_id)
+                    for student_id, course_id in pairs
+                }
+            AttendanceRollup.objects.refresh(pairs)
+        _send_attendance_changed(pairs)
+        return updated
+
+    def delete(self):
+        with transaction.atomic(using=self.db), suspend_rollup_signals():
+            pairs = set(self.values_list('student_id', 'course_id').distinct())
+            deleted = super().delete()
+            AttendanceRollup.objects.refresh(pairs)
+        _send_attendance_changed(pairs)
+        return deleted
+
 # 6. Attendance Model
 class Attendance(models.Model):
     attendance_id = models.AutoField(primary_key=True)
@@ -110,10 +234,48 @@ class Attendance(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     date = models.DateField()
     status = models.BooleanField(default=False) # True for present, False for absent
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = AttendanceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Its index also serves the per (student, course) rollup recount.
+            models.UniqueConstraint(
+                fields=['student', 'course', 'date'], name='unique_attendance_per_day',
+            ),
+        ]
+        indexes = [
+            # Roster/present-today lookups and the per-date summary in
+            # course_detail_view filter on course and date (and status).
+            # include= makes it covering on PostgreSQL and is dropped on SQLite.
+            models.Index(
+                fields=['course', 'date', 'status'], include=['student'],
+                name='attendance_course_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.course} on {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the pair the row was loaded with so a save that moves it
+        # to another student/course can fix up the old rollup too.
+        instance._loaded_pair = (
+            instance.__dict__.get('student_id'), instance.__dict__.get('course_id')
+        )
+        return instance
+
+    def rollup_pairs(self):
+        """The (student_id, course_id) rollups affected by writing this row."""
+        pairs = {(self.student_id, self.course_id)}
+        loaded_pair = getattr(self, '_loaded_pair', None)
+        if loaded_pair and None not in loaded_pair:
+            pairs.add(loaded_pair)
+        return pairs
+
 # 7. Assessment Model
 class Assessment(models.Model):
     ASSESSMENT_TYPE_CHOICES = (
@@ -136,9 +298,206 @@ class Result(models.Model):
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     marks = models.DecimalField(max_digits=5, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('assessment', 'student')
 
     def __str__(self):
-        return f"Result for {self.student} in {self.assessment}"
\ No newline at end of file
+        return f"Result for {self.student} in {self.assessment}"
+
+class AttendanceRollupManager(models.Manager):
+    REFRESH_CHUNK_SIZE = 500
+
+    def refresh(self, pairs):
+        """Recounts the given (student_id, course_id) pairs from Attendance and upserts them."""
+        wanted = sorted({tuple(pair) for pair in pairs if None not in pair})
+        for start in range(0, len(wanted), self.REFRESH_CHUNK_SIZE):
+            self._refresh_chunk(wanted[start:start + self.REFRESH_CHUNK_SIZE])
+
+    def _refresh_chunk(self, pairs):
+        pair_set = set(pairs)
+        counts = (
+            Attendance.objects
+            .filter(
+                student_id__in={student_id for student_id, _ in pairs},
+                course_id__in={course_id for _, course_id in pairs},
+            )
+            .values_list('student_id', 'course_id')
+            .annotate(present=Count('pk', filter=Q(status=True)), total=Count('pk'))
+            .order_by()
+        )
+        found = {
+            (student_id, course_id): (present, total)
+            for student_id, course_id, present, total in counts
+            if (student_id, course_id) in pair_set
+        }
+        rollups = [
+            AttendanceRollup(
+                student_id=student_id,
+                course_id=course_id,
+                present_count=found.get((student_id, course_id), (0, 0))[0],
+                total_count=found.get((student_id, course_id), (0, 0))[1],
+            )
+            for student_id, course_id in pairs
+        ]
+        self.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['student', 'course'],
+            update_fields=['present_count', 'total_count'],
+        )
+
+    def rebuild(self, batch_size=2000):
+        """Drops every rollup and recomputes them from the Attendance table."""
+        counts = (
+            Attendance.objects
+            .values_list('student_id', 'course_id')
+            .annotate(present=Count('pk', filter=Q(status=True)), total=Count('pk'))
+            .order_by()
+        )
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            created = 0
+            batch = []
+            for student_id, course_id, present, total in counts.iterator(chunk_size=batch_size):
+                batch.append(AttendanceRollup(
+                    student_id=student_id, course_id=course_id,
+                    present_count=present, total_count=total,
+                ))
+                if len(batch) >= batch_size:
+                    created += len(self.bulk_create(batch))
+                    batch = []
+            if batch:
+                created += len(self.bulk_create(batch))
+        return created
+
+# 9. Attendance Rollup (denormalized per student/course counters)
+class AttendanceRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+
+    objects = AttendanceRollupManager()
+
+    class Meta:
+        unique_together = ('student', 'course')
+
+    def __str__(self):
+        return f"{self.student} in {self.course}: {self.present_count}/{self.total_count}"
+
+    @property
+    def percentage(self):
+        if self.total_count == 0:
+            return 0
+        return (self.present_count / self.total_count) * 100
+
+# 10. Attendance Risk Scan (timestamped snapshot of students under the threshold)
+class AttendanceRiskScan(models.Model):
+    scan_id = models.AutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    threshold = models.DecimalField(max_digits=5, decimal_places=2)
+    dept = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    pairs_scanned = models.PositiveIntegerField(default=0)
+    flagged_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        scope = self.dept or "all departments"
+        return f"Scan of {scope} at {self.created_at:%Y-%m-%d %H:%M} (< {self.threshold}%)"
+
+# 11. Attendance Risk Flag (one at-risk student/course pair within a scan)
+class AttendanceRiskFlag(models.Model):
+    flag_id = models.AutoField(primary_key=True)
+    scan = models.ForeignKey(AttendanceRiskScan, on_delete=models.CASCADE, related_name='flags')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    present_count = models.PositiveIntegerField()
+    total_count = models.PositiveIntegerField()
+    percentage = models.FloatField()
+
+    def __str__(self):
+        return f"{self.student} in {self.course}: {self.percentage:.2f}%"
+
+# 12. Sync Receipt (an offline submission replayed by the service worker, so each is applied once)
+class SyncReceipt(models.Model):
+    KIND_CHOICES = (
+        ('attendance', 'Attendance'),
+        ('marks', 'Marks'),
+    )
+    receipt_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    idempotency_key = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    result = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-received_at',)
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_sync_key_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} sync {self.idempotency_key} from {self.user}"
+
+# 13. Attendance Bitmap (compact per student/course/term attendance, see bitmaps.py)
+class AttendanceBitmap(models.Model):
+    bitmap_id = models.AutoField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    term = models.CharField(max_length=6)
+    # Bit n is day n of the term: marked present / had a row at all.
+    present = models.BinaryField()
+    recorded = models.BinaryField()
+
+    class Meta:
+        unique_together = ('student', 'course', 'term')
+
+    def __str__(self):
+        return f"{self.student} in {self.course}, term {self.term}"
+
+# 14. Session Bitmap (the days a course held class in a term)
+class SessionBitmap(models.Model):
+    session_bitmap_id = models.AutoField(primary_key=True)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    term = models.CharField(max_length=6)
+    held = models.BinaryField()
+
+    class Meta:
+        unique_together = ('course', 'term')
+
+    def __str__(self):
+        return f"{self.course} sessions, term {self.term}"
+
+# 15. Grade Weight (a course's weighting of one assessment type in its final grade, see grading.py)
+class GradeWeight(models.Model):
+    grade_weight_id = models.AutoField(primary_key=True)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grade_weights')
+    type = models.CharField(max_length=20, choices=Assessment.ASSESSMENT_TYPE_CHOICES)
+    weight = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        unique_together = ('course', 'type')
+
+    def __str__(self):
+        return f"{self.course}: {self.get_type_display()} {self.weight}"
+
+# 16. Course Grade (a student's computed final grade in a course)
+class CourseGrade(models.Model):
+    course_grade_id = models.AutoField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    letter = models.CharField(max_length=2)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ('student', 'course')
+
+    def __str__(self):
+        return f"{self.student} in {self.course}: {self.letter} ({self.percentage}%)"
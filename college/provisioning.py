@@ -0,0 +1,89 @@
+"""Password hashing for bulk user provisioning.
+
+PBKDF2 is slow on purpose (a large fraction of a second per password), so
+hashing thousands of imported users one after another takes minutes.
+``PasswordHasher`` hashes a batch across a process pool with one worker
+per available core. With ``defer=True`` nothing is hashed at all: users
+get an unusable password and a set-password link (a Django password reset
+token, see ``set_password_link``) to choose their own on first visit.
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+# Below this many passwords, starting the pool costs more than it saves.
+PARALLEL_THRESHOLD = 32
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker():
+    # Workers are spawned, not forked (forking a threaded server can
+    # deadlock), so they set Django up again from DJANGO_SETTINGS_MODULE.
+    django.setup()
+
+
+class PasswordHasher:
+    """Hashes passwords in batches; use as a context manager so the pool is shut down."""
+
+    def __init__(self, workers=None, defer=False):
+        self.workers = workers or available_cores()
+        self.defer = defer
+        self.hashed = 0
+        self.seconds = 0.0
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._pool
+
+    def hash_many(self, passwords):
+        """Hashes for ``passwords``, in order (unusable ones when deferring)."""
+        passwords = list(passwords)
+        if self.defer:
+            return [make_password(None) for _ in passwords]
+        started = time.perf_counter()
+        if self.workers > 1 and len(passwords) >= PARALLEL_THRESHOLD:
+            chunksize = math.ceil(len(passwords) / (self.workers * 4))
+            hashes = list(self._executor().map(make_password, passwords, chunksize=chunksize))
+        else:
+            hashes = [make_password(password) for password in passwords]
+        self.seconds += time.perf_counter() - started
+        self.hashed += len(passwords)
+        return hashes
+
+
+def set_password_link(user):
+    """Path of the page where ``user`` chooses a password; valid until it is used or expires."""
+    return reverse('set_password', args=[
+        urlsafe_base64_encode(force_bytes(user.pk)), default_token_generator.make_token(user),
+    ])
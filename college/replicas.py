@@ -0,0 +1,150 @@
+"""Read replicas for the read API, exports, dashboards and stats.
+
+Replicas are the ``replica_<n>`` aliases built from ``DATABASE_REPLICA_URLS``
+(see settings.py). ``ReplicaRouter`` sends a read to one of them only
+inside ``replica_reads`` (a decorator for views and functions, or a
+context manager), and never:
+
+* when the request has written anything, since a replica may not have the
+  write yet. Any write pins the rest of the request to the primary, and
+  ``ReplicaMiddleware`` sets a cookie so the user's next requests for
+  ``REPLICA_PIN_SECONDS`` stay there too (read-your-own-writes);
+* inside a transaction on the primary, which must see its own rows.
+
+Everything else, and every write, goes to ``default``.
+
+A lagging replica must not put old rows into the cache under an entity's
+new version (see caching.py), where they would stay until its next write.
+So while ``reading_from_replica()``, cached values are still served but
+nothing read is stored (``get_or_compute``, the dashboard snapshot, the
+role), and ``versioned_etag`` sends no validators for the page.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def read_alias():
+    """The alias a read inside ``replica_reads`` would use right now."""
+    replicas = settings.DATABASE_REPLICAS
+    state = _request_state.get()
+    if not replicas or (state is not None and state.pinned) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if state is None:
+        return random.choice(replicas)
+    # One replica per request, so its reads see a single replica's state.
+    if state.replica is None:
+        state.replica = random.choice(replicas)
+    return state.replica
+
+
+def reading_from_replica():
+    """Whether reads right now go to a replica, so what they return may be behind the cache versions."""
+    return _replica_reads.get() and read_alias() != DEFAULT_DB_ALIAS
+
+
+def pin_to_primary():
+    state = _request_state.get()
+    if state is not None:
+        state.pinned = state.wrote = True
+
+
+@contextmanager
+def _reading_from_replicas():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(function=None):
+    """Lets reads in ``function`` (sync or async), or in a ``with`` block, go to a replica."""
+    if function is None:
+        return _reading_from_replicas()
+
+    if iscoroutinefunction(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            with _reading_from_replicas():
+                return await function(*args, **kwargs)
+    else:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with _reading_from_replicas():
+                return function(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            # None lets Django keep related reads on the instance's database.
+            return None
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get the schema through replication, not migrate.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Tracks each request's writes for ``ReplicaRouter``; not used when there are no replicas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        return _request_state.set(RequestState(pinned=PIN_COOKIE in request.COOKIES))
+
+    def _finish(self, response, token):
+        state = _request_state.get()
+        _request_state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        return self._finish(self.get_response(request), token)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        return self._finish(await self.get_response(request), token)
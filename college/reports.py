@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import AttendanceRiskFlag, AttendanceRiskScan, AttendanceRollup, Enrollment, rollup_percentage
+
+SCAN_CHUNK_SIZE = 5000
+
+
+def run_attendance_risk_scan(threshold=None, dept=None, chunk_size=SCAN_CHUNK_SIZE):
+    """Flags every (student, course) pair whose attendance is below ``threshold``.
+
+    Percentages come from the attendance rollups in a single streamed query,
+    so the run is linear in the number of enrolled pairs and never touches
+    the raw Attendance rows. Pairs with no classes held yet, or whose enrollment was
+    dropped, are not flagged.
+    The result is stored as an AttendanceRiskScan with its flags.
+    """
+    if threshold is None:
+        threshold = settings.ATTENDANCE_THRESHOLD
+
+    enrolled = Enrollment.objects.filter(student=OuterRef('student'), course=OuterRef('course'))
+    rollups = AttendanceRollup.objects.filter(Exists(enrolled), total_count__gt=0)
+    if dept is not None:
+        rollups = rollups.filter(student__dept=dept)
+
+    with transaction.atomic():
+        scan = AttendanceRiskScan.objects.create(threshold=threshold, dept=dept)
+        scan.pairs_scanned = rollups.count()
+
+        at_risk = (
+            rollups.annotate(pct=rollup_percentage())
+            .filter(pct__lt=threshold)
+            .values_list('student_id', 'course_id', 'present_count', 'total_count', 'pct')
+            .order_by()
+        )
+        batch = []
+        for student_id, course_id, present, total, pct in at_risk.iterator(chunk_size=chunk_size):
+            batch.append(AttendanceRiskFlag(
+                scan=scan, student_id=student_id, course_id=course_id,
+                present_count=present, total_count=total, percentage=pct,
+            ))
+            if len(batch) >= chunk_size:
+                scan.flagged_count += len(AttendanceRiskFlag.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            scan.flagged_count += len(AttendanceRiskFlag.objects.bulk_create(batch))
+
+        scan.save(update_fields=['pairs_scanned', 'flagged_count'])
+    return scan
@@ -0,0 +1,131 @@
+"""Per-request role and profile resolution.
+
+``RoleMiddleware`` gives every request a lazy ``request.role`` (and
+``await request.arole()`` for async views) holding the user's Faculty and
+Student profiles. They are read from the cache, or loaded with one query
+on a miss; saving or deleting a user or a profile drops the entry (see
+``signals.py``), so a warm request resolves its role without any query.
+"""
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import record_cache
+from .models import User
+from .replicas import reading_from_replica
+
+ROLE_TIMEOUT = 3600
+
+_MISSING = object()
+
+
+def role_key(user_id):
+    return f'user_{user_id}_role'
+
+
+class Role:
+    def __init__(self, user, faculty=None, student=None):
+        self.user = user
+        self.faculty = faculty
+        self.student = student
+
+    @property
+    def is_faculty(self):
+        return self.faculty is not None
+
+    @property
+    def is_student(self):
+        return self.student is not None
+
+    def teaches(self, course):
+        """Whether the user may take ``course``'s attendance and enter its marks."""
+        return self.user.is_superuser or (self.is_faculty and course.faculty_id == self.faculty.pk)
+
+    def home(self):
+        """URL name or path the user lands on, or None when they have no role here."""
+        if self.is_faculty and self.user.is_superuser:
+            return 'select_role'
+        if self.user.user_type == 'faculty':
+            return 'teacher_dashboard'
+        if self.user.user_type == 'student':
+            return 'student_dashboard'
+        if self.user.is_staff:
+            return '/admin/'
+        return None
+
+
+def _load_profiles(user_id):
+    loaded = User.objects.select_related('faculty', 'student').filter(pk=user_id).first()
+    profiles = []
+    for name in ('faculty', 'student'):
+        profile = getattr(loaded, name, None)
+        if profile is not None:
+            # The request already has the user; don't cache a copy of it.
+            profile._state.fields_cache.pop('user', None)
+        profiles.append(profile)
+    return tuple(profiles)
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return Role(user)
+    key = role_key(user.pk)
+    profiles = cache.get(key, _MISSING)
+    record_cache(key, profiles is not _MISSING)
+    if profiles is _MISSING:
+        profiles = _load_profiles(user.pk)
+        if not reading_from_replica():
+            cache.set(key, profiles, ROLE_TIMEOUT)
+    for profile in profiles:
+        if profile is not None:
+            profile.user = user
+    return Role(user, *profiles)
+
+
+def invalidate_role(*user_ids):
+    """Drops the cached profiles of these users once the current transaction commits."""
+    keys = [role_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+async def _aget_role(request):
+    if not hasattr(request, '_cached_role'):
+        user = await request.auser()
+        request._cached_role = await sync_to_async(get_role)(user)
+    return request._cached_role
+
+
+def _get_role(request):
+    if not hasattr(request, '_cached_role'):
+        request._cached_role = get_role(request.user)
+    return request._cached_role
+
+
+class RoleMiddleware:
+    """Sets ``request.role`` and ``request.arole``; must come after AuthenticationMiddleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _attach(self, request):
+        request.role = SimpleLazyObject(partial(_get_role, request))
+        request.arole = partial(_aget_role, request)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._attach(request)
+        return await self.get_response(request)
@@ -0,0 +1,193 @@
+"""Typeahead and admin search over students, courses and faculty.
+
+On PostgreSQL, searches are ``icontains`` filters served by the trigram
+GIN indexes of migration 0011 (on ``UPPER(column)``, which is what
+Django's case-insensitive lookups compare), so they stay fast anywhere in
+a name. Other databases get an in-process prefix index per kind: every
+word of every searchable column, sorted, and searched with ``bisect``. It
+matches the start of words ("ali" finds "Sara Ali Khan", "cs-2" finds
+"CS-2021-014") rather than arbitrary substrings. Each process builds it
+on first use and rebuilds it when the kind's version changes; writes bump
+it through ``invalidate`` (see ``signals.py`` and ``importers.py``).
+"""
+import bisect
+import heapq
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .caching import bump_version, get_version
+from .models import Course, Faculty, Student
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Beyond this many prefix matches the admin filters with icontains instead
+# of a pk__in list (SQLite caps the number of query parameters).
+MAX_ID_FILTER = 2000
+
+# Words, and hyphenated codes both whole and in parts ("cs-2021-014", "2021").
+_WORD = re.compile(r'\w+(?:-\w+)*')
+_PART = re.compile(r'\w+')
+
+
+class Searchable:
+    """One kind of searchable object: its model, searched columns and how a match is shown.
+
+    ``label`` formats the columns for display; ``value`` is the column that
+    identifies a match when typed into a search box.
+    """
+
+    def __init__(self, model, fields, label, value):
+        self.model = model
+        self.fields = fields
+        self.label = label
+        self.value = value
+
+    def suggestion(self, pk, values):
+        return {'id': pk, 'label': self.label(*values), 'value': values[self.fields.index(self.value)]}
+
+    def filter(self, queryset, query):
+        """``queryset`` narrowed to rows where every word of ``query`` is in one of the columns."""
+        for term in query.split():
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+SEARCHABLES = {
+    'students': Searchable(
+        Student, ('name', 'roll_no'), lambda name, roll_no: f'{name} ({roll_no})', value='roll_no',
+    ),
+    'courses': Searchable(
+        Course, ('course_name', 'course_code'), lambda name, code: f'{code} {name}', value='course_code',
+    ),
+    'faculty': Searchable(Faculty, ('faculty_name',), lambda name: name, value='faculty_name'),
+}
+
+
+def _words(value):
+    value = value.lower()
+    words = set(_WORD.findall(value)) | set(_PART.findall(value))
+    words.add(value)
+    return words
+
+
+class PrefixIndex:
+    """Sorted (word, pk) pairs for one kind, plus the rows in display order.
+
+    ``names`` holds (first column, pk) sorted, ``order`` each pk's position
+    in it and ``suggestions`` what ``suggest`` returns for each pk.
+    """
+
+    def __init__(self, searchable):
+        self.entries = []
+        self.names = []
+        self.suggestions = {}
+        for pk, *values in searchable.model.objects.values_list('pk', *searchable.fields).iterator(chunk_size=5000):
+            self.names.append((values[0].lower(), pk))
+            self.suggestions[pk] = searchable.suggestion(pk, values)
+            for value in values:
+                self.entries.extend((word, pk) for word in _words(value))
+        self.entries.sort()
+        self.names.sort()
+        self.order = {pk: position for position, (_, pk) in enumerate(self.names)}
+
+    def named(self, prefix):
+        """Pks whose first column starts with ``prefix``, in display order."""
+        position = bisect.bisect_left(self.names, (prefix,))
+        while position < len(self.names) and self.names[position][0].startswith(prefix):
+            yield self.names[position][1]
+            position += 1
+
+    def _prefixed(self, term):
+        start = bisect.bisect_left(self.entries, (term,))
+        end = bisect.bisect_left(self.entries, (term + '\U0010ffff',), start)
+        return {pk for _, pk in self.entries[start:end]}
+
+    def match(self, query):
+        """Pks of rows with a word starting with each word of ``query``."""
+        matches = None
+        for term in query.lower().split():
+            found = self._prefixed(term)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return set()
+        return matches or set()
+
+
+_indexes = {}
+
+
+def _uses_trigrams():
+    return connection.vendor == 'postgresql'
+
+
+def prefix_index(kind):
+    version = get_version('search', kind)
+    cached = _indexes.get(kind)
+    if cached is None or cached[0] != version:
+        cached = (version, PrefixIndex(SEARCHABLES[kind]))
+        _indexes[kind] = cached
+    return cached[1]
+
+
+def invalidate(*kinds):
+    """Makes every process rebuild these kinds' prefix indexes once the current transaction commits."""
+    bump_version('search', *kinds)
+
+
+def filter_queryset(kind, queryset, query):
+    """Admin search: ``queryset`` narrowed to the rows matching ``query``."""
+    searchable = SEARCHABLES[kind]
+    if not _uses_trigrams():
+        ids = prefix_index(kind).match(query)
+        if len(ids) <= MAX_ID_FILTER:
+            return queryset.filter(pk__in=ids)
+    return searchable.filter(queryset, query)
+
+
+def suggest(kind, query, limit=DEFAULT_LIMIT, course_id=None):
+    """Up to ``limit`` ``{'id', 'label', 'value'}`` matches, best first.
+
+    Rows whose first column starts with the query come first, then
+    alphabetically. ``course_id`` restricts students to that course's roster.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    searchable = SEARCHABLES[kind]
+    candidates = searchable.model.objects.all()
+    if course_id is not None:
+        candidates = candidates.filter(enrollment__course_id=course_id)
+
+    if _uses_trigrams():
+        first = searchable.fields[0]
+        rows = (
+            searchable.filter(candidates, query)
+            .annotate(rank=Case(When(**{f'{first}__istartswith': query}, then=Value(0)), default=Value(1),
+                                output_field=IntegerField()))
+            .order_by('rank', first, 'pk')
+            .values_list('pk', *searchable.fields)[:limit]
+        )
+        return [searchable.suggestion(pk, values) for pk, *values in rows]
+
+    index = prefix_index(kind)
+    allowed = None if course_id is None else set(candidates.values_list('pk', flat=True))
+    # Rows named like the query are read in order straight off the index;
+    # only if there are too few are the other matches ranked.
+    ranked = []
+    for pk in index.named(' '.join(query.lower().split())):
+        if allowed is None or pk in allowed:
+            ranked.append(pk)
+            if len(ranked) == limit:
+                break
+    if len(ranked) < limit:
+        rest = index.match(query).difference(ranked)
+        if allowed is not None:
+            rest &= allowed
+        ranked += heapq.nsmallest(limit - len(ranked), rest, key=index.order.__getitem__)
+    return [index.suggestions[pk] for pk in ranked]
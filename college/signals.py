@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import bitmaps, grading, search
+from .caching import bump_course_version, bump_student_version, bump_version
+from .models import (
+    Assessment, Attendance, AttendanceRollup, Course, Department, Enrollment, Faculty, GradeWeight, Result,
+    Student, User, attendance_changed, rollup_signals_suspended,
+)
+from .roles import invalidate_role
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw or rollup_signals_suspended():
+        return
+    pairs = instance.rollup_pairs()
+    AttendanceRollup.objects.refresh(pairs)
+    instance._loaded_pair = (instance.student_id, instance.course_id)
+    attendance_changed.send(sender=Attendance, course_ids={course_id for _, course_id in pairs}, pairs=pairs)
+
+
+def _deleted_directly(sender, origin):
+    # Not as part of a cascade, whose origin regrades (or drops the grades) itself.
+    return origin is None or isinstance(origin, sender) or getattr(origin, 'model', None) is sender
+
+
+@receiver(post_delete, sender=Attendance)
+def decrement_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # A cascade from Student/Course deletes the rollups with it, and the
+    # deleted student's pairs are sent once below.
+    if rollup_signals_suspended() or not _deleted_directly(sender, origin):
+        return
+    AttendanceRollup.objects.filter(
+        student_id=instance.student_id, course_id=instance.course_id
+    ).update(
+        total_count=Greatest(F('total_count') - 1, Value(0)),
+        present_count=Greatest(F('present_count') - int(instance.status), Value(0)),
+    )
+    attendance_changed.send(
+        sender=Attendance, course_ids={instance.course_id}, pairs={(instance.student_id, instance.course_id)},
+    )
+
+
+@receiver(pre_delete, sender=Student)
+def remember_attendance_pairs(sender, instance, **kwargs):
+    instance._attendance_pairs = set(
+        Attendance.objects.filter(student=instance).values_list('student_id', 'course_id').distinct()
+    )
+
+
+@receiver(post_delete, sender=Student)
+def attendance_changed_on_student_delete(sender, instance, **kwargs):
+    pairs = getattr(instance, '_attendance_pairs', set())
+    if pairs:
+        attendance_changed.send(sender=Attendance, course_ids={course_id for _, course_id in pairs}, pairs=pairs)
+
+
+@receiver(attendance_changed)
+def invalidate_course_on_attendance(sender, course_ids, **kwargs):
+    bump_course_version(*course_ids)
+
+
+@receiver(attendance_changed)
+def refresh_bitmaps_on_attendance(sender, pairs, **kwargs):
+    if settings.ATTENDANCE_BITMAPS:
+        bitmaps.refresh(pairs)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_course_on_enrollment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_course_version(instance.course_id)
+        bump_student_version(instance.student_id)
+
+
+@receiver(post_save, sender=Student)
+def invalidate_courses_on_student_save(sender, instance, created, raw=False, **kwargs):
+    # Rosters cache names and roll numbers; a brand new student is in no course yet.
+    if not (created or raw):
+        bump_student_version(instance.pk)
+        bump_course_version(*instance.enrollment_set.values_list('course_id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+def invalidate_course_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_teacher_on_course_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('faculty', instance.faculty_id, getattr(instance, '_loaded_faculty_id', None))
+        instance._loaded_faculty_id = instance.faculty_id
+
+
+@receiver(post_save, sender=Department)
+def invalidate_teachers_on_department_change(sender, instance, created, raw=False, **kwargs):
+    # Teacher dashboards show each course's department name.
+    if not (created or raw):
+        bump_version('faculty', *Course.objects.filter(dept=instance).values_list('faculty_id', flat=True))
+
+
+@receiver(post_save, sender=Faculty)
+def invalidate_teacher_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('faculty', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_on_change(sender, instance, raw=False, **kwargs):
+    # Every page shows the user's name; logging in also saves last_login.
+    if not raw:
+        bump_version('user', instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_role_on_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logging in only saves last_login, which the cached role doesn't hold.
+    if not raw and update_fields != frozenset({'last_login'}):
+        invalidate_role(instance.pk)
+
+
+@receiver(post_save, sender=Assessment)
+@receiver(post_delete, sender=Assessment)
+def invalidate_assessment_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('assessment', instance.pk)
+        bump_course_version(instance.course_id)
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def invalidate_on_result(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_student_version(instance.student_id)
+        bump_version('assessment', instance.assessment_id)
+        # Result has no course column; marks statistics are cached per course.
+        bump_course_version(Assessment.objects.filter(pk=instance.assessment_id).values_list('course_id', flat=True).first())
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def regrade_on_result(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and _deleted_directly(sender, origin):
+        course_id = Assessment.objects.filter(pk=instance.assessment_id).values_list('course_id', flat=True).first()
+        if course_id is not None:
+            grading.grade_courses([course_id], [instance.student_id])
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def regrade_on_enrollment(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and _deleted_directly(sender, origin):
+        grading.grade_courses([instance.course_id], [instance.student_id])
+
+
+@receiver(post_save, sender=Assessment)
+@receiver(post_delete, sender=Assessment)
+@receiver(post_save, sender=GradeWeight)
+@receiver(post_delete, sender=GradeWeight)
+def regrade_course(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and _deleted_directly(sender, origin):
+        grading.grade_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Faculty)
+@receiver(post_delete, sender=Faculty)
+def invalidate_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.invalidate(*(kind for kind, searchable in search.SEARCHABLES.items() if searchable.model is sender))
@@ -0,0 +1,172 @@
+"""Batched replay of submissions the service worker queued while offline.
+
+Each submission carries a client-generated idempotency key, stored in a
+SyncReceipt together with its result, so a batch that is retried after a
+dropped response is answered from the receipts (status ``duplicate``,
+with the stored ``result``) instead of being applied again. A submission
+is one of::
+
+    {"key": "...", "type": "attendance", "course": 3, "date": "2025-01-06", "present": [12, 15]}
+    {"key": "...", "type": "marks", "assessment": 8, "marks": {"12": "17.5", "15": "20"}}
+
+An attendance roll may add ``"students": [...]``, the roster page it was
+taken on; only those students' rows are written. Submissions for a course
+the user doesn't teach (see ``Role.teaches``) are answered ``forbidden``
+and not applied.
+
+All attendance rolls in a batch are written with one ``submit_rolls`` upsert;
+when a batch holds several rolls for the same course and date, a later roll
+that covers all of an earlier one's students supersedes it, and rolls that
+only partly overlap are written one after the other, in order.
+"""
+import datetime
+
+from django.db import transaction
+
+from .attendance import submit_rolls
+from .gradebook import enter_marks
+from .models import Assessment, Course, SyncReceipt
+
+MAX_BATCH_SIZE = 200
+
+
+class InvalidSubmission(ValueError):
+    pass
+
+
+def _parse(item):
+    if not isinstance(item, dict):
+        raise InvalidSubmission("Expected an object.")
+    key = item.get('key')
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        raise InvalidSubmission("Missing or invalid idempotency key.")
+    try:
+        if item.get('type') == 'attendance':
+            return key, 'attendance', (
+                int(item['course']),
+                datetime.date.fromisoformat(item['date']),
+                {int(student_id) for student_id in item.get('present', [])},
+                None if item.get('students') is None else {int(student_id) for student_id in item['students']},
+            )
+        if item.get('type') == 'marks':
+            return key, 'marks', (
+                int(item['assessment']),
+                {int(student_id): marks for student_id, marks in item['marks'].items()},
+            )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise InvalidSubmission(f"Malformed {item.get('type')} submission.")
+    raise InvalidSubmission("Unknown submission type.")
+
+
+def apply_batch(role, items):
+    """Applies each of ``role``'s not yet seen submissions once; returns one result dict per item, in order."""
+    user = role.user
+    results = [None] * len(items)
+    parsed = {}
+    first_index = {}
+    for index, item in enumerate(items):
+        try:
+            key, kind, payload = _parse(item)
+        except InvalidSubmission as e:
+            results[index] = {'key': item.get('key') if isinstance(item, dict) else None,
+                              'status': 'invalid', 'error': str(e)}
+            continue
+        if key in first_index:
+            continue
+        first_index[key] = index
+        parsed[index] = (key, kind, payload)
+
+    with transaction.atomic():
+        receipts = dict(
+            SyncReceipt.objects.filter(user=user, idempotency_key__in=first_index)
+            .values_list('idempotency_key', 'result')
+        )
+        new = {index: entry for index, entry in parsed.items() if entry[0] not in receipts}
+        for index, (key, _, _) in parsed.items():
+            if key in receipts:
+                results[index] = {'key': key, 'status': 'duplicate', 'result': receipts[key]}
+
+        _apply_attendance(role, new, results)
+        _apply_marks(role, new, results)
+
+        SyncReceipt.objects.bulk_create(
+            [
+                SyncReceipt(user=user, idempotency_key=key, kind=kind, result=results[index])
+                for index, (key, kind, _) in new.items()
+            ],
+            # A concurrent retry of the same batch may have stored them first.
+            ignore_conflicts=True,
+        )
+
+    # Repeated keys within the batch get the first occurrence's result.
+    for index, item in enumerate(items):
+        if results[index] is None:
+            first = results[first_index[item['key']]]
+            results[index] = first if first['status'] == 'duplicate' else {
+                'key': item['key'], 'status': 'duplicate', 'result': first,
+            }
+    return results
+
+
+def _covers(later, earlier):
+    return later is None or (earlier is not None and earlier <= later)
+
+
+def _forbidden(key):
+    return {'key': key, 'status': 'forbidden', 'error': "Not one of your courses."}
+
+
+def _apply_attendance(role, new, results):
+    rolls = {index: payload for index, (_, kind, payload) in new.items() if kind == 'attendance'}
+    courses = Course.objects.only('faculty').in_bulk({payload[0] for payload in rolls.values()})
+    # Each wave holds at most one roll per (course, date) and is written
+    # with one submit_rolls call; later waves overwrite earlier ones.
+    waves = []
+    for index, (course_id, attendance_date, _, student_ids) in rolls.items():
+        key = new[index][0]
+        if course_id not in courses:
+            results[index] = {'key': key, 'status': 'invalid', 'error': "Unknown course."}
+            continue
+        if not role.teaches(courses[course_id]):
+            results[index] = _forbidden(key)
+            continue
+        slot = (course_id, attendance_date)
+        last_wave = -1
+        for number, wave in enumerate(waves):
+            earlier = wave.get(slot)
+            if earlier is None:
+                continue
+            if _covers(student_ids, rolls[earlier][3]):
+                results[earlier] = {'key': new[earlier][0], 'status': 'superseded'}
+                del wave[slot]
+            else:
+                last_wave = number
+        if last_wave + 1 == len(waves):
+            waves.append({})
+        waves[last_wave + 1][slot] = index
+
+    for wave in waves:
+        indexes = list(wave.values())
+        for index, counts in zip(indexes, submit_rolls([rolls[index] for index in indexes])):
+            results[index] = {'key': new[index][0], 'status': 'applied', **counts}
+
+
+def _apply_marks(role, new, results):
+    entries = {index: payload for index, (_, kind, payload) in new.items() if kind == 'marks'}
+    assessments = Assessment.objects.select_related('course').in_bulk(
+        {assessment_id for assessment_id, _ in entries.values()}
+    )
+    for index, (assessment_id, marks) in entries.items():
+        key = new[index][0]
+        if assessment_id not in assessments:
+            results[index] = {'key': key, 'status': 'invalid', 'error': "Unknown assessment."}
+            continue
+        if not role.teaches(assessments[assessment_id].course):
+            results[index] = _forbidden(key)
+            continue
+        outcome = enter_marks(assessments[assessment_id], marks)
+        errors = {str(student_id): message for student_id, message in outcome.pop('errors').items()}
+        if errors:
+            results[index] = {'key': key, 'status': 'rejected', 'errors': errors}
+        else:
+            results[index] = {'key': key, 'status': 'applied', **outcome}
@@ -0,0 +1,51 @@
+"""Small builders for test data; each takes only what a test cares about."""
+from itertools import count
+
+from django.test import override_settings
+
+from college.models import Assessment, Course, Department, Enrollment, Faculty, Student, User
+
+_numbers = count(1)
+
+
+def make_department(name=None):
+    return Department.objects.create(dept_name=name or f'Department {next(_numbers)}')
+
+
+def make_faculty(dept=None, username=None):
+    username = username or f'teacher{next(_numbers)}'
+    user = User.objects.create_user(username, password=None, user_type='faculty')
+    return Faculty.objects.create(user=user, faculty_name=username.title(), dept=dept or make_department())
+
+
+def make_student(dept=None, roll_no=None, name=None):
+    roll_no = roll_no or f'R-{next(_numbers):04d}'
+    user = User.objects.create_user(roll_no.lower(), password=None, user_type='student')
+    return Student.objects.create(
+        user=user, roll_no=roll_no, name=name or f'Student {roll_no}', dept=dept or make_department(), semester=1,
+    )
+
+
+def make_course(faculty=None, dept=None, code=None, students=()):
+    number = next(_numbers)
+    course = Course.objects.create(
+        course_name=f'Course {number}', course_code=code or f'C-{number:03d}',
+        dept=dept or (faculty.dept if faculty else make_department()), faculty=faculty,
+    )
+    for student in students:
+        Enrollment.objects.create(student=student, course=course)
+    return course
+
+
+def make_assessment(course, full_marks=100, type='exam'):
+    return Assessment.objects.create(
+        assessment_name=f'Assessment {next(_numbers)}', assessment_full_marks=full_marks, type=type, course=course,
+    )
+
+
+# Tests run with DEBUG off and no collectstatic, so the manifest storage
+# can't resolve {% static %}; views that render templates use this.
+plain_static_files = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
@@ -0,0 +1,119 @@
+import csv
+import datetime
+import io
+
+from django.contrib import admin
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse, reverse_lazy
+
+from college.models import Attendance, AttendanceRiskScan, Student, User
+
+from .factories import make_course, make_department, make_student, plain_static_files
+
+
+@plain_static_files
+class ExportCsvTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('exporter', password=None))
+        self.physics = make_department('Physics')
+        self.students = [make_student(self.physics) for _ in range(3)]
+        self.other = make_student(make_department('Chemistry'))
+
+    def export(self, model, selected, query='', **data):
+        opts = model._meta
+        response = self.client.post(
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist') + query,
+            {'action': 'export_as_csv', '_selected_action': [obj.pk for obj in selected], **data},
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_selected_rows(self):
+        header, *rows = self.export(Student, self.students[:2])
+        self.assertEqual(header, [field.attname for field in Student._meta.concrete_fields])
+        self.assertEqual(sorted(int(row[0]) for row in rows), sorted(s.pk for s in self.students[:2]))
+
+    def test_select_all_exports_the_filtered_changelist(self):
+        _, *rows = self.export(
+            Student, self.students[:1], query=f'?dept__dept_id__exact={self.physics.pk}', select_across='1',
+        )
+        self.assertEqual(sorted(int(row[0]) for row in rows), sorted(s.pk for s in self.students))
+
+    def test_joined_columns_in_export_fields_order(self):
+        course = make_course(code='PHY-101', students=self.students)
+        rows = [
+            Attendance.objects.create(student=student, course=course, date=datetime.date(2025, 3, 3), status=True)
+            for student in self.students
+        ]
+        model_admin = admin.site._registry[Attendance]
+        model_admin.export_chunk_size = 2
+        try:
+            header, *exported = self.export(Attendance, rows)
+        finally:
+            del model_admin.export_chunk_size
+        self.assertEqual(header, list(model_admin.export_fields))
+        self.assertEqual(
+            sorted(exported),
+            sorted(
+                [str(row.pk), str(row.student_id), row.student.roll_no, str(course.pk), 'PHY-101', '2025-03-03', 'True']
+                for row in rows
+            ),
+        )
+
+
+@plain_static_files
+class RunRiskScanTests(TestCase):
+    url = reverse_lazy('admin:college_attendanceriskscan_run')
+
+    def test_anonymous_users_are_sent_to_log_in(self):
+        response = self.client.post(self.url)
+        self.assertRedirects(response, f"{reverse('admin:login')}?next={self.url}", fetch_redirect_response=False)
+        self.assertFalse(AttendanceRiskScan.objects.exists())
+
+    def test_staff_without_the_add_permission(self):
+        self.client.force_login(User.objects.create_user('clerk', password=None, is_staff=True))
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        self.assertFalse(AttendanceRiskScan.objects.exists())
+
+    def test_only_post_runs_a_scan(self):
+        self.client.force_login(User.objects.create_superuser('dean', password=None))
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertFalse(AttendanceRiskScan.objects.exists())
+        response = self.client.post(self.url)
+        self.assertRedirects(response, reverse('admin:college_attendanceriskscan_changelist'))
+        self.assertEqual(AttendanceRiskScan.objects.count(), 1)
+
+    def test_changelist_offers_the_button_to_those_allowed(self):
+        changelist = reverse('admin:college_attendanceriskscan_changelist')
+        self.client.force_login(User.objects.create_superuser('dean', password=None))
+        self.assertContains(self.client.get(changelist), f'action="{self.url}"')
+        viewer = User.objects.create_user('viewer', password=None, is_staff=True)
+        viewer.user_permissions.add(Permission.objects.get(codename='view_attendanceriskscan'))
+        self.client.force_login(viewer)
+        self.assertNotContains(self.client.get(changelist), f'action="{self.url}"')
+
+
+@plain_static_files
+class ImportCsvAccessTests(TestCase):
+    url = reverse_lazy('admin:college_student_changelist')
+
+    def post_students(self):
+        upload = SimpleUploadedFile('students.csv', b'roll_no,name,dept_name,semester\nS-1,Ada,Physics,1\n')
+        return self.client.post(f'{self.url}import-csv/', {'csv_file': upload})
+
+    def test_anonymous_users_are_sent_to_log_in(self):
+        self.assertEqual(self.post_students().status_code, 302)
+        self.assertFalse(Student.objects.exists())
+
+    def test_staff_without_the_add_permission(self):
+        self.client.force_login(User.objects.create_user('clerk', password=None, is_staff=True))
+        self.assertEqual(self.post_students().status_code, 403)
+        self.assertFalse(Student.objects.exists())
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_import(self):
+        self.client.force_login(User.objects.create_superuser('registrar', password=None))
+        self.assertRedirects(self.post_students(), self.url)
+        self.assertEqual(Student.objects.get().roll_no, 'S-1')
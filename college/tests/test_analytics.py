@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from college.analytics import assessment_stats, course_stats
+from college.models import Result, User
+
+from .factories import make_assessment, make_course, make_faculty, make_student
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.students = [make_student() for _ in range(3)]
+        self.teacher = make_faculty()
+        self.course = make_course(self.teacher, students=self.students)
+        self.exam = make_assessment(self.course, full_marks=20)
+
+    def enter(self, assessment, *marks):
+        with self.captureOnCommitCallbacks(execute=True):
+            for student, value in zip(self.students, marks):
+                Result.objects.update_or_create(
+                    assessment=assessment, student=student, defaults={'marks': Decimal(value)},
+                )
+
+    def test_assessment(self):
+        self.enter(self.exam, 10, 15, 20)
+        stats = assessment_stats(self.exam)
+        self.assertEqual((stats['count'], stats['mean'], stats['median']), (3, 75.0, 75.0))
+        self.assertEqual((stats['min'], stats['max']), (50.0, 100.0))
+        self.assertAlmostEqual(stats['std'], 20.4124, places=4)
+        self.assertEqual(stats['percentiles']['p25'], 62.5)
+        self.assertEqual(sum(stats['histogram']['counts']), 3)
+        self.assertEqual(
+            stats['z_scores'], dict(zip([s.pk for s in self.students], [-1.2247, 0.0, 1.2247])),
+        )
+
+    def test_no_results(self):
+        self.assertEqual(assessment_stats(self.exam), {'count': 0})
+
+    def test_course_averages_each_students_percentages(self):
+        project = make_assessment(self.course, full_marks=50, type='project')
+        self.enter(self.exam, 10, 20, 20)
+        self.enter(project, 50, 25, 50)
+        stats = course_stats(self.course)
+        # Averages of 50/100, 100/50 and 100/100.
+        self.assertEqual((stats['count'], stats['min'], stats['max']), (3, 75.0, 100.0))
+
+    def test_zero_full_marks_are_left_out(self):
+        ungraded = make_assessment(self.course, full_marks=0)
+        self.enter(ungraded, 0, 0, 0)
+        self.assertEqual(assessment_stats(ungraded), {'count': 0})
+        self.enter(self.exam, 20, 20, 20)
+        self.assertEqual(course_stats(self.course)['mean'], 100.0)
+
+    def test_new_marks_replace_cached_stats(self):
+        self.enter(self.exam, 10, 10, 10)
+        self.assertEqual(assessment_stats(self.exam)['mean'], 50.0)
+        self.assertEqual(course_stats(self.course)['mean'], 50.0)
+        self.enter(self.exam, 20, 20, 20)
+        self.assertEqual(assessment_stats(self.exam)['mean'], 100.0)
+        self.assertEqual(course_stats(self.course)['mean'], 100.0)
+
+
+class StatsAccessTests(TestCase):
+    """Stats carry every student's z-score, so only staff and the course's faculty may read them."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = make_student()
+        self.teacher = make_faculty()
+        self.course = make_course(self.teacher, students=[self.student])
+        self.exam = make_assessment(self.course)
+        Result.objects.create(assessment=self.exam, student=self.student, marks=Decimal(60))
+
+    def statuses(self, user):
+        self.client.force_login(user)
+        return [
+            self.client.get(reverse('course_stats_api', args=[self.course.pk])).status_code,
+            self.client.get(reverse('assessment_stats_api', args=[self.exam.pk])).status_code,
+        ]
+
+    def test_refused(self):
+        self.assertEqual(self.statuses(self.student.user), [403, 403])
+        self.assertEqual(self.statuses(make_faculty().user), [403, 403])
+
+    def test_allowed(self):
+        self.assertEqual(self.statuses(self.teacher.user), [200, 200])
+        self.assertEqual(self.statuses(User.objects.create_user('registrar', password=None, is_staff=True)), [200, 200])
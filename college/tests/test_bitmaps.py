@@ -0,0 +1,85 @@
+import datetime
+
+from django.test import TestCase, override_settings
+
+from college import bitmaps
+from college.models import Attendance, AttendanceBitmap, SessionBitmap
+
+from .factories import make_course, make_student
+
+DAY = datetime.date(2025, 6, 27)
+
+
+def days(count, start=DAY):
+    return [start + datetime.timedelta(days=n) for n in range(count)]
+
+
+@override_settings(ATTENDANCE_BITMAPS=True)
+class IncrementalBitmapTests(TestCase):
+    """Bitmaps kept up to date write by write match a full build from Attendance."""
+
+    def setUp(self):
+        self.students = [make_student() for _ in range(3)]
+        self.course = make_course(students=self.students)
+        self.other_course = make_course(students=self.students)
+        # Six days from late June cross into the second half of the year.
+        Attendance.objects.bulk_create([
+            Attendance(student=student, course=course, date=day, status=(student.pk + day.day) % 3 != 0)
+            for student in self.students for course in (self.course, self.other_course) for day in days(6)
+        ])
+
+    def stored(self):
+        return (
+            {(s, c, t, bytes(p), bytes(r)) for s, c, t, p, r in AttendanceBitmap.objects.values_list(
+                'student_id', 'course_id', 'term', 'present', 'recorded')},
+            {(c, t, bytes(h)) for c, t, h in SessionBitmap.objects.values_list('course_id', 'term', 'held')},
+        )
+
+    def assertMatchesFullBuild(self):
+        incremental = self.stored()
+        bitmaps.build()
+        self.assertEqual(incremental, self.stored())
+
+    def test_bulk_create(self):
+        self.assertMatchesFullBuild()
+
+    def test_save_and_delete(self):
+        row = Attendance.objects.create(student=self.students[0], course=self.course, date=DAY - datetime.timedelta(days=30))
+        row.status = True
+        row.save()
+        Attendance.objects.filter(student=self.students[1], course=self.course).first().delete()
+        self.assertMatchesFullBuild()
+
+    def test_moving_rows_to_another_course(self):
+        Attendance.objects.filter(student=self.students[0], course=self.course).delete()
+        Attendance.objects.filter(student=self.students[0], course=self.other_course).update(course=self.course)
+        self.assertMatchesFullBuild()
+
+    def test_bulk_update_and_queryset_delete(self):
+        rows = list(Attendance.objects.filter(course=self.course, date=DAY))
+        for row in rows:
+            row.status = not row.status
+        Attendance.objects.bulk_update(rows, ['status'])
+        # Every student's last day goes, so the course no longer held class then.
+        Attendance.objects.filter(course=self.course, date=days(6)[-1]).delete()
+        self.assertMatchesFullBuild()
+
+    def test_a_student_leaving_the_term_empty(self):
+        Attendance.objects.filter(course=self.course, date__gte=datetime.date(2025, 7, 1)).delete()
+        self.assertFalse(SessionBitmap.objects.filter(course=self.course, term='2025-2').exists())
+        self.assertMatchesFullBuild()
+
+    def test_deleting_a_student_or_course(self):
+        self.students[2].delete()
+        self.other_course.delete()
+        self.assertMatchesFullBuild()
+
+    def test_deleting_the_only_student_present_on_a_day(self):
+        Attendance.objects.create(student=self.students[0], course=self.course, date=DAY - datetime.timedelta(days=1))
+        self.students[0].delete()
+        self.assertMatchesFullBuild()
+
+    def test_only_the_written_students_bitmaps_are_replaced(self):
+        untouched = set(AttendanceBitmap.objects.exclude(student=self.students[0]).values_list('pk', flat=True))
+        Attendance.objects.create(student=self.students[0], course=self.course, date=DAY - datetime.timedelta(days=1))
+        self.assertLessEqual(untouched, set(AttendanceBitmap.objects.values_list('pk', flat=True)))
@@ -0,0 +1,182 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from college import dashboard
+from college.caching import bump_version, get_or_compute, get_version
+from college.importers import EnrollmentImporter
+from college.models import Attendance, Enrollment, Result
+
+from .factories import make_assessment, make_course, make_faculty, make_student, plain_static_files
+
+DAY = datetime.date(2025, 3, 3)
+
+
+class VersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_the_version_once_the_transaction_commits(self):
+        before = get_version('course', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version('course', 1)
+            self.assertEqual(get_version('course', 1), before)
+        self.assertGreater(get_version('course', 1), before)
+
+    def test_rolled_back_bump_changes_nothing(self):
+        before = get_version('course', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump_version('course', 1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(get_version('course', 1), before)
+
+    def test_bumps_in_the_same_millisecond_still_differ(self):
+        seen = {get_version('student', 7)}
+        for _ in range(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_version('student', 7)
+            seen.add(get_version('student', 7))
+        self.assertEqual(len(seen), 6)
+
+    def test_get_or_compute_computes_once(self):
+        calls = []
+        compute = lambda: calls.append(1) or {'value': len(calls)}  # noqa: E731
+        self.assertEqual(get_or_compute('some_key', compute, 60), {'value': 1})
+        self.assertEqual(get_or_compute('some_key', compute, 60), {'value': 1})
+        self.assertEqual(len(calls), 1)
+
+
+class SignalBumpTests(TestCase):
+    """Writes bump the versions of the entities whose cached pages they change."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = make_student()
+        self.course = make_course()
+
+    def assertBumps(self, entities, write):
+        before = {entity: get_version(*entity) for entity in entities}
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        for entity in entities:
+            self.assertGreater(get_version(*entity), before[entity], entity)
+
+    def test_enrollment(self):
+        self.assertBumps(
+            [('student', self.student.pk), ('course', self.course.pk)],
+            lambda: Enrollment.objects.create(student=self.student, course=self.course),
+        )
+
+    def test_enrollment_import(self):
+        upload = io.BytesIO(f'student_roll_no,course_code\n{self.student.roll_no},{self.course.course_code}\n'.encode())
+        self.assertBumps(
+            [('student', self.student.pk), ('course', self.course.pk)],
+            lambda: EnrollmentImporter().run(upload),
+        )
+
+    def test_bulk_attendance(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertBumps(
+            [('course', self.course.pk)],
+            lambda: Attendance.objects.bulk_create([
+                Attendance(student=self.student, course=self.course, date=DAY, status=True),
+            ]),
+        )
+
+    def test_result(self):
+        assessment = make_assessment(self.course)
+        self.assertBumps(
+            [('student', self.student.pk), ('course', self.course.pk), ('assessment', assessment.pk)],
+            lambda: Result.objects.create(assessment=assessment, student=self.student, marks=Decimal(50)),
+        )
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_student()
+        self.course = make_course(students=[self.student])
+        Attendance.objects.create(student=self.student, course=self.course, date=DAY, status=True)
+
+    def percentage(self):
+        return dashboard.get_student_snapshot(self.student.pk)['attendance_data'][0]['percentage']
+
+    def test_write_during_a_rebuild_is_not_kept(self):
+        # The attendance write lands after the snapshot read the courses; the
+        # snapshot may hold the old figure but must not be cached as current.
+        build = dashboard._snapshot_queries
+
+        def racing(student_id):
+            student, courses, assessments = build(student_id)
+            return student, _WriteAfterReading(courses, self.mark_absent), assessments
+
+        with mock.patch.object(dashboard, '_snapshot_queries', racing):
+            self.assertEqual(self.percentage(), 100)
+        self.assertEqual(self.percentage(), 50)
+
+    def mark_absent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(
+                student=self.student, course=self.course, date=DAY + datetime.timedelta(days=1), status=False,
+            )
+
+
+class _WriteAfterReading:
+    def __init__(self, queryset, write):
+        self.queryset = queryset
+        self.write = write
+
+    def __iter__(self):
+        rows = list(self.queryset)
+        self.write()
+        return iter(rows)
+
+
+@plain_static_files
+class ConditionalDashboardTests(TestCase):
+    """The student dashboard answers 304 to its own ETag until something on it changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = make_student()
+        self.course = make_course(make_faculty(), students=[self.student])
+        self.assessment = make_assessment(self.course)
+        self.client.force_login(self.student.user)
+        self.url = reverse('student_dashboard')
+
+    def get(self, etag=None):
+        return self.client.get(self.url, **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_result_changes_the_page(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Result.objects.create(assessment=self.assessment, student=self.student, marks=Decimal('42.50'))
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, '42.5')
+
+    def test_imported_enrollment_changes_the_page(self):
+        etag = self.get()['ETag']
+        new_course = make_course()
+        upload = io.BytesIO(f'student_roll_no,course_code\n{self.student.roll_no},{new_course.course_code}\n'.encode())
+        with self.captureOnCommitCallbacks(execute=True):
+            EnrollmentImporter().run(upload)
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, new_course.course_name)
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from college.gradebook import enter_marks, enter_marks_by_roll_no
+from college.models import Result
+
+from .factories import make_assessment, make_course, make_student
+
+
+class EnterMarksTests(TestCase):
+    def setUp(self):
+        self.students = [make_student() for _ in range(3)]
+        self.course = make_course(students=self.students)
+        self.assessment = make_assessment(self.course, full_marks=20)
+
+    def stored(self):
+        return dict(Result.objects.filter(assessment=self.assessment).values_list('student_id', 'marks'))
+
+    def test_counts(self):
+        first, second, third = self.students
+        enter_marks(self.assessment, {first.pk: '10', second.pk: '12'})
+        outcome = enter_marks(self.assessment, {first.pk: '10', second.pk: '15', third.pk: '7.5'})
+        self.assertEqual(outcome, {'created': 1, 'updated': 1, 'unchanged': 1, 'errors': {}})
+        self.assertEqual(self.stored(), {first.pk: 10, second.pk: 15, third.pk: Decimal('7.5')})
+
+    def test_blank_entries_are_skipped(self):
+        outcome = enter_marks(self.assessment, {self.students[0].pk: '', self.students[1].pk: None})
+        self.assertEqual(outcome, {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': {}})
+
+    def test_invalid_marks(self):
+        outsider = make_student()
+        first, second, third = self.students
+        outcome = enter_marks(self.assessment, {first.pk: '-1', second.pk: '21', third.pk: 'ten', outsider.pk: '5'})
+        self.assertEqual(outcome['errors'], {
+            first.pk: "Marks cannot be negative.",
+            second.pk: "Marks cannot exceed full marks (20).",
+            third.pk: "Enter a number.",
+            outsider.pk: "Student is not enrolled in this course.",
+        })
+
+    def test_one_bad_row_writes_nothing(self):
+        first, second, third = self.students
+        enter_marks(self.assessment, {first.pk: '10'})
+        outcome = enter_marks(self.assessment, {first.pk: '12', second.pk: '8', third.pk: '99'})
+        self.assertEqual(list(outcome['errors']), [third.pk])
+        self.assertEqual(self.stored(), {first.pk: 10})
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        def queries_to_enter(assessment, students):
+            with CaptureQueriesContext(connection) as queries:
+                enter_marks(assessment, {student.pk: '10' for student in students})
+            return len(queries)
+
+        bigger = [make_student() for _ in range(12)]
+        bigger_assessment = make_assessment(make_course(students=bigger), full_marks=20)
+        self.assertEqual(queries_to_enter(self.assessment, self.students), queries_to_enter(bigger_assessment, bigger))
+
+
+class EnterMarksByRollNoTests(TestCase):
+    def setUp(self):
+        self.student = make_student()
+        self.assessment = make_assessment(make_course(students=[self.student]), full_marks=20)
+
+    def test_rows_are_matched_by_roll_number(self):
+        outcome = enter_marks_by_roll_no(self.assessment, [(self.student.roll_no, '18')])
+        self.assertEqual(outcome['created'], 1)
+        self.assertEqual(Result.objects.get().marks, 18)
+
+    def test_errors_are_keyed_by_roll_number(self):
+        outcome = enter_marks_by_roll_no(self.assessment, [(self.student.roll_no, '30'), ('NOBODY', '5')])
+        self.assertEqual(outcome['errors'], {
+            self.student.roll_no: "Marks cannot exceed full marks (20).", 'NOBODY': "Unknown roll number.",
+        })
+        self.assertFalse(Result.objects.exists())
@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from college.gradebook import enter_marks
+from college.grading import grade_all, grade_courses, letter_for, weighted_percentage
+from college.models import CourseGrade, Enrollment, GradeWeight, Result
+
+from .factories import make_assessment, make_course, make_student
+
+
+class WeightedPercentageTests(TestCase):
+    def test_missing_types_are_left_out_and_the_rest_scaled(self):
+        weights = {'exam': Decimal(60), 'assignment': Decimal(25), 'project': Decimal(15)}
+        # Only an exam so far: it counts for the whole grade.
+        self.assertEqual(weighted_percentage(weights, {'exam': Decimal(50)}, {'exam': Decimal(40)}), Decimal('80.00'))
+        # 60% of 40/50 plus 25% of 10/20, over 85%.
+        self.assertEqual(
+            weighted_percentage(
+                weights, {'exam': Decimal(50), 'assignment': Decimal(20)}, {'exam': Decimal(40), 'assignment': Decimal(10)},
+            ),
+            Decimal('71.18'),
+        )
+
+    def test_nothing_to_grade(self):
+        self.assertIsNone(weighted_percentage({'exam': Decimal(100)}, {}, {}))
+        self.assertIsNone(weighted_percentage({'exam': Decimal(100)}, {'project': Decimal(10)}, {}))
+
+    def test_letters(self):
+        self.assertEqual(letter_for(Decimal('90.00')), 'A+')
+        self.assertEqual(letter_for(Decimal('89.99')), 'A')
+        self.assertEqual(letter_for(Decimal('39.99')), 'F')
+
+
+class IncrementalGradingTests(TestCase):
+    """Stored grades follow every write without a full regrade."""
+
+    def setUp(self):
+        self.alice, self.bob = make_student(), make_student()
+        self.course = make_course(students=[self.alice, self.bob])
+        self.exam = make_assessment(self.course, full_marks=50, type='exam')
+        self.assignment = make_assessment(self.course, full_marks=20, type='assignment')
+
+    def grade(self, student):
+        row = CourseGrade.objects.filter(student=student, course=self.course).values_list('percentage', 'letter')
+        return row.first()
+
+    def assertMatchesFullRegrade(self):
+        stored = set(CourseGrade.objects.values_list('student_id', 'course_id', 'percentage', 'letter'))
+        grade_all()
+        self.assertEqual(set(CourseGrade.objects.values_list('student_id', 'course_id', 'percentage', 'letter')), stored)
+
+    def test_result_save_and_delete(self):
+        result = Result.objects.create(assessment=self.exam, student=self.alice, marks=Decimal(40))
+        Result.objects.create(assessment=self.assignment, student=self.alice, marks=Decimal(10))
+        self.assertEqual(self.grade(self.alice), (Decimal('71.18'), 'B'))
+        # A missing result counts as zero.
+        self.assertEqual(self.grade(self.bob), (Decimal('0.00'), 'F'))
+        result.marks = Decimal(50)
+        result.save()
+        self.assertEqual(self.grade(self.alice), (Decimal('85.29'), 'A'))
+        result.delete()
+        self.assertEqual(self.grade(self.alice), (Decimal('14.71'), 'F'))
+        self.assertMatchesFullRegrade()
+
+    def test_bulk_marks_entry(self):
+        outcome = enter_marks(self.exam, {self.alice.pk: '45', self.bob.pk: '25'})
+        self.assertEqual(outcome['errors'], {})
+        # 60% of 45/50 over 85%, the assignment counting as zero.
+        self.assertEqual(self.grade(self.alice), (Decimal('63.53'), 'C'))
+        self.assertEqual(self.grade(self.bob), (Decimal('35.29'), 'F'))
+        enter_marks(self.exam, {self.bob.pk: '30'})
+        self.assertEqual(self.grade(self.bob), (Decimal('42.35'), 'E'))
+        self.assertMatchesFullRegrade()
+
+    def test_weights_and_assessments_regrade_the_course(self):
+        enter_marks(self.exam, {self.alice.pk: '25', self.bob.pk: '50'})
+        enter_marks(self.assignment, {self.alice.pk: '20', self.bob.pk: '0'})
+        GradeWeight.objects.create(course=self.course, type='exam', weight=Decimal(50))
+        GradeWeight.objects.create(course=self.course, type='assignment', weight=Decimal(50))
+        self.assertEqual(self.grade(self.alice), (Decimal('75.00'), 'B'))
+        self.assignment.delete()
+        self.assertEqual(self.grade(self.alice), (Decimal('50.00'), 'D'))
+        self.assertMatchesFullRegrade()
+
+    def test_enrollment_changes(self):
+        enter_marks(self.exam, {self.alice.pk: '50'})
+        Enrollment.objects.get(student=self.alice, course=self.course).delete()
+        self.assertIsNone(self.grade(self.alice))
+        Enrollment.objects.create(student=self.alice, course=self.course)
+        # Her exam result is still there; the assignment counts as zero.
+        self.assertEqual(self.grade(self.alice), (Decimal('70.59'), 'B'))
+
+    def test_only_the_given_students_are_written(self):
+        enter_marks(self.exam, {self.alice.pk: '50', self.bob.pk: '50'})
+        before = CourseGrade.objects.get(student=self.bob).updated_at
+        grade_courses([self.course.pk], [self.alice.pk])
+        self.assertEqual(CourseGrade.objects.get(student=self.bob).updated_at, before)
+
+    def test_deleting_the_course_cascades_without_regrading(self):
+        enter_marks(self.exam, {self.alice.pk: '50'})
+        self.course.delete()
+        self.assertFalse(CourseGrade.objects.exists())
@@ -0,0 +1,116 @@
+import io
+
+from django.test import TestCase, override_settings
+
+from college.importers import CourseImporter, EnrollmentImporter, FacultyImporter, StudentImporter, UserImporter
+from college.models import Course, Enrollment, Faculty, Student, User
+
+from .factories import make_course, make_department, make_student
+
+
+def csv_file(*lines):
+    return io.BytesIO(('\n'.join(lines) + '\n').encode())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImporterTests(TestCase):
+    """Imports count what they created, skipped and rejected, and where they rejected it."""
+
+    def setUp(self):
+        self.dept = make_department('Physics')
+
+    def assertReport(self, report, created=0, skipped=0, rejects=()):
+        self.assertEqual((report.created, report.skipped, report.rejects), (created, skipped, list(rejects)))
+
+    def test_courses(self):
+        make_course(code='PHY-100')
+        report = CourseImporter().run(csv_file(
+            'course_code,course_name,dept_name',
+            'PHY-100,Mechanics,Physics',
+            'PHY-200,Optics,Physics',
+            'PHY-200,Optics again,Physics',
+            'CHE-100,Chemistry,Chemistry',
+            ',Nameless,Physics',
+        ))
+        # Rows missing a required column are rejected before the chunk is imported.
+        self.assertReport(report, created=1, skipped=2, rejects=[
+            (6, "missing course_code"), (5, "unknown department 'Chemistry'"),
+        ])
+        self.assertEqual(Course.objects.get(course_code='PHY-200').course_name, 'Optics')
+
+    def test_rows_are_imported_in_chunks(self):
+        lines = [f'PHY-{number},Course {number},Physics' for number in range(7)]
+        report = CourseImporter(chunk_size=2).run(csv_file('course_code,course_name,dept_name', *lines, lines[0]))
+        self.assertReport(report, created=7, skipped=1)
+
+    def test_students(self):
+        make_student(roll_no='S-1')
+        make_student(roll_no='S-2')
+        report = StudentImporter().run(csv_file(
+            'username,roll_no,name,dept_name,semester',
+            's-1,S-1,Already imported,Physics,1',
+            'ada,S-2,Ada,Physics,2',
+            ',S-3,Grace,Physics,x',
+            ',S-4,Alan,Chemistry,3',
+            ',S-5,Edsger,Physics,1',
+        ))
+        self.assertReport(report, created=2, skipped=1, rejects=[
+            (3, "roll number 'S-2' already exists"), (4, "invalid semester 'x'"),
+        ])
+        # The roll number is the default username and password, and a new department is created.
+        student = Student.objects.get(roll_no='S-4')
+        self.assertEqual(student.dept.dept_name, 'Chemistry')
+        self.assertEqual(student.user.username, 'S-4')
+        self.assertTrue(student.user.check_password('S-4'))
+
+    def test_a_roll_number_used_twice_in_a_file(self):
+        report = StudentImporter().run(csv_file(
+            'username,roll_no,name,dept_name,semester',
+            'ada,S-1,Ada,Physics,1',
+            'grace,S-1,Grace,Physics,1',
+        ))
+        self.assertReport(report, created=1, rejects=[(3, "roll number 'S-1' already exists")])
+
+    def test_faculty(self):
+        report = FacultyImporter().run(csv_file(
+            'username,faculty_name,dept_name,title',
+            'curie,Marie Curie,Physics,hod',
+            'bohr,Niels Bohr,Physics,Wizard',
+        ))
+        self.assertReport(report, created=1, rejects=[(3, "invalid title 'Wizard'")])
+        self.assertEqual(Faculty.objects.get().user.user_type, 'faculty')
+
+    def test_users(self):
+        User.objects.create_user('taken', password=None)
+        report = UserImporter().run(csv_file(
+            'username,password,user_type,is_staff',
+            'taken,pw,student,false',
+            'clerk,pw,admin,true',
+            'clerk,pw,admin,true',
+            'ghost,pw,wizard,false',
+        ))
+        self.assertReport(report, created=1, rejects=[
+            (2, "username 'taken' already exists"),
+            (4, "username 'clerk' already exists"),
+            (5, "invalid user_type 'wizard'"),
+        ])
+        clerk = User.objects.get(username='clerk')
+        self.assertTrue(clerk.is_staff)
+        self.assertTrue(clerk.check_password('pw'))
+
+    def test_enrollments(self):
+        student = make_student(roll_no='S-1')
+        course = make_course(code='PHY-100')
+        Enrollment.objects.create(student=student, course=make_course(code='PHY-200'))
+        report = EnrollmentImporter().run(csv_file(
+            'student_roll_no,course_code',
+            'S-1,PHY-100',
+            'S-1,PHY-100',
+            'S-1,PHY-200',
+            'S-9,PHY-100',
+            'S-1,PHY-999',
+        ))
+        self.assertReport(report, created=1, skipped=2, rejects=[
+            (5, "unknown roll number 'S-9'"), (6, "unknown course code 'PHY-999'"),
+        ])
+        self.assertTrue(Enrollment.objects.filter(student=student, course=course).exists())
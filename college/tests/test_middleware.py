@@ -0,0 +1,77 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.template import engines
+from django.template.backends import django as django_backend
+from django.test import RequestFactory, TestCase, override_settings
+
+from college.middleware import QueryInstrumentationMiddleware, fingerprint
+from college.models import Department
+
+from .factories import plain_static_files
+
+INSTRUMENTED_TEMPLATES = [{
+    **settings.TEMPLATES[0], 'BACKEND': 'college.middleware.InstrumentedDjangoTemplates',
+}]
+
+
+def timing(response, name):
+    """The (dur, desc) of one Server-Timing metric."""
+    metric = re.search(rf'{name}(?:;dur=([\d.]+))?;desc="([^"]*)"', response['Server-Timing'])
+    return float(metric[1] or 0), metric[2]
+
+
+@plain_static_files
+@override_settings(QUERY_INSTRUMENTATION=True, QUERY_REPEAT_THRESHOLD=3, TEMPLATES=INSTRUMENTED_TEMPLATES)
+class QueryInstrumentationTests(TestCase):
+    def request(self, view):
+        return QueryInstrumentationMiddleware(view)(RequestFactory().get('/somewhere/'))
+
+    def test_queries_and_duplicates(self):
+        def view(request):
+            for _ in range(3):
+                list(Department.objects.filter(pk=1))
+            list(Department.objects.filter(pk__in=[1, 2, 3]))
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(timing(response, 'db')[1], '4 queries')
+        self.assertEqual(timing(response, 'dupes')[1], '2 duplicate queries')
+
+    def test_repeated_queries_are_logged(self):
+        def view(request):
+            for pk in range(4):
+                list(Department.objects.filter(pk=pk))
+            return HttpResponse()
+
+        with self.assertLogs('college.instrumentation', 'WARNING') as logs:
+            self.request(view)
+        self.assertEqual(logs.records[0].repeats, 4)
+        self.assertEqual(logs.records[0].path, '/somewhere/')
+
+    def test_template_time_is_counted_without_patching_the_backend(self):
+        original = django_backend.Template.render
+        response = self.request(lambda request: render(request, 'login.html', {'form': None}))
+        self.assertGreater(timing(response, 'tpl')[0], 0)
+        self.assertIs(django_backend.Template.render, original)
+
+    def test_rendering_outside_a_request(self):
+        self.assertEqual(engines['django'].from_string('{{ name }}').render({'name': 'Ada'}), 'Ada')
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInstrumentationMiddleware(lambda request: HttpResponse())
+
+
+class FingerprintTests(TestCase):
+    def test_lists_of_placeholders_collapse(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s,%s)'), fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO t VALUES (%s), (%s)\n'), 'INSERT INTO t VALUES (%s)',
+        )
@@ -0,0 +1,91 @@
+import io
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from college import provisioning
+from college.importers import StudentImporter, UserImporter
+from college.models import User
+from college.provisioning import PasswordHasher
+
+from .factories import plain_static_files
+
+FAST_HASHING = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+
+
+class PasswordHasherTests(TestCase):
+    @FAST_HASHING
+    def test_hashes_in_order(self):
+        with PasswordHasher(workers=1) as hasher:
+            hashes = hasher.hash_many(['first', 'second'])
+        self.assertTrue(check_password('first', hashes[0]))
+        self.assertTrue(check_password('second', hashes[1]))
+        self.assertEqual(hasher.hashed, 2)
+
+    def test_deferred_passwords_are_unusable(self):
+        with PasswordHasher(defer=True) as hasher:
+            hashes = hasher.hash_many(['first', 'second'])
+        self.assertEqual(len(hashes), 2)
+        self.assertFalse(any(check_password('first', encoded) for encoded in hashes))
+        self.assertEqual(hasher.hashed, 0)
+
+    def test_large_batches_are_hashed_across_the_pool(self):
+        # Workers are separate processes set up from the real settings.
+        with mock.patch.object(provisioning, 'PARALLEL_THRESHOLD', 2), PasswordHasher(workers=2) as hasher:
+            hashes = hasher.hash_many(['first', 'second', 'third'])
+            self.assertIsNotNone(hasher._pool)
+        self.assertIsNone(hasher._pool)
+        self.assertEqual(
+            [check_password(password, encoded) for password, encoded in zip(['first', 'second', 'third'], hashes)],
+            [True, True, True],
+        )
+
+
+@FAST_HASHING
+@plain_static_files
+class DeferredPasswordTests(TestCase):
+    def import_users(self):
+        return UserImporter(defer_passwords=True).run(io.BytesIO(
+            b'username,password,user_type,is_staff\nada,secret,student,false\ngrace,secret,faculty,false\n'
+        ))
+
+    def test_new_users_get_a_link_instead_of_a_password(self):
+        report = self.import_users()
+        self.assertEqual([username for username, _ in report.setup_links], ['ada', 'grace'])
+        self.assertEqual(report.passwords_hashed, 0)
+        ada = User.objects.get(username='ada')
+        self.assertFalse(ada.has_usable_password())
+        self.assertEqual(report.setup_links[0][1], provisioning.set_password_link(ada))
+
+    def test_the_link_sets_the_password_once(self):
+        link = dict(self.import_users().setup_links)['ada']
+        form = self.client.get(link, follow=True)
+        self.assertTrue(form.context['validlink'])
+        response = self.client.post(
+            form.redirect_chain[-1][0], {'new_password1': 'a-long-passphrase', 'new_password2': 'a-long-passphrase'},
+        )
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertTrue(User.objects.get(username='ada').check_password('a-long-passphrase'))
+        self.client.logout()
+        self.assertFalse(self.client.get(link, follow=True).context['validlink'])
+
+    def test_students_imported_without_passwords(self):
+        report = StudentImporter(defer_passwords=True).run(io.BytesIO(
+            b'username,roll_no,name,dept_name,semester\n,S-1,Ada,Physics,1\n'
+        ))
+        self.assertEqual([username for username, _ in report.setup_links], ['S-1'])
+        self.assertFalse(User.objects.get(username='S-1').check_password('S-1'))
+
+
+@FAST_HASHING
+class HashPlaintextPasswordsTests(TestCase):
+    def test_only_plain_text_passwords_are_hashed(self):
+        User.objects.bulk_create([User(username='legacy', password='R-1'), User(username='unset', password='!')])
+        hashed = User.objects.create_user('hashed', password='kept')
+        call_command('hash_plaintext_passwords', workers=1, stdout=io.StringIO())
+        self.assertTrue(User.objects.get(username='legacy').check_password('R-1'))
+        self.assertFalse(User.objects.get(username='unset').has_usable_password())
+        self.assertEqual(User.objects.get(username='hashed').password, hashed.password)
@@ -0,0 +1,180 @@
+import datetime
+import tempfile
+import unittest
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from college.models import Attendance, Course, Result, Student, User
+from college.replicas import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter, replica_reads
+
+from .factories import make_assessment, make_course, make_faculty, make_student, plain_static_files
+
+REPLICAS = ['replica_1', 'replica_2']
+LAGGING = 'lagging_replica'
+DAY = datetime.date(2025, 3, 3)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_stay_on_the_primary_outside_replica_reads(self):
+        # None lets Django fall back to the instance's or the default database.
+        self.assertIsNone(self.router.db_for_read(Student))
+
+    def test_replica_reads(self):
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Student), REPLICAS)
+
+    def test_decorated_function(self):
+        read = replica_reads(lambda: self.router.db_for_read(Course))
+        self.assertIn(read(), REPLICAS)
+        self.assertIsNone(self.router.db_for_read(Course))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Student), 'default')
+
+    def test_writes_and_migrations_go_to_the_primary(self):
+        self.assertEqual(self.router.db_for_write(Student), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'college'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'college'))
+
+    def request(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaMiddleware(view)(request)
+
+    def test_one_replica_per_request(self):
+        def view(request):
+            with replica_reads():
+                return HttpResponse(','.join(self.router.db_for_read(Student) for _ in range(20)))
+
+        for _ in range(5):
+            self.assertEqual(len(set(self.request(view).content.decode().split(','))), 1)
+
+    def test_a_write_pins_the_rest_of_the_request_and_sets_the_cookie(self):
+        def view(request):
+            with replica_reads():
+                before = self.router.db_for_read(Student)
+                self.router.db_for_write(Student)
+                return HttpResponse(f'{before},{self.router.db_for_read(Student)}')
+
+        response = self.request(view)
+        before, after = response.content.decode().split(',')
+        self.assertIn(before, REPLICAS)
+        self.assertEqual(after, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_user_reads_from_the_primary(self):
+        def view(request):
+            with replica_reads():
+                return HttpResponse(self.router.db_for_read(Student))
+
+        response = self.request(view, cookies={PIN_COOKIE: '1'})
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_middleware_is_unused_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTransactionTests(TestCase):
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        # TestCase runs every test inside a transaction on the primary.
+        with replica_reads():
+            self.assertEqual(ReplicaRouter().db_for_read(Student), 'default')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'copies the primary with the SQLite backup API')
+@plain_static_files
+@override_settings(DATABASE_REPLICAS=[LAGGING])
+class LaggingReplicaTests(TransactionTestCase):
+    """What a replica that missed the latest writes returns must not end up in a versioned cache."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after setUpClass, as the test runner only sets up databases from settings.
+        cls.replica_file = tempfile.NamedTemporaryFile(suffix='.sqlite3')
+        connections.settings[LAGGING] = {**connections.settings['default'], 'NAME': cls.replica_file.name}
+        cls.databases = {*cls.databases, LAGGING}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[LAGGING].close()
+        del connections[LAGGING]
+        del connections.settings[LAGGING]
+        del cls.databases
+        cls.replica_file.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_faculty()
+        self.student = make_student()
+        self.course = make_course(self.teacher, students=[self.student])
+        self.result = Result.objects.create(
+            assessment=make_assessment(self.course), student=self.student, marks=Decimal(80),
+        )
+        Attendance.objects.create(student=self.student, course=self.course, date=DAY, status=True)
+        self.admin = User.objects.create_superuser('replica-admin', password=None)
+
+    def take_snapshot(self):
+        """Copies the primary to the replica, which then stays as it is."""
+        for alias in ('default', LAGGING):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections[LAGGING].connection)
+
+    def get(self, user, name, *args, pinned=False):
+        self.client.force_login(user)
+        if pinned:
+            self.client.cookies[PIN_COOKIE] = '1'
+        else:
+            self.client.cookies.pop(PIN_COOKIE, None)
+        return self.client.get(reverse(name, args=args))
+
+    def write_behind_the_replica(self):
+        self.take_snapshot()
+        Attendance.objects.create(student=self.student, course=self.course, date=DAY + datetime.timedelta(days=1))
+        self.result.marks = Decimal(40)
+        self.result.save()
+
+    def dashboard_percentage(self, **kwargs):
+        response = self.get(self.student.user, 'student_dashboard', **kwargs)
+        return response.context['attendance_data'][0]['percentage'], response.has_header('ETag')
+
+    def mean(self, **kwargs):
+        return self.get(self.teacher.user, 'course_stats_api', self.course.pk, **kwargs).json()['mean']
+
+    def test_replica_reads_are_not_cached(self):
+        self.write_behind_the_replica()
+        late_student = make_student()
+        listed = self.get(self.admin, 'api_list', 'students').json()['results']
+        self.assertNotIn(late_student.pk, [row['student_id'] for row in listed])
+
+        # The replica's old rows are shown, without an ETag...
+        self.assertEqual(self.dashboard_percentage(), (100, False))
+        self.assertEqual(self.mean(), 80)
+        # ...and not cached: once it catches up the new rows show.
+        self.take_snapshot()
+        self.assertEqual(self.dashboard_percentage(), (50, False))
+        self.assertEqual(self.mean(), 40)
+
+    def test_values_cached_from_the_primary_are_served(self):
+        self.write_behind_the_replica()
+        self.assertEqual(self.dashboard_percentage(pinned=True), (50, True))
+        self.assertEqual(self.mean(pinned=True), 40)
+        self.assertEqual(self.dashboard_percentage(), (50, False))
+        self.assertEqual(self.mean(), 40)
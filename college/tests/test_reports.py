@@ -0,0 +1,53 @@
+import datetime
+
+from django.test import TestCase
+
+from college.models import Attendance, AttendanceRiskFlag, Enrollment
+from college.reports import run_attendance_risk_scan
+
+from .factories import make_course, make_department, make_student
+
+DAY = datetime.date(2025, 3, 3)
+
+
+class AttendanceRiskScanTests(TestCase):
+    def setUp(self):
+        self.physics, self.chemistry = make_department('Physics'), make_department('Chemistry')
+        self.regular = make_student(self.physics)
+        self.absentee = make_student(self.physics)
+        self.chemist = make_student(self.chemistry)
+        self.course = make_course(dept=self.physics, students=[self.regular, self.absentee, self.chemist])
+
+    def attend(self, student, *statuses):
+        Attendance.objects.bulk_create([
+            Attendance(student=student, course=self.course, date=DAY + datetime.timedelta(days=n), status=status)
+            for n, status in enumerate(statuses)
+        ])
+
+    def flagged(self, scan):
+        return {
+            (student_id, present, total)
+            for student_id, present, total in AttendanceRiskFlag.objects.filter(scan=scan)
+            .values_list('student_id', 'present_count', 'total_count')
+        }
+
+    def test_pairs_below_the_threshold_are_flagged(self):
+        self.attend(self.regular, True, True, True, False)
+        self.attend(self.absentee, True, False, False, False)
+        self.attend(self.chemist, True, True, False, False)
+        scan = run_attendance_risk_scan(threshold=75, chunk_size=1)
+        self.assertEqual((scan.pairs_scanned, scan.flagged_count), (3, 2))
+        self.assertEqual(self.flagged(scan), {(self.absentee.pk, 1, 4), (self.chemist.pk, 2, 4)})
+
+    def test_one_department(self):
+        self.attend(self.absentee, False)
+        self.attend(self.chemist, False)
+        scan = run_attendance_risk_scan(threshold=75, dept=self.chemistry)
+        self.assertEqual(self.flagged(scan), {(self.chemist.pk, 0, 1)})
+
+    def test_dropped_enrollments_and_courses_with_no_classes_are_not_flagged(self):
+        self.attend(self.absentee, False)
+        Enrollment.objects.filter(student=self.absentee).delete()
+        make_course(dept=self.physics, students=[self.regular])
+        scan = run_attendance_risk_scan(threshold=75)
+        self.assertEqual((scan.pairs_scanned, scan.flagged_count), (0, 0))
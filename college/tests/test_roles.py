@@ -0,0 +1,73 @@
+import io
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from college.importers import StudentImporter
+from college.models import Student, User
+from college.roles import get_role
+
+from .factories import make_course, make_department, make_faculty, make_student
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_role_needs_no_query(self):
+        student = make_student()
+        user = User.objects.get(pk=student.pk)
+        self.assertTrue(get_role(user).is_student)
+        with self.assertNumQueries(0):
+            role = get_role(user)
+        self.assertEqual(role.student.roll_no, student.roll_no)
+        self.assertIs(role.student.user, user)
+
+    def test_new_profile_drops_the_cached_role(self):
+        user = User.objects.create_user('late-student', password=None)
+        self.assertFalse(get_role(user).is_student)
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(user=user, roll_no='LATE-1', name='Late', dept=make_department(), semester=1)
+        self.assertTrue(get_role(user).is_student)
+
+    def test_deleted_profile_drops_the_cached_role(self):
+        faculty = make_faculty()
+        user = faculty.user
+        self.assertTrue(get_role(user).is_faculty)
+        with self.captureOnCommitCallbacks(execute=True):
+            faculty.delete()
+        self.assertFalse(get_role(user).is_faculty)
+
+    def test_imported_profile_drops_the_cached_role(self):
+        user = User.objects.create_user('imported-student', password=None)
+        dept = make_department()
+        self.assertFalse(get_role(user).is_student)
+        upload = io.BytesIO(
+            f'username,roll_no,name,dept_name,semester\nimported-student,IMP-1,Imported,{dept.dept_name},2\n'.encode()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentImporter().run(upload)
+        self.assertTrue(get_role(user).is_student)
+
+    def test_login_keeps_the_cached_role(self):
+        student = make_student()
+        user = student.user
+        get_role(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(user)
+        with self.assertNumQueries(0):
+            get_role(user)
+
+
+class TeachesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_only_the_course_faculty_or_a_superuser_teaches_it(self):
+        teacher, other = make_faculty(), make_faculty()
+        course = make_course(teacher)
+        admin = User.objects.create_superuser('root', password=None)
+        self.assertTrue(get_role(teacher.user).teaches(course))
+        self.assertFalse(get_role(other.user).teaches(course))
+        self.assertFalse(get_role(make_student().user).teaches(course))
+        self.assertTrue(get_role(admin).teaches(course))
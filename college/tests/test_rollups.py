@@ -0,0 +1,134 @@
+import datetime
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from college.models import Attendance, AttendanceRollup
+
+from .factories import make_course, make_student
+
+DAY = datetime.date(2025, 3, 3)
+
+
+class AttendanceRollupTests(TestCase):
+    """AttendanceRollup must equal a recount of Attendance after every kind of write."""
+
+    def setUp(self):
+        self.students = [make_student() for _ in range(3)]
+        self.course = make_course(students=self.students)
+        self.other_course = make_course(students=self.students)
+
+    def assertRollupsMatch(self):
+        recount = {
+            (student_id, course_id): (present, total)
+            for student_id, course_id, present, total in (
+                Attendance.objects.values_list('student_id', 'course_id')
+                .annotate(present=Count('pk', filter=Q(status=True)), total=Count('pk')).order_by()
+            )
+        }
+        stored = {
+            (student_id, course_id): (present, total)
+            for student_id, course_id, present, total in AttendanceRollup.objects.values_list(
+                'student_id', 'course_id', 'present_count', 'total_count',
+            )
+            if total
+        }
+        self.assertEqual(stored, recount)
+
+    def mark(self, student, day, status=True, course=None):
+        return Attendance.objects.create(student=student, course=course or self.course, date=day, status=status)
+
+    def test_save_and_change_status(self):
+        row = self.mark(self.students[0], DAY)
+        self.mark(self.students[0], DAY + datetime.timedelta(days=1), status=False)
+        self.assertRollupsMatch()
+        row.status = False
+        row.save()
+        self.assertRollupsMatch()
+
+    def test_save_moving_a_row_fixes_both_rollups(self):
+        row = self.mark(self.students[0], DAY)
+        row = Attendance.objects.get(pk=row.pk)
+        row.student = self.students[1]
+        row.course = self.other_course
+        row.save()
+        self.assertRollupsMatch()
+        self.assertEqual(
+            AttendanceRollup.objects.get(student=self.students[0], course=self.course).total_count, 0,
+        )
+
+    def test_delete(self):
+        row = self.mark(self.students[0], DAY)
+        self.mark(self.students[0], DAY + datetime.timedelta(days=1))
+        row.delete()
+        self.assertRollupsMatch()
+
+    def test_bulk_create(self):
+        Attendance.objects.bulk_create([
+            Attendance(student=student, course=self.course, date=DAY + datetime.timedelta(days=offset),
+                       status=bool(offset % 2))
+            for student in self.students for offset in range(4)
+        ])
+        self.assertRollupsMatch()
+
+    def test_bulk_create_upserting_existing_rows(self):
+        self.mark(self.students[0], DAY, status=False)
+        Attendance.objects.bulk_create(
+            [Attendance(student=self.students[0], course=self.course, date=DAY, status=True)],
+            update_conflicts=True, unique_fields=['student', 'course', 'date'], update_fields=['status'],
+        )
+        self.assertRollupsMatch()
+        self.assertEqual(AttendanceRollup.objects.get(student=self.students[0], course=self.course).present_count, 1)
+
+    def test_bulk_update(self):
+        rows = [self.mark(student, DAY, status=False) for student in self.students]
+        for row in rows:
+            row.status = True
+        Attendance.objects.bulk_update(rows, ['status'])
+        self.assertRollupsMatch()
+
+    def test_queryset_update(self):
+        for student in self.students:
+            self.mark(student, DAY, status=False)
+        Attendance.objects.filter(student=self.students[0]).update(status=True)
+        self.assertRollupsMatch()
+
+    def test_queryset_update_moving_rows(self):
+        for student in self.students:
+            self.mark(student, DAY)
+        Attendance.objects.filter(course=self.course).update(course=self.other_course)
+        self.assertRollupsMatch()
+
+    def test_queryset_delete(self):
+        for student in self.students:
+            self.mark(student, DAY)
+            self.mark(student, DAY + datetime.timedelta(days=1), status=False)
+        Attendance.objects.filter(date=DAY).delete()
+        self.assertRollupsMatch()
+
+    def test_cascade_from_a_deleted_student(self):
+        for student in self.students:
+            self.mark(student, DAY)
+        self.students[0].delete()
+        self.assertRollupsMatch()
+        self.assertFalse(AttendanceRollup.objects.filter(student_id=self.students[0].pk).exists())
+
+    def test_cascade_does_not_touch_rows_one_by_one(self):
+        def queries_to_delete(student, days):
+            for day in range(days):
+                self.mark(student, DAY + datetime.timedelta(days=day))
+            with CaptureQueriesContext(connection) as queries:
+                student.delete()
+            return len(queries)
+
+        self.assertEqual(queries_to_delete(self.students[0], 1), queries_to_delete(self.students[1], 30))
+        self.assertRollupsMatch()
+
+    def test_rebuild(self):
+        for student in self.students:
+            self.mark(student, DAY)
+        AttendanceRollup.objects.all().delete()
+        AttendanceRollup.objects.rebuild()
+        self.assertRollupsMatch()
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from college import search
+from college.models import Student, User
+
+from .factories import make_course, make_department, make_faculty, make_student
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        search._indexes.clear()
+        dept = make_department()
+        self.sara = make_student(dept, 'CS-2021-014', 'Sara Ali Khan')
+        self.alia = make_student(dept, 'CS-2021-015', 'Alia Bhatt')
+        self.ali = make_student(dept, 'ME-2022-001', 'Ali Raza')
+        self.kalinda = make_student(dept, 'ME-2022-002', 'Kalinda Shah')
+
+    def labels(self, query, **kwargs):
+        return [suggestion['label'] for suggestion in search.suggest('students', query, **kwargs)]
+
+
+class PrefixIndexTests(SearchTestCase):
+    """Databases without trigram indexes (SQLite here) search the start of words."""
+
+    def test_names_starting_with_the_query_come_first(self):
+        self.assertEqual(self.labels('ali'), [
+            'Ali Raza (ME-2022-001)', 'Alia Bhatt (CS-2021-015)', 'Sara Ali Khan (CS-2021-014)',
+        ])
+        self.assertEqual(self.labels('ali', limit=2), ['Ali Raza (ME-2022-001)', 'Alia Bhatt (CS-2021-015)'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.labels('ali kh'), ['Sara Ali Khan (CS-2021-014)'])
+        self.assertEqual(self.labels('  '), [])
+
+    def test_codes_match_whole_and_in_parts(self):
+        self.assertEqual(self.labels('cs-2021-01'), ['Alia Bhatt (CS-2021-015)', 'Sara Ali Khan (CS-2021-014)'])
+        self.assertEqual(self.labels('2022'), ['Ali Raza (ME-2022-001)', 'Kalinda Shah (ME-2022-002)'])
+        self.assertEqual(search.suggest('students', '014')[0]['value'], 'CS-2021-014')
+
+    def test_substrings_inside_words_do_not_match(self):
+        self.assertEqual(self.labels('linda'), [])
+
+    def test_one_course(self):
+        course = make_course(students=[self.sara, self.kalinda])
+        self.assertEqual(self.labels('ali', course_id=course.pk), ['Sara Ali Khan (CS-2021-014)'])
+
+    def test_the_index_is_rebuilt_after_a_write(self):
+        self.assertEqual(self.labels('grace'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kalinda.name = 'Grace Hopper'
+            self.kalinda.save()
+        self.assertEqual(self.labels('grace'), ['Grace Hopper (ME-2022-002)'])
+        self.assertEqual(self.labels('kalinda'), [])
+
+    def test_admin_filter(self):
+        found = search.filter_queryset('students', Student.objects.all(), 'ali')
+        self.assertEqual(set(found), {self.sara, self.alia, self.ali})
+        with mock.patch.object(search, 'MAX_ID_FILTER', 1):
+            # Too many ids for one query: filter with icontains instead.
+            found = search.filter_queryset('students', Student.objects.all(), 'ali')
+        self.assertEqual(set(found), {self.sara, self.alia, self.ali, self.kalinda})
+
+
+@mock.patch.object(search, '_uses_trigrams', lambda: True)
+class TrigramSearchTests(SearchTestCase):
+    """On PostgreSQL the query may match anywhere in a column."""
+
+    def test_substrings_match(self):
+        self.assertEqual(self.labels('ali'), [
+            'Ali Raza (ME-2022-001)', 'Alia Bhatt (CS-2021-015)',
+            'Kalinda Shah (ME-2022-002)', 'Sara Ali Khan (CS-2021-014)',
+        ])
+        self.assertEqual(self.labels('linda'), ['Kalinda Shah (ME-2022-002)'])
+
+
+class SearchViewTests(SearchTestCase):
+    def get(self, **params):
+        return self.client.get(reverse('search'), params)
+
+    def test_faculty(self):
+        self.client.force_login(make_faculty().user)
+        response = self.get(q='sara')
+        self.assertEqual(response.json()['results'], [
+            {'id': self.sara.pk, 'label': 'Sara Ali Khan (CS-2021-014)', 'value': 'CS-2021-014'},
+        ])
+        self.assertEqual(len(self.get(q='ali', limit='1').json()['results']), 1)
+
+    def test_students_are_refused(self):
+        self.client.force_login(self.sara.user)
+        self.assertEqual(self.get(q='ali').status_code, 403)
+
+    def test_bad_parameters(self):
+        self.client.force_login(User.objects.create_superuser('registrar', password=None))
+        self.assertEqual(self.get(kind='rooms', q='a').status_code, 400)
+        self.assertEqual(self.get(kind='courses', course='1', q='a').status_code, 400)
+        self.assertEqual(self.get(course='one', q='a').status_code, 400)
@@ -0,0 +1,97 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from college.models import Attendance, Result, SyncReceipt
+from college.roles import Role
+from college.sync import apply_batch
+
+from .factories import make_assessment, make_course, make_faculty, make_student
+
+DAY = datetime.date(2025, 3, 3)
+
+
+class ApplyBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = make_faculty()
+        self.role = Role(self.teacher.user, faculty=self.teacher)
+        self.first, self.second = make_student(), make_student()
+        self.course = make_course(self.teacher, students=[self.first, self.second])
+        self.assessment = make_assessment(self.course, full_marks=20)
+
+    def roll(self, key, present, students=None):
+        item = {'key': key, 'type': 'attendance', 'course': self.course.pk, 'date': DAY.isoformat(),
+                'present': [student.pk for student in present]}
+        if students is not None:
+            item['students'] = [student.pk for student in students]
+        return item
+
+    def marks(self, key, **marks):
+        return {'key': key, 'type': 'marks', 'assessment': self.assessment.pk, 'marks': marks}
+
+    def statuses(self, results):
+        return [result['status'] for result in results]
+
+    def present(self):
+        return dict(Attendance.objects.filter(course=self.course, date=DAY).values_list('student_id', 'status'))
+
+    def test_a_retried_batch_is_answered_from_the_receipts(self):
+        batch = [self.roll('a', [self.first]), self.marks('m', **{str(self.first.pk): '15'})]
+        applied = apply_batch(self.role, batch)
+        self.assertEqual(self.statuses(applied), ['applied', 'applied'])
+        # Changes made since must survive the replay.
+        Attendance.objects.filter(student=self.first).update(status=False)
+        Result.objects.update(marks=5)
+
+        replayed = apply_batch(self.role, batch)
+        self.assertEqual(self.statuses(replayed), ['duplicate', 'duplicate'])
+        self.assertEqual([result['result'] for result in replayed], applied)
+        self.assertEqual(self.present(), {self.first.pk: False, self.second.pk: False})
+        self.assertEqual(Result.objects.get().marks, 5)
+        self.assertEqual(SyncReceipt.objects.count(), 2)
+
+    def test_a_key_repeated_within_a_batch_is_applied_once(self):
+        results = apply_batch(self.role, [self.roll('a', [self.first]), self.roll('a', [self.second])])
+        self.assertEqual(self.statuses(results), ['applied', 'duplicate'])
+        self.assertEqual(results[1]['result'], results[0])
+        self.assertEqual(self.present(), {self.first.pk: True, self.second.pk: False})
+
+    def test_receipts_are_kept_per_user(self):
+        apply_batch(self.role, [self.roll('a', [self.first])])
+        admin = Role(make_faculty().user)
+        admin.user.is_superuser = True
+        self.assertEqual(self.statuses(apply_batch(admin, [self.roll('a', [self.second])])), ['applied'])
+        self.assertEqual(self.present(), {self.first.pk: False, self.second.pk: True})
+
+    def test_a_later_full_roll_supersedes_an_earlier_one(self):
+        results = apply_batch(self.role, [
+            self.roll('a', [self.first], students=[self.first]),
+            self.roll('b', [self.first, self.second]),
+            self.roll('c', [self.second]),
+        ])
+        self.assertEqual(self.statuses(results), ['superseded', 'superseded', 'applied'])
+        self.assertEqual(results[2]['created'], 2)
+        self.assertEqual(self.present(), {self.first.pk: False, self.second.pk: True})
+        self.assertEqual(SyncReceipt.objects.get(idempotency_key='a').result, {'key': 'a', 'status': 'superseded'})
+
+    def test_partly_overlapping_rolls_are_written_in_order(self):
+        results = apply_batch(self.role, [
+            self.roll('a', [self.first, self.second]),
+            self.roll('b', [], students=[self.first]),
+        ])
+        self.assertEqual(self.statuses(results), ['applied', 'applied'])
+        self.assertEqual(results[1]['updated'], 1)
+        self.assertEqual(self.present(), {self.first.pk: False, self.second.pk: True})
+
+    def test_invalid_and_rejected_submissions(self):
+        results = apply_batch(self.role, [
+            'roll', {'type': 'attendance'}, {'key': 'x', 'type': 'essay'},
+            {'key': 'y', 'type': 'attendance', 'course': self.course.pk, 'date': 'Monday'},
+            self.marks('m', **{str(self.first.pk): '25'}),
+        ])
+        self.assertEqual(self.statuses(results), ['invalid', 'invalid', 'invalid', 'invalid', 'rejected'])
+        self.assertEqual(set(results[4]['errors']), {str(self.first.pk)})
+        self.assertFalse(Result.objects.exists())
+        self.assertEqual(list(SyncReceipt.objects.values_list('idempotency_key', flat=True)), ['m'])
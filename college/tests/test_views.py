@@ -0,0 +1,105 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from college.models import Attendance, Result, SyncReceipt, User
+
+from .factories import make_assessment, make_course, make_faculty, make_student
+
+
+class CourseOwnershipTests(TestCase):
+    """Only a course's faculty may write its attendance and marks."""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher, self.other_teacher = make_faculty(), make_faculty()
+        self.student = make_student()
+        self.course = make_course(self.teacher, students=[self.student])
+        self.assessment = make_assessment(self.course, full_marks=20)
+
+    def post_json(self, name, args, payload):
+        return self.client.post(reverse(name, args=args), json.dumps(payload), content_type='application/json')
+
+    def post_attendance(self):
+        return self.post_json(
+            'course_attendance_api', [self.course.pk], {'date': '2025-03-03', 'present': [self.student.pk]},
+        )
+
+    def post_marks(self):
+        return self.post_json(
+            'assessment_marks_upload', [self.assessment.pk], {'marks': [{'roll_no': self.student.roll_no, 'marks': 15}]},
+        )
+
+    def test_attendance_api(self):
+        self.client.force_login(self.other_teacher.user)
+        self.assertEqual(self.post_attendance().status_code, 403)
+        self.assertFalse(Attendance.objects.exists())
+        self.client.force_login(self.teacher.user)
+        self.assertEqual(self.post_attendance().status_code, 200)
+        self.assertTrue(Attendance.objects.filter(student=self.student, status=True).exists())
+
+    def test_course_page_roll(self):
+        self.client.force_login(self.other_teacher.user)
+        response = self.client.post(
+            reverse('course_detail', args=[self.course.pk]),
+            {'attendance_date': '2025-03-03', f'student_{self.student.pk}': 'on'},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_marks_upload(self):
+        self.client.force_login(self.other_teacher.user)
+        self.assertEqual(self.post_marks().status_code, 403)
+        self.assertFalse(Result.objects.exists())
+        self.client.force_login(self.teacher.user)
+        self.assertEqual(self.post_marks().status_code, 200)
+        self.assertEqual(Result.objects.get().marks, 15)
+
+    def test_sync_batch_rejects_other_teachers_submissions(self):
+        own_course = make_course(self.other_teacher, students=[self.student])
+        self.client.force_login(self.other_teacher.user)
+        response = self.post_json('sync_batch', [], {'submissions': [
+            {'key': 'a', 'type': 'attendance', 'course': self.course.pk, 'date': '2025-03-03', 'present': []},
+            {'key': 'b', 'type': 'marks', 'assessment': self.assessment.pk, 'marks': {str(self.student.pk): '10'}},
+            {'key': 'c', 'type': 'attendance', 'course': own_course.pk, 'date': '2025-03-03', 'present': []},
+        ]})
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['forbidden', 'forbidden', 'applied'])
+        self.assertFalse(Result.objects.exists())
+        self.assertEqual(set(Attendance.objects.values_list('course_id', flat=True)), {own_course.pk})
+        self.assertEqual(SyncReceipt.objects.count(), 3)
+
+
+class MetricsAccessTests(TestCase):
+    def test_anonymous_and_non_staff_are_refused(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.force_login(make_student().user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+    def test_staff(self):
+        self.client.force_login(User.objects.create_user('ops', password=None, is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer guess').status_code, 401)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('api-admin', password=None))
+
+    def test_students_in_several_courses_are_listed_once(self):
+        students = [make_student() for _ in range(3)]
+        first = make_course(students=students)
+        second = make_course(students=students[:2])
+        make_course(students=[make_student()])
+        response = self.client.get(
+            reverse('api_list', args=['students']), {'course': f'{first.pk},{second.pk}', 'fields': 'roll_no'},
+        )
+        self.assertEqual(
+            [row['student_id'] for row in response.json()['results']], sorted(student.pk for student in students),
+        )
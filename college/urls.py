@@ -4,10 +4,19 @@ from . import views
 urlpatterns = [
     path('', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('set-password/<uidb64>/<token>/', views.set_password_view, name='set_password'),
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('course/<int:course_id>/', views.course_detail_view, name='course_detail'),
+    path('course/<int:course_id>/attendance/', views.course_attendance_api, name='course_attendance_api'),
+    path('course/<int:course_id>/stats/', views.course_stats_api, name='course_stats_api'),
     path('course/<int:course_id>/add_assignment/', views.add_assignment_view, name='add_assignment'),
     path('assessment/<int:assessment_id>/', views.assessment_detail_view, name='assessment_detail'),
+    path('assessment/<int:assessment_id>/marks/', views.assessment_marks_upload, name='assessment_marks_upload'),
+    path('assessment/<int:assessment_id>/stats/', views.assessment_stats_api, name='assessment_stats_api'),
+    path('sync/', views.sync_batch, name='sync_batch'),
+    path('api/<str:resource>/', views.api_list, name='api_list'),
+    path('search/', views.search_view, name='search'),
     path('select-role/', views.role_selection_view, name='select_role'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,28 +1,41 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, aget_object_or_404, get_object_or_404
+from django.urls import reverse_lazy
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import PasswordResetConfirmView
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET, require_POST
 from django.utils import timezone
-from django.db.models import Count, Q, F, FloatField, Case, When
-from django.core.cache import cache
-from .models import Student, Faculty, Course, Assessment, Attendance, Result
+from django.utils.crypto import constant_time_compare
+from .models import Course, Assessment, Result
 from .forms import LoginForm, AssignmentForm
+from . import api, metrics, search
+from .analytics import assessment_stats, course_stats
+from .attendance import submit_roll
+from .caching import course_key, course_version, get_or_compute
+from .conditional import versioned_etag
+from .course_page import HISTORY_SESSIONS, MAX_HISTORY_SESSIONS, attendance_history, roster_page
+from .dashboard import aget_student_snapshot
+from .gradebook import enter_marks, enter_marks_by_roll_no, read_marks_upload
+from .replicas import replica_reads
+from .roles import get_role
+from .sync import MAX_BATCH_SIZE, apply_batch
 
 @login_required
 def role_selection_view(request):
-    if request.user.is_staff and hasattr(request.user, 'faculty'):
+    if request.user.is_staff and request.role.is_faculty:
         return render(request, 'role_selection.html')
     return redirect('login')
 
 def login_view(request):
     if request.user.is_authenticated:
-        if hasattr(request.user, 'faculty') and request.user.is_superuser:
-            return redirect('select_role')
-        elif request.user.user_type == 'faculty':
-            return redirect('teacher_dashboard')
-        elif request.user.user_type == 'student':
-            return redirect('student_dashboard')
-        else:
-            return redirect('/admin/')
+        return redirect(request.role.home() or '/admin/')
 
     form = LoginForm(request.POST or None)
     if request.method == 'POST' and form.is_valid():
@@ -32,138 +45,177 @@ def login_view(request):
         
         if user is not None:
             login(request, user)
-            if hasattr(user, 'faculty') and user.is_superuser:
-                return redirect('select_role')
-            elif user.user_type == 'faculty':
-                return redirect('teacher_dashboard')
-            elif user.user_type == 'student':
-                return redirect('student_dashboard')
-            elif user.is_staff:
-                return redirect('/admin/')
-            else:
-                return redirect('login')
+            return redirect(get_role(user).home() or 'login')
         else:
             form.add_error(None, "Your username and password didn't match. Please try again.")
 
     return render(request, 'login.html', {'form': form})
 
+# Users provisioned without a password choose one here (see provisioning.py),
+# then land on their dashboard already logged in.
+set_password_view = PasswordResetConfirmView.as_view(
+    template_name='set_password.html',
+    success_url=reverse_lazy('login'),
+    post_reset_login=True,
+)
+
 def logout_view(request):
     logout(request)
     return redirect('login')
 
+@replica_reads
 @login_required
-def student_dashboard(request):
-    student = get_object_or_404(
-        Student.objects.select_related('user', 'dept').prefetch_related('enrolled_courses__faculty', 'enrolled_courses__dept'),
-        pk=request.user.pk
-    )
-    
-    courses = student.enrolled_courses.all()
-
-    attendance_data = []
-    for course in courses:
-        attendance_data.append({
-            'course': course,
-            'percentage': student.get_attendance_percentage(course)
-        })
-
-    assessments_with_results = []
-    all_assessments = Assessment.objects.filter(course__in=courses).prefetch_related('result_set').order_by('course')
-    
-    for assessment in all_assessments:
-        result = next((r for r in assessment.result_set.all() if r.student_id == student.user_id), None)
-        assessments_with_results.append({
-            'assessment': assessment,
-            'result': result
-        })
+@versioned_etag(lambda user: [('user', user.pk), ('student', user.pk)], discovered=['course'])
+async def student_dashboard(request):
+    user = await request.auser()
+    snapshot = await aget_student_snapshot(user.pk)
+    if snapshot is None:
+        raise Http404("No student profile for this user.")
 
     context = {
-        'student': student,
-        'assessments_with_results': assessments_with_results,
-        'attendance_data': attendance_data, 
+        'student': snapshot['student'],
+        'assessments_with_results': snapshot['assessments_with_results'],
+        'attendance_data': snapshot['attendance_data'],
     }
-    return render(request, 'student_dashboard.html', context)
+    response = await sync_to_async(render)(request, 'student_dashboard.html', context)
+    response.version_entities = {('course', course_id) for course_id in snapshot['course_versions']}
+    return response
 
+@replica_reads
 @login_required
-def teacher_dashboard(request):
-    teacher = get_object_or_404(Faculty, pk=request.user.pk)
-    courses = Course.objects.filter(faculty=teacher).select_related('dept', 'faculty')
+@versioned_etag(lambda user: [('user', user.pk), ('faculty', user.pk)])
+async def teacher_dashboard(request):
+    role = await request.arole()
+    if not role.is_faculty:
+        raise Http404("No faculty profile for this user.")
+    courses = await _alist(Course.objects.filter(faculty_id=role.faculty.pk).select_related('dept', 'faculty'))
     context = {
-        'teacher': teacher,
+        'teacher': role.faculty,
         'courses': courses,
     }
-    return render(request, 'teacher_dashboard.html', context)
+    return await sync_to_async(render)(request, 'teacher_dashboard.html', context)
 
-@login_required
-def course_detail_view(request, course_id):
-    course = get_object_or_404(Course, course_id=course_id)
-    
-    student_list_cache_key = f'course_{course_id}_student_list'
-    students_in_course = cache.get(student_list_cache_key)
+def _submit_roll_from_post(course, post):
+    attendance_date = timezone.datetime.strptime(post.get("attendance_date"), "%Y-%m-%d").date()
+    present_ids = [
+        int(key[len('student_'):]) for key, value in post.items()
+        if key.startswith('student_') and key[len('student_'):].isdigit() and value == 'on'
+    ]
+    # The form only lists one page of the roster; leave the other pages alone.
+    roster = post.get('roster')
+    student_ids = None if roster is None else [int(pk) for pk in roster.split(',') if pk.isdigit()]
+    submit_roll(course, attendance_date, present_ids, student_ids)
+
+def _view_date_str(request):
+    return request.GET.get('date', timezone.now().strftime("%Y-%m-%d"))
+
+def _course_page_tokens(request):
+    # The date defaults to today, so it is a token even when not in the query string.
+    return [_view_date_str(request), request.GET.urlencode()]
+
+def _query_date(request, name):
+    try:
+        return timezone.datetime.strptime(request.GET[name], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return None
 
-    if not students_in_course:
-        students_in_course = course.enrolled_students.all().order_by('roll_no')
-        cache.set(student_list_cache_key, students_in_course, 3600) #1hr
+def _with_params(request, **changes):
+    """The current query string with ``changes`` applied (None removes a parameter)."""
+    params = request.GET.copy()
+    for name, value in changes.items():
+        params.pop(name, None)
+        if value is not None:
+            params[name] = str(value)
+    return f'?{params.urlencode()}'
+
+@login_required
+@versioned_etag(
+    lambda user, course_id: [('user', user.pk), ('course', course_id)],
+    extra=_course_page_tokens,
+)
+async def course_detail_view(request, course_id):
+    course = await aget_object_or_404(Course, course_id=course_id)
 
-    assessments = Assessment.objects.filter(course=course)
-    
     if request.method == 'POST':
-        date_str = request.POST.get("attendance_date")
-        attendance_date = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
-        for student in students_in_course:
-            is_present = request.POST.get(f'student_{student.user.id}') == 'on'
-            Attendance.objects.update_or_create(
-                student=student,
-                course=course,
-                date=attendance_date,
-                defaults={'status': is_present}
-            )
-        cache.delete(f'course_{course_id}_attendance_summary')
-        return redirect('course_detail', course_id=course.course_id)
-
-    view_date_str = request.GET.get('date', timezone.now().strftime("%Y-%m-%d"))
-    view_date = timezone.datetime.strptime(view_date_str, "%Y-%m-%d").date()
-
-    present_student_ids = set(Attendance.objects.filter(
-        course=course, date=view_date, status=True
-    ).values_list('student_id', flat=True))
-
-    students_with_attendance = students_in_course.annotate(
-        total_classes=Count('attendance', filter=Q(attendance__course=course)),
-        present_classes=Count('attendance', filter=Q(attendance__course=course, attendance__status=True))
-    ).annotate(
-        attendance_percentage=Case(
-            When(total_classes=0, then=0.0),
-            default=(F('present_classes') * 100.0 / F('total_classes')),
-            output_field=FloatField()
-        )
+        if not (await request.arole()).teaches(course):
+            raise PermissionDenied
+        await sync_to_async(_submit_roll_from_post)(course, request.POST)
+        return redirect(request.get_full_path())
+
+    view_date = timezone.datetime.strptime(_view_date_str(request), "%Y-%m-%d").date()
+    sessions = request.GET.get('sessions', '')
+    sessions = min(int(sessions), MAX_HISTORY_SESSIONS) if sessions.isdigit() and int(sessions) else HISTORY_SESSIONS
+    older_than = _query_date(request, 'older_than')
+    newer_than = _query_date(request, 'newer_than')
+    search = request.GET.get('q', '').strip()
+
+    version = await sync_to_async(course_version)(course_id)
+    history_key = course_key(course_id, '_'.join([
+        'attendance_history', str(sessions),
+        str(older_than.toordinal() if older_than else 0), str(newer_than.toordinal() if newer_than else 0),
+    ]), version)
+    history, roster, assessments = await asyncio.gather(
+        sync_to_async(get_or_compute)(
+            history_key,
+            lambda: attendance_history(course_id, sessions, older_than=older_than, newer_than=newer_than),
+            900, # Cache for 15 minutes
+        ),
+        sync_to_async(roster_page)(
+            course_id, view_date, search,
+            after=request.GET.get('after') or None, before=request.GET.get('before') or None,
+        ),
+        _alist(Assessment.objects.filter(course=course)),
     )
 
-    student_data = []
-    for student in students_with_attendance:
-        student_data.append({
+    student_data = [
+        {
             'student': student,
-            'attendance_percentage': student.attendance_percentage, 
-            'is_present_today': student.pk in present_student_ids
-        })
-    
-    cache_key = f'course_{course_id}_attendance_summary'
-    attendance_summary = cache.get(cache_key)
-    if not attendance_summary:
-        attendance_summary = Attendance.objects.filter(course=course) \
-            .values('date') \
-            .annotate(present_count=Count('pk', filter=Q(status=True))) \
-            .order_by('-date')
-        cache.set(cache_key, attendance_summary, 900) # Cache for 15 minutes
+            'attendance_percentage': student.attendance_percentage,
+            'is_present_today': student.is_present_today,
+        }
+        for student in roster['students']
+    ]
 
     context = {
         'course': course,
         'student_data': student_data,
+        'roster_ids': ','.join(str(student.pk) for student in roster['students']),
+        'search': search,
+        'roster_previous_url': roster['previous'] and _with_params(request, after=None, before=roster['previous']),
+        'roster_next_url': roster['next'] and _with_params(request, before=None, after=roster['next']),
         'assessments': assessments,
         'view_date': view_date,
-        'attendance_summary': attendance_summary,
+        'attendance_summary': history['records'],
+        'history_newer_url': history['newer'] and _with_params(
+            request, older_than=None, newer_than=history['newer'].isoformat(),
+        ),
+        'history_older_url': history['older'] and _with_params(
+            request, newer_than=None, older_than=history['older'].isoformat(),
+        ),
     }
-    return render(request, 'course_detail.html', context)
+    return await sync_to_async(render)(request, 'course_detail.html', context)
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+@login_required
+@require_POST
+def course_attendance_api(request, course_id):
+    course = get_object_or_404(Course, course_id=course_id)
+    if not request.role.teaches(course):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    try:
+        payload = json.loads(request.body)
+        attendance_date = timezone.datetime.strptime(payload['date'], "%Y-%m-%d").date()
+        present_ids = [int(student_id) for student_id in payload.get('present', [])]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {'error': 'Expected {"date": "YYYY-MM-DD", "present": [student ids]}.'},
+            status=400,
+        )
+
+    counts = submit_roll(course, attendance_date, present_ids)
+    return JsonResponse({'course_id': course.course_id, 'date': attendance_date.isoformat(), **counts})
 
 @login_required
 def add_assignment_view(request, course_id):
@@ -180,33 +232,149 @@ def add_assignment_view(request, course_id):
     return render(request, 'add_assignment.html', {'form': form, 'course': course})
 
 @login_required
+@versioned_etag(
+    lambda user, assessment_id: [('user', user.pk), ('assessment', assessment_id)],
+    discovered=['course'],
+)
 def assessment_detail_view(request, assessment_id):
     assessment = get_object_or_404(Assessment.objects.select_related('course'), assessment_id=assessment_id)
-    students = assessment.course.enrolled_students.all()
+    students = list(assessment.course.enrolled_students.all())
 
+    errors = {}
     if request.method == 'POST':
-        for student in students:
-            marks = request.POST.get(f'marks_{student.user.id}')
-            if marks: 
-                Result.objects.update_or_create(
-                    student=student,
-                    assessment=assessment,
-                    defaults={'marks': marks}
-                )
-        return redirect('assessment_detail', assessment_id=assessment.assessment_id)
-
-    results = Result.objects.filter(assessment=assessment, student__in=students)
-    results_map = {result.student_id: result.marks for result in results}
+        if not request.role.teaches(assessment.course):
+            raise PermissionDenied
+        submitted = {
+            student.pk: request.POST.get(f'marks_{student.pk}') for student in students
+        }
+        outcome = enter_marks(assessment, submitted)
+        if not outcome['errors']:
+            return redirect('assessment_detail', assessment_id=assessment.assessment_id)
+        errors = outcome['errors']
+        results_map = submitted
+    else:
+        results_map = dict(
+            Result.objects.filter(assessment=assessment).values_list('student_id', 'marks')
+        )
 
     student_results = []
     for student in students:
         student_results.append({
             'student': student,
-            'marks': results_map.get(student.user_id) 
+            'marks': results_map.get(student.pk),
+            'error': errors.get(student.pk),
         })
 
     context = {
         'assessment': assessment,
         'student_results': student_results,
+        'errors': errors,
+        'stats': assessment_stats(assessment),
     }
-    return render(request, 'assessment_detail.html', context)
\ No newline at end of file
+    response = render(request, 'assessment_detail.html', context)
+    response.version_entities = {('course', assessment.course_id)}
+    return response
+
+@login_required
+@require_POST
+def assessment_marks_upload(request, assessment_id):
+    assessment = get_object_or_404(Assessment.objects.select_related('course'), assessment_id=assessment_id)
+    if not request.role.teaches(assessment.course):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    if 'csv_file' in request.FILES:
+        rows = read_marks_upload(request.FILES['csv_file'])
+    else:
+        try:
+            payload = json.loads(request.body)
+            rows = [(str(row['roll_no']).strip(), row['marks']) for row in payload['marks']]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {'error': 'Expected {"marks": [{"roll_no": ..., "marks": ...}]} or a csv_file upload.'},
+                status=400,
+            )
+
+    outcome = enter_marks_by_roll_no(assessment, rows)
+    return JsonResponse(outcome, status=400 if outcome['errors'] else 200)
+
+# The statistics include every student's z-score, so only staff and the
+# course's faculty may read them.
+def _may_see_stats(request, course):
+    return request.user.is_staff or request.role.teaches(course)
+
+@replica_reads
+@login_required
+def assessment_stats_api(request, assessment_id):
+    assessment = get_object_or_404(Assessment.objects.select_related('course'), assessment_id=assessment_id)
+    if not _may_see_stats(request, assessment.course):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    return JsonResponse({'assessment_id': assessment.assessment_id, **assessment_stats(assessment)})
+
+@replica_reads
+@login_required
+def course_stats_api(request, course_id):
+    course = get_object_or_404(Course, course_id=course_id)
+    if not _may_see_stats(request, course):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    return JsonResponse({'course_id': course.course_id, **course_stats(course)})
+
+@login_required
+@require_POST
+def sync_batch(request):
+    try:
+        submissions = json.loads(request.body)['submissions']
+        if not isinstance(submissions, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"submissions": [...]}.'}, status=400)
+    if len(submissions) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'At most {MAX_BATCH_SIZE} submissions per request.'}, status=400)
+    return JsonResponse({'results': apply_batch(request.role, submissions)})
+
+@replica_reads
+@login_required
+@require_GET
+def api_list(request, resource):
+    if resource not in api.RESOURCES:
+        raise Http404
+    resource = api.RESOURCES[resource]
+    # The same view_<model> permission that lets a user browse it in the admin.
+    opts = resource.model._meta
+    if not request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}'):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    try:
+        rows, cursor = api.page(resource, request.GET)
+    except api.ApiError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    next_url = None
+    if cursor is not None:
+        params = request.GET.copy()
+        params['after'] = cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return JsonResponse({'results': rows, 'next': next_url})
+
+@login_required
+@require_GET
+def search_view(request):
+    kind = request.GET.get('kind', 'students')
+    if kind not in search.SEARCHABLES:
+        return JsonResponse({'error': f"kind must be one of: {', '.join(search.SEARCHABLES)}."}, status=400)
+    opts = search.SEARCHABLES[kind].model._meta
+    if not (request.role.is_faculty or request.user.has_perm(f'{opts.app_label}.view_{opts.model_name}')):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+    course = request.GET.get('course', '')
+    if course and (kind != 'students' or not course.isdigit()):
+        return JsonResponse({'error': 'course takes a course id and only applies to students.'}, status=400)
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), search.MAX_LIMIT) if limit.isdigit() and int(limit) else search.DEFAULT_LIMIT
+    results = search.suggest(kind, request.GET.get('q', ''), limit, int(course) if course else None)
+    return JsonResponse({'results': results})
+
+def metrics_view(request):
+    # Scrapers send the token; otherwise only staff may look.
+    token = settings.METRICS_TOKEN
+    scraper = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (scraper or request.user.is_staff):
+        return HttpResponse(status=401)
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
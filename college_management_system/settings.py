@@ -23,21 +23,40 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'college.metrics.MetricsMiddleware',
+    'college.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'college.roles.RoleMiddleware',
+    'college.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Server-Timing headers and repeated-query warnings (college/middleware.py).
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', str(DEBUG)) == 'True'
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))
+
+# Bearer token for scraping /metrics/; without it only staff logins can read them (college/metrics.py).
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Keep the compact attendance bitmaps in step with every write (college/bitmaps.py).
+ATTENDANCE_BITMAPS = os.getenv('ATTENDANCE_BITMAPS', 'False') == 'True'
+
 ROOT_URLCONF = 'college_management_system.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Same as DjangoTemplates, but also times rendering for Server-Timing.
+        'BACKEND': (
+            'college.middleware.InstrumentedDjangoTemplates' if QUERY_INSTRUMENTATION
+            else 'django.template.backends.django.DjangoTemplates'
+        ),
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,6 +89,23 @@ else:
     }
 }
 
+# Read replicas (college/replicas.py): comma-separated database URLs, which
+# become the replica_1, replica_2, ... aliases. Dashboards, exports and
+# analytics read from them; a user who just wrote reads from the primary
+# for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['college.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+
+# How long set-password links for provisioned users stay valid (college/provisioning.py).
+PASSWORD_RESET_TIMEOUT = int(os.getenv('PASSWORD_RESET_TIMEOUT', str(14 * 24 * 3600)))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -118,6 +154,12 @@ else:
         }
     }
 
+# Sessions are read from the cache and written through to the database, so a
+# warm request costs no session query and a cache flush logs nobody out.
+# With a shared Redis cache, 'django.contrib.sessions.backends.cache' also
+# skips the database writes.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
 STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -140,3 +182,6 @@ AUTH_USER_MODEL = 'college.User'
 
 LOGOUT_REDIRECT_URL = '/'
 
+# Attendance percentage below which a student is considered at risk.
+ATTENDANCE_THRESHOLD = float(os.getenv('ATTENDANCE_THRESHOLD', '75'))
+
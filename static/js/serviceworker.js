@@ -0,0 +1,247 @@
+// EduNexus service worker.
+//
+// - Precaches the app shell, and course pages the teacher dashboard links to
+//   (pages send them in a "precache" message), so rosters open offline.
+// - Pages are network first with a cached fallback; static files are cache first.
+// - Attendance and marks forms posted while offline are queued in IndexedDB
+//   with a client-generated idempotency key and replayed to /sync/ in batches
+//   once the network is back (Background Sync where available, otherwise
+//   whenever a page sends a "flush" message). Pages send their current CSRF
+//   token with "flush"; the one captured at queue time is stale once the
+//   user has logged in again.
+// - Logging out drops every cached page, so the next user of the device
+//   can't open the last one's pages offline.
+
+const CACHE_NAME = 'edunexus-v1';
+const APP_SHELL = ['/offline/', '/teacher/dashboard/'];
+
+const DB_NAME = 'edunexus-sync';
+const STORE = 'submissions';
+const SYNC_TAG = 'college-sync';
+const SYNC_URL = '/sync/';
+const BATCH_SIZE = 50;
+
+const ATTENDANCE_FORM = /^\/course\/(\d+)\/$/;
+const MARKS_FORM = /^\/assessment\/(\d+)\/$/;
+const NEVER_CACHE = /^\/(admin|metrics|sync|logout)\b/;
+const LOGOUT = /^\/logout\b/;
+
+// --- IndexedDB queue -------------------------------------------------------
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(DB_NAME, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'key' });
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function withStore(mode, action) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(STORE, mode);
+        const result = action(transaction.objectStore(STORE));
+        transaction.oncomplete = () => resolve(result && result.result);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+const enqueue = (submission) => withStore('readwrite', (store) => store.put(submission));
+const queued = () => withStore('readonly', (store) => store.getAll());
+const dequeue = (keys) => withStore('readwrite', (store) => keys.forEach((key) => store.delete(key)));
+
+// --- Turning offline form posts into submissions ---------------------------
+
+async function toSubmission(request) {
+    const path = new URL(request.url).pathname;
+    const form = await request.formData();
+    const base = { key: crypto.randomUUID(), csrf: form.get('csrfmiddlewaretoken'), queuedAt: Date.now() };
+
+    let match = path.match(ATTENDANCE_FORM);
+    if (match) {
+        const present = [];
+        for (const [name, value] of form.entries()) {
+            if (name.startsWith('student_') && value === 'on') present.push(Number(name.slice('student_'.length)));
+        }
+        const submission = { ...base, type: 'attendance', course: Number(match[1]), date: form.get('attendance_date'), present };
+        // The form covers one page of the roster; only those students are written.
+        const roster = form.get('roster');
+        if (roster !== null) submission.students = roster.split(',').filter(Boolean).map(Number);
+        return submission;
+    }
+    match = path.match(MARKS_FORM);
+    if (match) {
+        const marks = {};
+        for (const [name, value] of form.entries()) {
+            if (name.startsWith('marks_') && value !== '') marks[name.slice('marks_'.length)] = value;
+        }
+        return { ...base, type: 'marks', assessment: Number(match[1]), marks };
+    }
+    return null;
+}
+
+function queuedPage(returnUrl) {
+    const body = `<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1"><title>Saved offline</title></head>
+<body style="font-family: sans-serif; background: #111827; color: #e5e7eb; padding: 2rem">
+<h1>Saved offline</h1>
+<p>You are offline. This submission is stored on this device and will be sent automatically when the connection is back.</p>
+<p><a style="color: #818cf8" href="${returnUrl}">Back</a></p></body></html>`;
+    return new Response(body, { status: 202, headers: { 'Content-Type': 'text/html; charset=utf-8' } });
+}
+
+async function postOrQueue(event) {
+    const copy = event.request.clone();
+    try {
+        return await fetch(event.request);
+    } catch (networkError) {
+        const submission = await toSubmission(copy);
+        if (!submission) throw networkError;
+        await enqueue(submission);
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => {});
+        }
+        return queuedPage(event.request.url);
+    }
+}
+
+// --- Replaying the queue ----------------------------------------------------
+
+let flushing = null;
+// The newest CSRF token a page sent. The worker may be stopped between
+// events and lose it; until a page sends another, the queued tokens are used.
+let pageCsrf = null;
+
+function flush() {
+    // One replay at a time; later calls wait for the running one.
+    if (!flushing) flushing = replay().finally(() => { flushing = null; });
+    return flushing;
+}
+
+async function replay() {
+    const submissions = await queued();
+    // All submissions in one request share its CSRF header, so batch per token.
+    const byToken = new Map();
+    for (const submission of submissions) {
+        const csrf = pageCsrf || submission.csrf;
+        if (!byToken.has(csrf)) byToken.set(csrf, []);
+        byToken.get(csrf).push(submission);
+    }
+
+    const results = [];
+    for (const [csrf, group] of byToken) {
+        for (let start = 0; start < group.length; start += BATCH_SIZE) {
+            const batch = group.slice(start, start + BATCH_SIZE);
+            const response = await fetch(SYNC_URL, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': csrf },
+                body: JSON.stringify({ submissions: batch.map(({ csrf, queuedAt, ...submission }) => submission) }),
+            });
+            if (!response.ok) {
+                // Logged out or token expired: keep the queue until a page is open again.
+                if (response.status === 403) break;
+                throw new Error(`Sync failed with HTTP ${response.status}`);
+            }
+            const payload = await response.json();
+            await dequeue(payload.results.map((result) => result.key).filter(Boolean));
+            results.push(...payload.results);
+        }
+    }
+
+    if (results.length) {
+        const clients = await self.clients.matchAll({ type: 'window' });
+        clients.forEach((client) => client.postMessage({ type: 'sync-results', results }));
+    }
+    return results;
+}
+
+// --- Lifecycle and routing ----------------------------------------------------
+
+async function precache(urls) {
+    const cache = await caches.open(CACHE_NAME);
+    await Promise.all(urls.map(async (url) => {
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            if (response.ok && !response.redirected) await cache.put(url, response);
+        } catch (error) {
+            // Offline or not allowed for this user; it will be cached when visited.
+        }
+    }));
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) cache.put(request, response.clone());
+        return response;
+    } catch (error) {
+        return (await cache.match(request)) || (await cache.match('/offline/')) || Response.error();
+    }
+}
+
+async function forgetPages() {
+    const cache = await caches.open(CACHE_NAME);
+    const requests = await cache.keys();
+    await Promise.all(requests.map((request) => {
+        const path = new URL(request.url).pathname;
+        return path.startsWith('/static/') || path === '/offline/' ? null : cache.delete(request);
+    }));
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) cache.put(request, response.clone());
+    return response;
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(precache(APP_SHELL).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter((name) => name !== CACHE_NAME).map((name) => caches.delete(name)));
+        await self.clients.claim();
+        await flush().catch(() => {});
+    })());
+});
+
+self.addEventListener('fetch', (event) => {
+    const url = new URL(event.request.url);
+    if (url.origin !== self.location.origin) return;
+    if (LOGOUT.test(url.pathname)) event.waitUntil(forgetPages());
+    if (NEVER_CACHE.test(url.pathname)) return;
+
+    if (event.request.method === 'POST') {
+        if (ATTENDANCE_FORM.test(url.pathname) || MARKS_FORM.test(url.pathname)) {
+            event.respondWith(postOrQueue(event));
+        }
+        return;
+    }
+    if (event.request.method !== 'GET') return;
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(cacheFirst(event.request));
+    } else if (event.request.mode === 'navigate') {
+        event.respondWith(networkFirst(event.request));
+    }
+});
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) event.waitUntil(flush());
+});
+
+self.addEventListener('message', (event) => {
+    const message = event.data || {};
+    if (message.type === 'precache') event.waitUntil(precache(message.urls || []));
+    if (message.type === 'flush') {
+        if (message.csrf) pageCsrf = message.csrf;
+        event.waitUntil(flush().catch(() => {}));
+    }
+});